@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from db.database import SessionLocal
+from db.database import SessionLocal, engine, async_engine
+from db.pool_stats import pool_status
+from db import schemas as s
 from typing import List
 
 router = APIRouter()
@@ -10,4 +12,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# -----------------------
+# Diagnostics
+# -----------------------
+@router.get("/admin/pool", response_model=List[s.PoolStatus], tags=["Admin"], summary="Connection pool usage and checkout latency")
+def get_pool_status():
+    pools = [("sync", engine)]
+    if async_engine is not None:
+        pools.append(("async", async_engine.sync_engine))
+    return [{"engine": name, **pool_status(e.pool)} for name, e in pools]
@@ -0,0 +1,144 @@
+import datetime
+from typing import List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.database import SessionLocal
+from db.models import MachineType, ProcessType, TaskHourlyRollupDB, TaskDailyRollupDB
+from db import analytics, cycle_times, rollups
+from db import schemas as s
+
+router = APIRouter()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# -----------------------
+# Machine utilisation
+# -----------------------
+@router.get("/analytics/machines", response_model=s.MachineAnalytics, tags=["Analytics"], summary="Busy time, pieces, scrap rate and throughput per machine")
+def machine_analytics(
+    start: datetime.datetime = Query(..., description="Tasks starting at or after this instant"),
+    end: datetime.datetime = Query(..., description="Tasks starting before this instant"),
+    group_by: List[s.AnalyticsDimension] = Query([s.AnalyticsDimension.machine], description="Repeat to group by several dimensions"),
+    shifts: Optional[str] = Query(None, description="Shift start times, e.g. 06:00,14:00,22:00 (default: PLANT_SHIFTS)"),
+    tz: Optional[str] = Query(None, description="IANA time zone for shifts and days (default: PLANT_TIMEZONE)"),
+    machine_type: Optional[MachineType] = Query(None),
+    machine_id: List[int] = Query([], description="Restrict to these machines"),
+    db: Session = Depends(get_db),
+):
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start")
+
+    tz = tz or settings.plant_timezone
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown time zone {tz!r}")
+    try:
+        shift_starts = analytics.parse_shifts(shifts or settings.plant_shifts)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="shifts must be comma separated HH:MM times")
+
+    group_by = list(dict.fromkeys(group_by))
+    rows = analytics.machine_stats(
+        db, start, end, group_by, tz, shift_starts, machine_type=machine_type, machine_ids=machine_id
+    )
+    return {
+        "start": start,
+        "end": end,
+        "timezone": tz,
+        "shifts": [st.strftime("%H:%M") for st in shift_starts],
+        "group_by": group_by,
+        "rows": rows,
+    }
+
+
+# -----------------------
+# Rollups
+# -----------------------
+class RollupFilters:
+    """Query parameters shared by the hourly and daily rollup endpoints."""
+
+    def __init__(
+        self,
+        group_by: List[s.RollupDimension] = Query([], description="Repeat to group by several dimensions; none gives totals per bucket"),
+        machine_id: List[int] = Query([]),
+        operator_user_id: List[int] = Query([]),
+        operation_code: List[str] = Query([]),
+        process_type: Optional[ProcessType] = Query(None),
+    ):
+        self.group_by = list(dict.fromkeys(group_by))
+        self.machine_id = machine_id
+        self.operator_user_id = operator_user_id
+        self.operation_code = operation_code
+        self.process_type = process_type
+
+
+def rollup_series(db: Session, model, bucket, lo, hi, f: RollupFilters):
+    if hi <= lo:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start")
+    state = rollups.get_state(db)
+    rows = rollups.series(
+        db, model, bucket, lo, hi, [d.value for d in f.group_by],
+        machine_ids=f.machine_id, operator_ids=f.operator_user_id,
+        operation_codes=f.operation_code, process_type=f.process_type,
+    )
+    return {
+        "watermark": state.watermark if state else 0,
+        "refreshed_at": state.refreshed_at if state else None,
+        "group_by": f.group_by,
+        "rows": rows,
+    }
+
+
+@router.get("/analytics/rollups/hourly", response_model=s.RollupSeries, tags=["Analytics"], summary="Task totals per hour from the rollup table")
+def hourly_rollups(
+    start: datetime.datetime = Query(...),
+    end: datetime.datetime = Query(...),
+    filters: RollupFilters = Depends(),
+    db: Session = Depends(get_db),
+):
+    model = TaskHourlyRollupDB
+    return rollup_series(db, model, model.bucket_start.label("bucket_start"), start, end, filters)
+
+
+@router.get("/analytics/rollups/daily", response_model=s.RollupSeries, tags=["Analytics"], summary="Task totals per production day from the rollup table")
+def daily_rollups(
+    start: datetime.date = Query(...),
+    end: datetime.date = Query(..., description="Exclusive"),
+    filters: RollupFilters = Depends(),
+    db: Session = Depends(get_db),
+):
+    model = TaskDailyRollupDB
+    return rollup_series(db, model, model.day.label("day"), start, end, filters)
+
+
+# -----------------------
+# Cycle times
+# -----------------------
+@router.get("/analytics/cycle-times", response_model=s.CycleTimes, tags=["Analytics"], summary="Minutes per piece percentiles per operation code and machine")
+def get_cycle_times(
+    start: Optional[datetime.datetime] = Query(None, description="Tasks starting at or after this instant"),
+    end: Optional[datetime.datetime] = Query(None, description="Tasks starting before this instant"),
+    operation_code: List[str] = Query([]),
+    machine_id: List[int] = Query([]),
+    fence: float = Query(1.5, gt=0, description="Outliers lie more than fence * IQR outside the quartiles"),
+    db: Session = Depends(get_db),
+):
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start")
+
+    key = (start, end, tuple(sorted(set(operation_code))), tuple(sorted(set(machine_id))), fence)
+    groups, computed_at = cycle_times.cache.get(
+        db, key, lambda: cycle_times.cycle_time_stats(db, start, end, key[2], key[3], fence)
+    )
+    return {"computed_at": computed_at, "task_count": sum(g["task_count"] for g in groups), "groups": groups}
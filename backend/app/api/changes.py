@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from db.database import SessionLocal
+from db.models import OrderDB, OperationDB, TaskDB, MachineDB, UserDB
+from db import changes
+from db import schemas as s
+
+router = APIRouter()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# response field -> table
+ENTITY_TABLES = {
+    "orders": OrderDB.__tablename__,
+    "operations": OperationDB.__tablename__,
+    "tasks": TaskDB.__tablename__,
+    "machines": MachineDB.__tablename__,
+    "users": UserDB.__tablename__,
+}
+
+
+# -----------------------
+# Delta sync
+# -----------------------
+@router.get("/changes", response_model=s.Changes, tags=["Sync"], summary="Ids created/updated/deleted since a change cursor")
+def get_changes(
+    since: Optional[int] = Query(None, ge=0, description="Cursor from the previous call; omit to get a starting cursor before a full download"),
+    limit: int = Query(changes.MAX_CHANGES, ge=1, le=changes.MAX_CHANGES, description="Most changed ids to return; `more` is true when there are further changes to ask for"),
+    db: Session = Depends(get_db),
+):
+    # read the cursor first: every row stamped <= cursor is already committed
+    cursor = changes.current_cursor(db)
+    if since is None:
+        return {"cursor": cursor}
+    if since >= cursor:
+        # the cursor stays below writers that are still running, so it can be lower than one handed out before
+        if since > cursor and since > changes.last_stamp(db):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor is ahead of the server; do a full reload")
+        return {"cursor": since}
+
+    until, per_table = changes.changes_since(db, since, cursor, limit)
+    return {"cursor": until, "more": until < cursor, **{entity: per_table[table] for entity, table in ENTITY_TABLES.items()}}
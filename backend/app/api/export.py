@@ -0,0 +1,223 @@
+import csv
+import datetime
+import enum
+import io
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
+
+from db.database import SessionLocal
+from db.models import MachineDB, UserDB
+from db import columnar_export
+from db.archive import HOT, Tier, union_tiers
+from db.changes import current_cursor
+
+# change cursor to pass as ?since= on the next incremental export
+EXPORT_CURSOR_HEADER = "X-Export-Cursor"
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+# rows fetched per server-side cursor round trip and written per chunk
+BATCH_SIZE = 2000
+
+
+def task_export_select(tier: Tier = HOT):
+    """Denormalized task rows: task + operation + order + machine + operator."""
+    task, operation, order = tier.task, tier.operation, tier.order
+    return (
+        select(
+            task.id.label("task_id"),
+            task.process_type,
+            task.start_at,
+            task.end_at,
+            task.good_pieces,
+            task.bad_pieces,
+            task.num_benches,
+            task.num_machines,
+            task.operator_user_id,
+            task.operator_bitzer_id,
+            UserDB.name.label("operator_name"),
+            operation.id.label("operation_id"),
+            operation.operation_code,
+            order.order_number,
+            order.material_number,
+            MachineDB.machine_location,
+            MachineDB.machine_type,
+            task.notes,
+        )
+        .join(operation, operation.id == task.operation_id)
+        .join(order, order.id == operation.order_id)
+        .outerjoin(MachineDB, MachineDB.id == operation.machine_id)
+        .outerjoin(UserDB, UserDB.id == task.operator_user_id)
+    )
+
+
+def order_export_select(tier: Tier = HOT):
+    """Order headers with operation count and piece totals."""
+    task, operation, order = tier.task, tier.operation, tier.order
+    return (
+        select(
+            order.id.label("order_id"),
+            order.order_number,
+            order.material_number,
+            order.start_date,
+            order.end_date,
+            order.num_pieces,
+            func.count(func.distinct(operation.id)).label("num_operations"),
+            func.coalesce(func.sum(task.good_pieces), 0).label("good_pieces"),
+            func.coalesce(func.sum(task.bad_pieces), 0).label("bad_pieces"),
+        )
+        .outerjoin(operation, operation.order_id == order.id)
+        .outerjoin(task, task.operation_id == operation.id)
+        .group_by(order.id)
+    )
+
+
+# the exports cover archived orders too (db/archive.py); ids are unique across both tiers
+def task_exports(start_from, start_to):
+    stmt = union_tiers(lambda tier: task_export_select(tier).where(*_task_range(tier.task, start_from, start_to)))
+    return stmt.order_by(stmt.selected_columns.task_id)
+
+
+def order_exports():
+    stmt = union_tiers(order_export_select)
+    return stmt.order_by(stmt.selected_columns.order_id)
+
+
+def _csv_value(v):
+    if v is None:
+        return ""
+    if isinstance(v, enum.Enum):
+        return v.value
+    if isinstance(v, (datetime.date, datetime.datetime)):
+        return v.isoformat()
+    return v
+
+
+def _iter_partitions(stmt):
+    # the session lives inside the generator: it must stay open while the
+    # response streams, i.e. after the request dependencies have been torn down
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+        yield list(result.keys())
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def stream_ndjson(stmt):
+    parts = _iter_partitions(stmt)
+    keys = next(parts)
+    for partition in parts:
+        yield b"".join(orjson.dumps(dict(zip(keys, row))) + b"\n" for row in partition)
+
+
+def stream_csv(stmt):
+    parts = _iter_partitions(stmt)
+    keys = next(parts)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(keys)
+    for partition in parts:
+        writer.writerows([_csv_value(v) for v in row] for row in partition)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _task_range(task, start_from, start_to) -> list:
+    conds = []
+    if start_from is not None:
+        conds.append(task.start_at >= start_from)
+    if start_to is not None:
+        conds.append(task.start_at < start_to)
+    return conds
+
+
+def _attachment(filename: str):
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+@router.get("/tasks.ndjson", summary="Stream all tasks (denormalized) as newline-delimited JSON")
+def export_tasks_ndjson(
+    start_from: Optional[datetime.datetime] = Query(None, description="start_at >= start_from"),
+    start_to: Optional[datetime.datetime] = Query(None, description="start_at < start_to"),
+):
+    return StreamingResponse(stream_ndjson(task_exports(start_from, start_to)), media_type="application/x-ndjson", headers=_attachment("tasks.ndjson"))
+
+
+@router.get("/tasks.csv", summary="Stream all tasks (denormalized) as CSV")
+def export_tasks_csv(
+    start_from: Optional[datetime.datetime] = Query(None, description="start_at >= start_from"),
+    start_to: Optional[datetime.datetime] = Query(None, description="start_at < start_to"),
+):
+    return StreamingResponse(stream_csv(task_exports(start_from, start_to)), media_type="text/csv", headers=_attachment("tasks.csv"))
+
+
+def stream_columnar(stmt, fmt: str):
+    db = SessionLocal()
+    try:
+        yield from columnar_export.stream(db, stmt, fmt)
+    finally:
+        db.close()
+
+
+def columnar_response(fmt: str, start_from, start_to, since: Optional[int]):
+    def where(task):
+        conds = _task_range(task, start_from, start_to)
+        if since is not None:
+            conds.append(task.change_stamp > since)
+        return conds
+
+    stmt = columnar_export.task_facts(where)
+    # read before the rows, so nothing committed later is skipped by the next export
+    with SessionLocal() as db:
+        cursor = current_cursor(db)
+    headers = {**_attachment(f"tasks.{columnar_export.EXTENSIONS[fmt]}"), EXPORT_CURSOR_HEADER: str(cursor)}
+    return StreamingResponse(stream_columnar(stmt, fmt), media_type=columnar_export.MEDIA_TYPES[fmt], headers=headers)
+
+
+SINCE_QUERY = Query(
+    None,
+    ge=0,
+    description=(
+        "Only tasks created or updated after this change cursor (the X-Export-Cursor of the previous export). "
+        "Additive only: deleted tasks are not reported, so a copy merged from incremental exports needs a "
+        "periodic full export (or the `python -m db.export_tasks` dataset) to drop them"
+    ),
+)
+
+
+@router.get("/tasks.parquet", summary="Stream the task fact table as Parquet")
+def export_tasks_parquet(
+    start_from: Optional[datetime.datetime] = Query(None, description="start_at >= start_from"),
+    start_to: Optional[datetime.datetime] = Query(None, description="start_at < start_to"),
+    since: Optional[int] = SINCE_QUERY,
+):
+    return columnar_response("parquet", start_from, start_to, since)
+
+
+@router.get("/tasks.arrow", summary="Stream the task fact table as an Arrow IPC stream")
+def export_tasks_arrow(
+    start_from: Optional[datetime.datetime] = Query(None, description="start_at >= start_from"),
+    start_to: Optional[datetime.datetime] = Query(None, description="start_at < start_to"),
+    since: Optional[int] = SINCE_QUERY,
+):
+    return columnar_response("arrow", start_from, start_to, since)
+
+
+@router.get("/orders.ndjson", summary="Stream order headers with piece totals as newline-delimited JSON")
+def export_orders_ndjson():
+    return StreamingResponse(stream_ndjson(order_exports()), media_type="application/x-ndjson", headers=_attachment("orders.ndjson"))
+
+
+@router.get("/orders.csv", summary="Stream order headers with piece totals as CSV")
+def export_orders_csv():
+    return StreamingResponse(stream_csv(order_exports()), media_type="text/csv", headers=_attachment("orders.csv"))
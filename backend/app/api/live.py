@@ -0,0 +1,249 @@
+"""
+Live feed: task start/stop, piece counts and order/operation changes pushed
+to tablets and supervisor screens instead of polling.
+
+  WebSocket  /ws/live?order_id=..&operation_id=..&machine_id=..
+  SSE        GET /live/events?order_id=..&operation_id=..&machine_id=..
+
+Filters may be repeated and are OR-ed; no filter receives every event. A
+WebSocket client can change its filters at any time by sending
+{"order_id": [...], "operation_id": [...], "machine_id": [...]}.
+
+Every event is a JSON object with "type" and the order_id / operation_id /
+machine_id / task_id it concerns plus a "data" payload:
+
+  task.created, task.started, task.stopped, task.updated, task.deleted
+  operation.progress   (counters after a task write, see db/counters.py)
+  operation.created, operation.updated, operation.deleted
+  order.created, order.updated, order.deleted
+  resync               (the client fell behind; re-fetch)
+
+The write handlers in api/orders.py and api/orders_async.py publish through
+the helpers below after committing.
+"""
+
+import asyncio
+import datetime
+import json
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.events import hub
+from db.models import OrderDB, OperationDB
+
+router = APIRouter()
+
+SSE_HEARTBEAT_SECONDS = 15
+
+TASK_FIELDS = (
+    "id",
+    "operation_id",
+    "process_type",
+    "operator_user_id",
+    "operator_bitzer_id",
+    "start_at",
+    "end_at",
+    "good_pieces",
+    "bad_pieces",
+)
+
+# (start_at, end_at) of a task, or None when it does not exist
+TaskTimes = Optional[Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]]
+
+
+# -----------------------
+# Event builders
+# -----------------------
+def event(type_: str, order_id=None, operation_id=None, machine_id=None, task_id=None, data=None) -> dict:
+    return {
+        "type": type_,
+        "order_id": order_id,
+        "operation_id": operation_id,
+        "machine_id": machine_id,
+        "task_id": task_id,
+        "data": jsonable_encoder(data) if data is not None else None,
+    }
+
+
+def task_times(task) -> TaskTimes:
+    if task is None:
+        return None
+    if isinstance(task, dict):
+        return (task.get("start_at"), task.get("end_at"))
+    return (task.start_at, task.end_at)
+
+
+def task_data(task) -> dict:
+    if isinstance(task, dict):
+        return {k: task.get(k) for k in TASK_FIELDS}
+    return {k: getattr(task, k) for k in TASK_FIELDS}
+
+
+def task_event_type(before: TaskTimes, after: TaskTimes) -> str:
+    if after is None:
+        return "task.deleted"
+    start, end = after
+    if before is None:
+        return "task.started" if start is not None and end is None else "task.created"
+    if before[1] is None and end is not None:
+        return "task.stopped"
+    if start is not None and end is None and (before[0] != start or before[1] is not None):
+        return "task.started"
+    return "task.updated"
+
+
+def order_event(type_: str, order: OrderDB) -> dict:
+    data = {
+        "order_number": order.order_number,
+        "material_number": order.material_number,
+        "start_date": order.start_date,
+        "end_date": order.end_date,
+        "num_pieces": order.num_pieces,
+    }
+    return event(type_, order_id=order.id, data=data)
+
+
+def operation_event(type_: str, op: OperationDB) -> dict:
+    data = {"operation_code": op.operation_code, "machine_id": op.machine_id}
+    return event(type_, order_id=op.order_id, operation_id=op.id, machine_id=op.machine_id, data=data)
+
+
+# -----------------------
+# Publishing
+# -----------------------
+def publish(*events: dict) -> None:
+    for e in events:
+        hub.publish(e)
+
+
+def publish_task_changes(db: Session, changes: Iterable[Tuple[TaskTimes, object]]) -> None:
+    """
+    Publish committed task changes, given as (times before, task after) pairs
+    where the task is a TaskDB, a column dict or, for deletes, (id, operation_id).
+    Adds one operation.progress event per touched operation, read in one query.
+    """
+    if not hub.active:
+        return
+    items = []
+    for before, after in changes:
+        if isinstance(after, tuple):
+            task_id, operation_id = after
+            items.append(("task.deleted", task_id, operation_id, None))
+        else:
+            data = task_data(after)
+            items.append((task_event_type(before, task_times(after)), data["id"], data["operation_id"], data))
+    if not items:
+        return
+
+    op_ids = {operation_id for _, _, operation_id, _ in items}
+    ops = {
+        r.id: r
+        for r in db.execute(
+            select(
+                OperationDB.id,
+                OperationDB.order_id,
+                OperationDB.machine_id,
+                OperationDB.good_pieces,
+                OperationDB.bad_pieces,
+                OperationDB.task_count,
+                OperationDB.open_task_count,
+                OperationDB.last_activity_at,
+            ).where(OperationDB.id.in_(op_ids))
+        )
+    }
+
+    for type_, task_id, operation_id, data in items:
+        op = ops.get(operation_id)
+        hub.publish(event(
+            type_,
+            order_id=op.order_id if op else None,
+            operation_id=operation_id,
+            machine_id=op.machine_id if op else None,
+            task_id=task_id,
+            data=data,
+        ))
+    for op in ops.values():
+        progress = {
+            "good_pieces": op.good_pieces,
+            "bad_pieces": op.bad_pieces,
+            "total_pieces": op.good_pieces + op.bad_pieces,
+            "task_count": op.task_count,
+            "open_task_count": op.open_task_count,
+            "last_activity_at": op.last_activity_at,
+        }
+        hub.publish(event("operation.progress", order_id=op.order_id, operation_id=op.id, machine_id=op.machine_id, data=progress))
+
+
+# -----------------------
+# Endpoints
+# -----------------------
+def _ids(value) -> List[int]:
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    return [int(v) for v in value]
+
+
+@router.websocket("/ws/live")
+async def live_websocket(
+    websocket: WebSocket,
+    order_id: List[int] = Query([]),
+    operation_id: List[int] = Query([]),
+    machine_id: List[int] = Query([]),
+):
+    await websocket.accept()
+    sub = hub.subscribe(order_id, operation_id, machine_id)
+
+    async def pump():
+        while True:
+            await websocket.send_json(await sub.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                filters = json.loads(message)
+                sub.set_filters(_ids(filters.get("order_id")), _ids(filters.get("operation_id")), _ids(filters.get("machine_id")))
+            except (AttributeError, TypeError, ValueError):
+                await websocket.send_json(event("error", data='expected {"order_id": [...], "operation_id": [...], "machine_id": [...]}'))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.unsubscribe(sub)
+
+
+@router.get("/live/events", tags=["Live"], summary="Server-Sent Events stream of task/operation/order changes")
+async def live_events(
+    request: Request,
+    order_id: List[int] = Query([]),
+    operation_id: List[int] = Query([]),
+    machine_id: List[int] = Query([]),
+):
+    async def stream():
+        sub = hub.subscribe(order_id, operation_id, machine_id)
+        try:
+            while True:
+                try:
+                    e = await asyncio.wait_for(sub.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {e['type']}\ndata: {json.dumps(e)}\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,10 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import func, select, insert, update, delete, or_, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
+from collections import defaultdict
+import datetime
 
 from db.database import SessionLocal
-from db.models import OrderDB, OperationDB, TaskDB, MachineDB, UserDB
+from db.models import (
+    OrderDB,
+    OperationDB,
+    TaskDB,
+    MachineDB,
+    UserDB,
+    OrderArchiveDB,
+    DeleteJobDB,
+    order_load_options,
+    operation_load_options,
+    task_load_options,
+)
+from db.pagination import paginate, MAX_PAGE_SIZE
+from db import revisions, fastjson, counters, invalidation, archive, deletes
+from db.reference_cache import reference_cache, MACHINES, USERS
+from api import live
 from db import schemas as s
 
 router = APIRouter()
@@ -18,25 +38,235 @@ def get_db():
         db.close()
 
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class NotModified(Exception):
+    """Raised by `conditional` when the client's cached copy is current (answered with 304 in main.py)."""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def conditional(*tables: str):
+    """
+    Dependency factory for GET endpoints whose body only depends on `tables`.
+
+    Computes an ETag from the tables' revision counters (one primary-key read)
+    and raises NotModified before the endpoint runs its query when it matches
+    If-None-Match; otherwise the ETag is attached to the response.
+    """
+    def dependency(request: Request, response: Response, db: Session = Depends(get_db)):
+        etag = revisions.etag_for(db, tables)
+        if etag is None:
+            return
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = {c.strip() for c in if_none_match.split(",")}
+            if etag in candidates or "*" in candidates:
+                raise NotModified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return Depends(dependency)
+
+
+ORDER_TABLES = (OrderDB.__tablename__, OperationDB.__tablename__, TaskDB.__tablename__, MachineDB.__tablename__, UserDB.__tablename__)
+MACHINE_TABLES = (MachineDB.__tablename__,)
+USER_TABLES = (UserDB.__tablename__,)
+TASK_TABLES = (TaskDB.__tablename__, UserDB.__tablename__)
+
+
+def page(query, response: Response, sort_col, id_col, limit: Optional[int], after: Optional[str], desc: bool = False):
+    """Run a keyset-paginated query and expose the next cursor as a response header."""
+    try:
+        rows, next_cursor = paginate(query, sort_col, id_col, limit=limit, after=after, descending=desc)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
+
+
+def fast_response(payload, response: Response) -> Response:
+    """orjson-encoded response that keeps the headers set on the injected `response`."""
+    out = Response(content=fastjson.dumps(payload), media_type="application/json")
+    out.headers.raw.extend(response.headers.raw)
+    return out
+
+
+# Postgres' default names for the foreign keys the handlers answer with 4xx; the migrations
+# keep the same names (tests/test_migrations.py checks both schemas against these)
+OPERATION_ORDER_FK = "operationsdb_order_id_fkey"
+OPERATION_MACHINE_FK = "operationsdb_machine_id_fkey"
+TASK_OPERATOR_FK = "tasksdb_operator_user_id_fkey"
+# named in db/models.py
+OPERATION_CODE_UNIQUE = "uq_operationsdb_order_id_operation_code"
+
+
+def constraint_name(error: IntegrityError) -> Optional[str]:
+    """Name of the constraint behind an IntegrityError (psycopg2), if the driver reports it."""
+    diag = getattr(error.orig, "diag", None)
+    return getattr(diag, "constraint_name", None)
+
+
+def insert_unique(db: Session, model, values: dict, conflict_columns: list, *extra, **children):
+    """
+    INSERT ... ON CONFLICT (conflict_columns) DO NOTHING RETURNING the new row.
+
+    One statement replaces the "SELECT for a duplicate, then INSERT" pair, and
+    leaves no window between the two for a concurrent create: a duplicate
+    comes back as None, for the caller to answer 409. Further `extra` column
+    expressions are evaluated on the new row and returned with it as a tuple
+    (row, *extra). A new row has no children yet, so `children` sets its
+    relationships (operations=[], ...) and the row is detached from the
+    session; the commit then doesn't expire it and serializing it needs no
+    refresh query.
+    """
+    stmt = (
+        pg_insert(model)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=conflict_columns)
+        .returning(model, *extra)
+    )
+    result = db.execute(stmt).first()
+    if result is None:
+        return None
+    row = result[0]
+    for key, value in children.items():
+        set_committed_value(row, key, value)
+    db.expunge(row)
+    return tuple(result) if extra else row
+
+
+FAST_QUERY = Query(False, description="Build the body straight from row tuples with orjson, skipping response_model validation (same JSON shape)")
+
+
+ORDER_SORT_COLUMNS = {
+    s.OrderSortKey.order_number: OrderDB.order_number,
+    s.OrderSortKey.start_date: OrderDB.start_date,
+    s.OrderSortKey.end_date: OrderDB.end_date,
+    s.OrderSortKey.material_number: OrderDB.material_number,
+}
+
+def filter_orders(q, material_number=None, start_from=None, start_to=None, end_from=None, end_to=None):
+    if material_number is not None:
+        q = q.filter(OrderDB.material_number == material_number)
+    if start_from is not None:
+        q = q.filter(OrderDB.start_date >= start_from)
+    if start_to is not None:
+        q = q.filter(OrderDB.start_date <= start_to)
+    if end_from is not None:
+        q = q.filter(OrderDB.end_date >= end_from)
+    if end_to is not None:
+        q = q.filter(OrderDB.end_date <= end_to)
+    return q
+
+
+TASK_SORT_COLUMNS = {
+    s.TaskSortKey.id: TaskDB.id,
+    s.TaskSortKey.start_at: TaskDB.start_at,
+    s.TaskSortKey.end_at: TaskDB.end_at,
+}
+
+
 # -----------------------
 # Orders
 # -----------------------
-@router.get("/orders", response_model=List[s.Order], tags=["Orders"], summary="List all orders")
-def list_orders(db: Session = Depends(get_db)):
-    return db.query(OrderDB).all()
+@router.get("/orders", response_model=List[s.Order], tags=["Orders"], summary="List orders (keyset paginated, filterable)", dependencies=[conditional(*ORDER_TABLES)])
+def list_orders(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to return every matching order"),
+    after: Optional[str] = Query(None, description="Cursor taken from the X-Next-Cursor header of the previous page"),
+    sort: s.OrderSortKey = Query(s.OrderSortKey.order_number, description="Sort key"),
+    desc: bool = Query(False, description="Sort descending"),
+    material_number: Optional[int] = Query(None),
+    start_from: Optional[datetime.date] = Query(None, description="start_date >= start_from"),
+    start_to: Optional[datetime.date] = Query(None, description="start_date <= start_to"),
+    end_from: Optional[datetime.date] = Query(None, description="end_date >= end_from"),
+    end_to: Optional[datetime.date] = Query(None, description="end_date <= end_to"),
+    fast: bool = FAST_QUERY,
+    db: Session = Depends(get_db),
+):
+    if fast:
+        q = filter_orders(fastjson.order_rows_query(db), material_number, start_from, start_to, end_from, end_to)
+        rows = page(q, response, ORDER_SORT_COLUMNS[sort], OrderDB.id, limit, after, desc)
+        return fast_response(fastjson.build_orders(db, rows), response)
+
+    q = db.query(OrderDB).options(*order_load_options())
+    q = filter_orders(q, material_number, start_from, start_to, end_from, end_to)
+    return page(q, response, ORDER_SORT_COLUMNS[sort], OrderDB.id, limit, after, desc)
+
+
+@router.get("/orders/summary", response_model=List[s.OrderSummary], tags=["Orders"], summary="List order headers with operation count and piece totals", dependencies=[conditional(*ORDER_TABLES)])
+def list_order_summaries(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to return every matching order"),
+    after: Optional[str] = Query(None, description="Cursor taken from the X-Next-Cursor header of the previous page"),
+    sort: s.OrderSortKey = Query(s.OrderSortKey.order_number, description="Sort key"),
+    desc: bool = Query(False, description="Sort descending"),
+    material_number: Optional[int] = Query(None),
+    start_from: Optional[datetime.date] = Query(None, description="start_date >= start_from"),
+    start_to: Optional[datetime.date] = Query(None, description="start_date <= start_to"),
+    end_from: Optional[datetime.date] = Query(None, description="end_date >= end_from"),
+    end_to: Optional[datetime.date] = Query(None, description="end_date <= end_to"),
+    db: Session = Depends(get_db),
+):
+    # one grouped query: orders LEFT JOIN operations LEFT JOIN tasks
+    good = func.coalesce(func.sum(TaskDB.good_pieces), 0)
+    bad = func.coalesce(func.sum(TaskDB.bad_pieces), 0)
+    q = (
+        db.query(
+            OrderDB.id,
+            OrderDB.order_number,
+            OrderDB.material_number,
+            OrderDB.start_date,
+            OrderDB.end_date,
+            OrderDB.num_pieces,
+            func.count(func.distinct(OperationDB.id)).label("num_operations"),
+            good.label("good_pieces"),
+            bad.label("bad_pieces"),
+            (good + bad).label("total_pieces"),
+        )
+        .outerjoin(OperationDB, OperationDB.order_id == OrderDB.id)
+        .outerjoin(TaskDB, TaskDB.operation_id == OperationDB.id)
+        .group_by(OrderDB.id)
+    )
+    q = filter_orders(q, material_number, start_from, start_to, end_from, end_to)
+    return page(q, response, ORDER_SORT_COLUMNS[sort], OrderDB.id, limit, after, desc)
 
 
-@router.get("/orders/{order_number}", response_model=s.Order, tags=["Orders"], summary="Get order by order_number")
+@router.get("/orders/{order_number}", response_model=s.Order, tags=["Orders"], summary="Get order by order_number", dependencies=[conditional(*ORDER_TABLES)])
 def get_order_by_number(order_number: int, db: Session = Depends(get_db)):
-    order = db.query(OrderDB).filter(OrderDB.order_number == order_number).first()
+    order = db.query(OrderDB).options(*order_load_options()).filter(OrderDB.order_number == order_number).first()
+    if not order:
+        # closed orders moved out of the hot tables (db/archive.py)
+        order = archive.get_archived_order(db, order_number)
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     return order
 
 
-@router.get("/orders/id/{order_id}", response_model=s.Order, tags=["Orders"], summary="Get order by internal id")
+@router.get("/orders/{order_number}/progress", response_model=s.OrderProgress, tags=["Orders"], summary="Piece and task counters for an order", dependencies=[conditional(OrderDB.__tablename__)])
+def get_order_progress(order_number: int, db: Session = Depends(get_db)):
+    order = db.query(OrderDB).filter(OrderDB.order_number == order_number).first()
+    if not order:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+
+    return {
+        "order_number": order.order_number,
+        "num_pieces": order.num_pieces,
+        "good_pieces": order.good_pieces,
+        "bad_pieces": order.bad_pieces,
+        "total_pieces": order.good_pieces + order.bad_pieces,
+        "task_count": order.task_count,
+        "open_task_count": order.open_task_count,
+        "last_activity_at": order.last_activity_at,
+    }
+
+
+@router.get("/orders/id/{order_id}", response_model=s.Order, tags=["Orders"], summary="Get order by internal id", dependencies=[conditional(*ORDER_TABLES)])
 def get_order_by_id(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(OrderDB).filter(OrderDB.id == order_id).first()
+    order = db.query(OrderDB).options(*order_load_options()).filter(OrderDB.id == order_id).first()
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     return order
@@ -44,17 +274,142 @@ def get_order_by_id(order_id: int, db: Session = Depends(get_db)):
 
 @router.post("/orders", response_model=s.Order, tags=["Orders"], status_code=status.HTTP_201_CREATED, summary="Create order")
 def create_order(order_in: s.OrderCreate, db: Session = Depends(get_db)):
-    # ensure unique order_number
-    exists = db.query(OrderDB).filter(OrderDB.order_number == order_in.order_number).first()
-    if exists:
+    # order_number is unique over the hot table (ON CONFLICT) and the archive (checked in the same statement)
+    archived = exists().where(OrderArchiveDB.order_number == order_in.order_number)
+    created = insert_unique(db, OrderDB, order_in.model_dump(), [OrderDB.order_number], archived, operations=[])
+    if created is None or created[1]:
+        db.rollback()
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Order number {order_in.order_number} already exists.")
-    new_order = OrderDB(**order_in.model_dump())
-    db.add(new_order)
+    new_order = created[0]
     db.commit()
-    db.refresh(new_order)
+    live.publish(live.order_event("order.created", new_order))
     return new_order
 
 
+def _bulk_order_rows(o: s.BulkOrderCreate, machines_by_id, machines_by_location, bitzer_by_user):
+    """Validate one bulk order against the pre-fetched references; return (error, operations) where operations is [(op_row, task_rows)]."""
+    if o.start_date and o.end_date and o.start_date > o.end_date:
+        return "start_date cannot be after end_date", None
+
+    operations = []
+    codes = set()
+    for op in o.operations:
+        if op.operation_code in codes:
+            return f"Operation code {op.operation_code} repeated in this order", None
+        codes.add(op.operation_code)
+
+        machine_id = None
+        if op.machine_id is not None:
+            machine_id = machines_by_id.get(op.machine_id)
+            if machine_id is None:
+                return f"Referenced machine {op.machine_id} not found", None
+        elif op.machine_location is not None:
+            machine_id = machines_by_location.get(op.machine_location)
+            if machine_id is None:
+                return f"Referenced machine location {op.machine_location} not found", None
+
+        task_rows = []
+        for t in op.tasks:
+            data = t.model_dump(exclude_unset=True)
+            if data.get("operator_user_id") is not None:
+                if data["operator_user_id"] not in bitzer_by_user:
+                    return f"Referenced operator user {data['operator_user_id']} not found", None
+                if data.get("operator_bitzer_id") is None:
+                    data["operator_bitzer_id"] = bitzer_by_user[data["operator_user_id"]]
+            task_rows.append(data)
+
+        operations.append(({"operation_code": str(op.operation_code), "machine_id": machine_id}, task_rows))
+    return None, operations
+
+
+@router.post("/orders/bulk", response_model=s.BulkOrderResponse, tags=["Orders"], summary="Create many orders with their operations (and tasks) in one transaction")
+def create_orders_bulk(payload: s.BulkOrderRequest, db: Session = Depends(get_db)):
+    items = payload.orders
+
+    # resolve every reference up front: one query each for orders, machines and users
+    numbers = {o.order_number for o in items}
+    existing = set(db.scalars(select(OrderDB.order_number).where(OrderDB.order_number.in_(numbers)))) if numbers else set()
+    existing |= archive.archived_order_numbers(db, numbers)
+
+    machine_ids = {op.machine_id for o in items for op in o.operations if op.machine_id is not None}
+    machine_locations = {op.machine_location for o in items for op in o.operations if op.machine_id is None and op.machine_location is not None}
+    machines_by_id, machines_by_location = {}, {}
+    cached = reference_cache.machines(db) if machine_ids or machine_locations else None
+    if cached is not None:
+        for m in cached:
+            machines_by_id[m.id] = m.id
+            machines_by_location[m.machine_location] = m.id
+    elif machine_ids or machine_locations:
+        rows = db.execute(
+            select(MachineDB.id, MachineDB.machine_location).where(
+                or_(MachineDB.id.in_(machine_ids), MachineDB.machine_location.in_(machine_locations))
+            )
+        )
+        for mid, loc in rows:
+            machines_by_id[mid] = mid
+            machines_by_location[loc] = mid
+
+    user_ids = {t.operator_user_id for o in items for op in o.operations for t in op.tasks if t.operator_user_id is not None}
+    bitzer_by_user = reference_cache.bitzer_ids(db, user_ids) if user_ids else {}
+
+    results = [None] * len(items)
+    accepted = []
+    seen = set()
+    for i, o in enumerate(items):
+        error = None
+        if o.order_number in existing:
+            error = f"Order number {o.order_number} already exists."
+        elif o.order_number in seen:
+            error = f"Order number {o.order_number} repeated in this batch."
+        else:
+            error, operations = _bulk_order_rows(o, machines_by_id, machines_by_location, bitzer_by_user)
+        seen.add(o.order_number)
+        if error:
+            results[i] = s.BulkOrderResult(index=i, order_number=o.order_number, status="error", detail=error)
+        else:
+            accepted.append((i, o, operations))
+
+    if accepted:
+        try:
+            # multi-row INSERT ... RETURNING per level, ids come back in parameter order
+            order_ids = db.scalars(
+                insert(OrderDB).returning(OrderDB.id, sort_by_parameter_order=True),
+                [o.model_dump(exclude={"operations"}) for _, o, _ in accepted],
+            ).all()
+
+            op_rows, op_owner = [], []
+            for (i, _, operations), order_id in zip(accepted, order_ids):
+                for op_row, task_rows in operations:
+                    op_rows.append({**op_row, "order_id": order_id})
+                    op_owner.append(task_rows)
+            op_ids = []
+            if op_rows:
+                op_ids = db.scalars(insert(OperationDB).returning(OperationDB.id, sort_by_parameter_order=True), op_rows).all()
+
+            task_rows = [{**t, "operation_id": op_id} for op_id, tasks in zip(op_ids, op_owner) for t in tasks]
+            if task_rows:
+                db.execute(insert(TaskDB), task_rows)
+                db.flush()
+                counters.recompute(db, order_ids)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Conflicting concurrent write while inserting the batch; nothing was created, retry the request.")
+
+        for (i, o, operations), order_id in zip(accepted, order_ids):
+            results[i] = s.BulkOrderResult(
+                index=i,
+                order_number=o.order_number,
+                status="created",
+                order_id=order_id,
+                operations=len(operations),
+                tasks=sum(len(t) for _, t in operations),
+            )
+            live.publish(live.event("order.created", order_id=order_id, data={"order_number": o.order_number}))
+
+    return {"created": len(accepted), "failed": len(items) - len(accepted), "results": results}
+
+
 @router.patch("/orders/{order_number}", response_model=s.Order, tags=["Orders"], summary="Partial update order by order_number")
 def patch_order(order_number: int, order_in: s.OrderUpdate, db: Session = Depends(get_db)):
     order = db.query(OrderDB).filter(OrderDB.order_number == order_number).first()
@@ -68,7 +423,7 @@ def patch_order(order_number: int, order_in: s.OrderUpdate, db: Session = Depend
         new_on = data["order_number"]
         if new_on != order.order_number:
             conflict = db.query(OrderDB).filter(OrderDB.order_number == new_on).first()
-            if conflict:
+            if conflict or archive.archived_order_numbers(db, [new_on]):
                 raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="New order_number already in use.")
 
     # validate dates if both present (or using existing)
@@ -82,37 +437,74 @@ def patch_order(order_number: int, order_in: s.OrderUpdate, db: Session = Depend
 
     db.commit()
     db.refresh(order)
+    live.publish(live.order_event("order.updated", order))
     return order
 
 
 @router.delete("/orders/{order_number}", status_code=status.HTTP_204_NO_CONTENT, tags=["Orders"], summary="Delete order and its operations/tasks")
 def delete_order(order_number: int, db: Session = Depends(get_db)):
-    order = db.query(OrderDB).filter(OrderDB.order_number == order_number).first()
-    if not order:
+    # operations and tasks go with it (ON DELETE CASCADE)
+    rows = deletes.delete_orders(db, OrderDB.order_number == order_number)
+    if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
-
-    # remove tasks -> operations -> order to avoid FK errors
-    op_ids = [op.id for op in order.operations]
-    if op_ids:
-        db.query(TaskDB).filter(TaskDB.operation_id.in_(op_ids)).delete(synchronize_session=False)
-        db.query(OperationDB).filter(OperationDB.id.in_(op_ids)).delete(synchronize_session=False)
-
-    db.delete(order)
     db.commit()
+    publish_deleted_orders(rows)
     return None
 
 
+def publish_deleted_orders(rows) -> None:
+    """order.deleted events for the (id, order_number) rows of deleted orders; also used by the delete jobs."""
+    live.publish(*(live.event("order.deleted", order_id=r.id, data={"order_number": r.order_number}) for r in rows))
+
+
+@router.post(
+    "/orders/bulk-delete",
+    response_model=s.DeleteJob,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Orders"],
+    summary="Delete many orders (by number or start_date range) in a background job",
+)
+def bulk_delete_orders(payload: s.BulkOrderDelete, response: Response, db: Session = Depends(get_db)):
+    # worked off in small transactions by a worker's delete job runner (db/deletes.py)
+    job = deletes.submit_job(db, payload.order_numbers, payload.start_from, payload.start_to)
+    response.headers["Location"] = f"/orders/bulk-delete/{job.id}"
+    return job
+
+
+@router.get("/orders/bulk-delete/{job_id}", response_model=s.DeleteJob, tags=["Orders"], summary="Progress of a bulk delete job")
+def get_delete_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(DeleteJobDB, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Delete job not found")
+    return job
+
+
 # -----------------------
 # Machines
 # -----------------------
-@router.get("/machines", response_model=List[s.Machine], tags=["Machines"], summary="List machines")
-def list_machines(db: Session = Depends(get_db)):
-    return db.query(MachineDB).all()
-
-
-@router.get("/machines/{machine_id}", response_model=s.Machine, tags=["Machines"], summary="Get machine by id")
+@router.get("/machines", response_model=List[s.Machine], tags=["Machines"], summary="List machines (keyset paginated by id)", dependencies=[conditional(*MACHINE_TABLES)])
+def list_machines(
+    response: Response,
+    active: Optional[bool] = Query(None, description="Filter by active flag"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to return every machine"),
+    after: Optional[str] = Query(None, description="Cursor taken from the X-Next-Cursor header of the previous page"),
+    db: Session = Depends(get_db),
+):
+    # unpaginated listings (the dialogs) are served from the reference cache
+    if limit is None and after is None:
+        cached = reference_cache.machines(db)
+        if cached is not None:
+            return [m for m in cached if active is None or m.active == active]
+
+    q = db.query(MachineDB)
+    if active is not None:
+        q = q.filter(MachineDB.active == active)
+    return page(q, response, MachineDB.id, MachineDB.id, limit, after)
+
+
+@router.get("/machines/{machine_id}", response_model=s.Machine, tags=["Machines"], summary="Get machine by id", dependencies=[conditional(*MACHINE_TABLES)])
 def get_machine(machine_id: int, db: Session = Depends(get_db)):
-    m = db.query(MachineDB).filter(MachineDB.id == machine_id).first()
+    m = reference_cache.machine(db, machine_id)
     if not m:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine not found")
     return m
@@ -120,14 +512,12 @@ def get_machine(machine_id: int, db: Session = Depends(get_db)):
 
 @router.post("/machines", response_model=s.Machine, status_code=status.HTTP_201_CREATED, tags=["Machines"], summary="Create machine")
 def create_machine(machine_in: s.MachineCreate, db: Session = Depends(get_db)):
-    # require unique machine_location
-    exists = db.query(MachineDB).filter(MachineDB.machine_location == machine_in.machine_location).first()
-    if exists:
+    m = insert_unique(db, MachineDB, machine_in.model_dump(), [MachineDB.machine_location])
+    if m is None:
+        db.rollback()
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="machine_location already exists")
-    m = MachineDB(**machine_in.model_dump())
-    db.add(m)
+    invalidation.notify(db, MACHINES, m.id)
     db.commit()
-    db.refresh(m)
     return m
 
 
@@ -148,6 +538,7 @@ def patch_machine(machine_id: int, machine_in: s.MachineUpdate, db: Session = De
     for k, v in data.items():
         setattr(m, k, v)
 
+    invalidation.notify(db, MACHINES, m.id)
     db.commit()
     db.refresh(m)
     return m
@@ -155,16 +546,17 @@ def patch_machine(machine_id: int, machine_in: s.MachineUpdate, db: Session = De
 
 @router.delete("/machines/{machine_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Machines"], summary="Delete a machine (fails if used by operations)")
 def delete_machine(machine_id: int, db: Session = Depends(get_db)):
-    m = db.query(MachineDB).filter(MachineDB.id == machine_id).first()
-    if not m:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine not found")
-
-    # prevent deleting machines that are referenced by operations
-    used = db.query(OperationDB).filter(OperationDB.machine_id == m.id).first()
-    if used:
+    # machines referenced by operations are kept by the foreign key
+    try:
+        deleted = db.scalar(delete(MachineDB).where(MachineDB.id == machine_id).returning(MachineDB.id))
+    except IntegrityError as e:
+        db.rollback()
+        if constraint_name(e) != OPERATION_MACHINE_FK:
+            raise
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Machine is referenced by operations; remove/update them first")
-
-    db.delete(m)
+    if deleted is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Machine not found")
+    invalidation.notify(db, MACHINES, machine_id)
     db.commit()
     return None
 
@@ -172,17 +564,28 @@ def delete_machine(machine_id: int, db: Session = Depends(get_db)):
 # -----------------------
 # Users
 # -----------------------
-@router.get("/users", response_model=List[s.User], tags=["Users"], summary="List users (optionally only active)")
-def list_users(active: Optional[bool] = Query(None, description="If true, return only active users"), db: Session = Depends(get_db)):
+@router.get("/users", response_model=List[s.User], tags=["Users"], summary="List users (optionally only active)", dependencies=[conditional(*USER_TABLES)])
+def list_users(
+    response: Response,
+    active: Optional[bool] = Query(None, description="If true, return only active users"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to return every user"),
+    after: Optional[str] = Query(None, description="Cursor taken from the X-Next-Cursor header of the previous page"),
+    db: Session = Depends(get_db),
+):
+    if limit is None and after is None:
+        cached = reference_cache.users(db)
+        if cached is not None:
+            return [u for u in cached if active is not True or u.active]
+
     q = db.query(UserDB)
     if active is True:
         q = q.filter(UserDB.active == True)
-    return q.all()
+    return page(q, response, UserDB.id, UserDB.id, limit, after)
 
 
-@router.get("/users/{user_id}", response_model=s.User, tags=["Users"], summary="Get user by id")
+@router.get("/users/{user_id}", response_model=s.User, tags=["Users"], summary="Get user by id", dependencies=[conditional(*USER_TABLES)])
 def get_user(user_id: int, db: Session = Depends(get_db)):
-    u = db.query(UserDB).filter(UserDB.id == user_id).first()
+    u = reference_cache.user(db, user_id)
     if not u:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return u
@@ -191,15 +594,16 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 @router.post("/users", response_model=s.User, status_code=status.HTTP_201_CREATED, tags=["Users"], summary="Create user")
 def create_user(user_in: s.UserCreate, db: Session = Depends(get_db)):
     data = user_in.model_dump(exclude_unset=True)
-    # check unique bitzer_id when provided
-    if data.get("bitzer_id") is not None:
-        exists = db.query(UserDB).filter(UserDB.bitzer_id == data["bitzer_id"]).first()
-        if exists:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="bitzer_id already in use")
-    new_u = UserDB(**data)
-    db.add(new_u)
+    # not hashed yet, stored as password_hash like in patch_user
+    if "password" in data:
+        data["password_hash"] = data.pop("password")
+    # a null bitzer_id never conflicts
+    new_u = insert_unique(db, UserDB, data, [UserDB.bitzer_id])
+    if new_u is None:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="bitzer_id already in use")
+    invalidation.notify(db, USERS, new_u.id)
     db.commit()
-    db.refresh(new_u)
     return new_u
 
 
@@ -226,6 +630,7 @@ def patch_user(user_id: int, user_in: s.UserUpdate, db: Session = Depends(get_db
         else:
             setattr(u, k, v)
 
+    invalidation.notify(db, USERS, u.id)
     db.commit()
     db.refresh(u)
     return u
@@ -233,16 +638,17 @@ def patch_user(user_id: int, user_in: s.UserUpdate, db: Session = Depends(get_db
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Users"], summary="Delete a user (fails if referenced by tasks)")
 def delete_user(user_id: int, db: Session = Depends(get_db)):
-    u = db.query(UserDB).filter(UserDB.id == user_id).first()
-    if not u:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    # prevent deleting users that are referenced by tasks
-    used = db.query(TaskDB).filter(TaskDB.operator_user_id == u.id).first()
-    if used:
+    # users referenced by tasks are kept by the foreign key
+    try:
+        deleted = db.scalar(delete(UserDB).where(UserDB.id == user_id).returning(UserDB.id))
+    except IntegrityError as e:
+        db.rollback()
+        if constraint_name(e) != TASK_OPERATOR_FK:
+            raise
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User is referenced by tasks; reassign or clear tasks first")
-
-    db.delete(u)
+    if deleted is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    invalidation.notify(db, USERS, user_id)
     db.commit()
     return None
 
@@ -250,70 +656,111 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
 # -----------------------
 # Operations
 # -----------------------
-@router.get("/orders/{order_number}/operations", response_model=List[s.Operation], tags=["Operations"], summary="List operations for an order_number")
+@router.get("/orders/{order_number}/operations", response_model=List[s.Operation], tags=["Operations"], summary="List operations for an order_number", dependencies=[conditional(*ORDER_TABLES)])
 def get_operations_for_order(order_number: int, db: Session = Depends(get_db)):
     order = db.query(OrderDB).filter(OrderDB.order_number == order_number).first()
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
-    return db.query(OperationDB).filter(OperationDB.order_id == order.id).all()
+    return db.query(OperationDB).options(*operation_load_options()).filter(OperationDB.order_id == order.id).all()
 
 
-@router.get("/operation/{operation_id}", response_model=s.Operation, tags=["Operations"], summary="Get operation by id")
+@router.get("/operation/{operation_id}", response_model=s.Operation, tags=["Operations"], summary="Get operation by id", dependencies=[conditional(*ORDER_TABLES)])
 def get_operation(operation_id: int, db: Session = Depends(get_db)):
-    op = db.query(OperationDB).filter(OperationDB.id == operation_id).first()
+    op = db.query(OperationDB).options(*operation_load_options()).filter(OperationDB.id == operation_id).first()
     if not op:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
     return op
 
 
-@router.get("/operations/get_id", response_model=int, tags=["Operations"], summary="Get operation id by order_number and operation_code")
+def natural_key_query(stmt, order_number: int, operation_code: str):
+    """Restrict `stmt` (selecting from operationsdb) to one (order_number, operation_code) through a single join."""
+    return (
+        stmt.join(OrderDB, OrderDB.id == OperationDB.order_id)
+        .where(OrderDB.order_number == order_number, OperationDB.operation_code == operation_code)
+    )
+
+
+@router.get("/operations/get_id", response_model=int, tags=["Operations"], summary="Get operation id by order_number and operation_code", dependencies=[conditional(*ORDER_TABLES)])
 def get_operation_id(order_number: int, operation_code: str, db: Session = Depends(get_db)):
-    order = db.query(OrderDB).filter(OrderDB.order_number == order_number).first()
-    if not order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
-    op = db.query(OperationDB).filter(OperationDB.order_id == order.id, OperationDB.operation_code == operation_code).first()
-    if not op:
+    op_id = db.scalar(natural_key_query(select(OperationDB.id), order_number, operation_code))
+    if op_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
-    return op.id
+    return op_id
+
+
+@router.get(
+    "/orders/{order_number}/operations/{operation_code}",
+    response_model=s.OperationSummary,
+    tags=["Operations"],
+    summary="Resolve an operation by order_number and operation_code (barcode scan)",
+    dependencies=[conditional(OrderDB.__tablename__, OperationDB.__tablename__, MachineDB.__tablename__)],
+)
+def get_operation_by_code(order_number: int, operation_code: str, db: Session = Depends(get_db)):
+    stmt = natural_key_query(
+        select(OperationDB, OrderDB.order_number, OrderDB.num_pieces)
+        .outerjoin(OperationDB.machine)
+        .options(contains_eager(OperationDB.machine)),
+        order_number,
+        operation_code,
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
+
+    op, order_number, num_pieces = row
+    return {
+        "id": op.id,
+        "order_id": op.order_id,
+        "order_number": order_number,
+        "num_pieces": num_pieces,
+        "operation_code": op.operation_code,
+        "machine_id": op.machine_id,
+        "machine": op.machine,
+        "good_pieces": op.good_pieces,
+        "bad_pieces": op.bad_pieces,
+        "total_pieces": op.good_pieces + op.bad_pieces,
+        "task_count": op.task_count,
+        "open_task_count": op.open_task_count,
+        "last_activity_at": op.last_activity_at,
+    }
 
 
 @router.post("/operations", response_model=s.Operation, status_code=status.HTTP_201_CREATED, tags=["Operations"], summary="Create operation")
 def create_operation(operation_in: s.OperationCreate, db: Session = Depends(get_db)):
     data = operation_in.model_dump(exclude_unset=True)
 
-    # allow either order_id or order_number for compatibility
-    order_obj = None
-    if "order_id" in data and data["order_id"] is not None:
-        order_obj = db.query(OrderDB).filter(OrderDB.id == data["order_id"]).first()
-    elif "order_number" in data:  # if client sends order_number
-        order_obj = db.query(OrderDB).filter(OrderDB.order_number == data["order_number"]).first()
-
-    if not order_obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Referenced order not found")
-
-    # check duplicate operation_code per order
     op_code = data.get("operation_code")
     if op_code is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="operation_code is required")
-    conflict = db.query(OperationDB).filter(OperationDB.order_id == order_obj.id, OperationDB.operation_code == op_code).first()
-    if conflict:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Operation code already exists for this order")
 
     # validate machine if provided
     machine_id = data.get("machine_id")
+    m = None
     if machine_id is not None:
-        m = db.query(MachineDB).filter(MachineDB.id == machine_id).first()
+        m = reference_cache.machine(db, machine_id)
         if not m:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Referenced machine not found")
 
-    new_op = OperationDB(
-        order_id=order_obj.id,
-        operation_code=str(op_code),
-        machine_id=machine_id,
-    )
-    db.add(new_op)
+    values = {"order_id": data["order_id"], "operation_code": str(op_code), "machine_id": machine_id}
+    # the order is checked by its foreign key, duplicate codes per order by uq_operationsdb_order_id_operation_code
+    try:
+        new_op = insert_unique(
+            db, OperationDB, values, [OperationDB.order_id, OperationDB.operation_code], tasks=[], machine=m
+        )
+    except IntegrityError as e:
+        db.rollback()
+        name = constraint_name(e)
+        if name == OPERATION_ORDER_FK:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Referenced order not found")
+        if name == OPERATION_MACHINE_FK:
+            # the machine was deleted after the lookup above
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Referenced machine not found")
+        raise
+    if new_op is None:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Operation code already exists for this order")
     db.commit()
-    db.refresh(new_op)
+    live.publish(live.operation_event("operation.created", new_op))
     return new_op
 
 
@@ -325,85 +772,91 @@ def patch_operation(operation_id: int, op_in: s.OperationUpdate, db: Session = D
 
     data = op_in.model_dump(exclude_unset=True)
 
-    # if updating operation_code, ensure uniqueness for the same order
-    if "operation_code" in data:
-        new_code = data["operation_code"]
-        conflict = db.query(OperationDB).filter(OperationDB.order_id == op.order_id, OperationDB.operation_code == new_code, OperationDB.id != op.id).first()
-        if conflict:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Another operation with this code exists for the same order")
-
     # if changing machine_id, validate it exists (allow null to clear)
     if "machine_id" in data:
         mid = data["machine_id"]
         if mid is not None:
-            m = db.query(MachineDB).filter(MachineDB.id == mid).first()
+            m = reference_cache.machine(db, mid)
             if not m:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Referenced machine not found")
 
+    old_order_id = op.order_id
     for k, v in data.items():
         setattr(op, k, v)
 
+    # the new order is checked by its foreign key, duplicate codes per order by the unique constraint
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        name = constraint_name(e)
+        if name == OPERATION_CODE_UNIQUE:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Another operation with this code exists for the same order")
+        if name == OPERATION_ORDER_FK:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Referenced order not found")
+        if name == OPERATION_MACHINE_FK:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Referenced machine not found")
+        raise
+
+    # moving an operation carries its counters to the other order
+    if op.order_id != old_order_id:
+        counters.recompute(db, [old_order_id, op.order_id])
+
     db.commit()
     db.refresh(op)
+    live.publish(live.operation_event("operation.updated", op))
     return op
 
 
 @router.delete("/operations/{operation_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Operations"], summary="Delete operation and its tasks")
 def delete_operation(operation_id: int, db: Session = Depends(get_db)):
-    op = db.query(OperationDB).filter(OperationDB.id == operation_id).first()
-    if not op:
+    # its tasks go with it (ON DELETE CASCADE)
+    op = deletes.delete_operation(db, operation_id)
+    if op is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
-
-    # delete tasks first
-    db.query(TaskDB).filter(TaskDB.operation_id == op.id).delete(synchronize_session=False)
-    db.delete(op)
+    counters.recompute(db, [op.order_id])
     db.commit()
+    live.publish(live.operation_event("operation.deleted", op))
     return None
 
 
 @router.get(
     "/operations/{operation_id}/pieces",
+    response_model=s.Progress,
     tags=["Operations"],
     summary="Return sum of good + bad pieces for an operation",
+    dependencies=[conditional(OperationDB.__tablename__)],
 )
 def get_total_pieces(operation_id: int, db: Session = Depends(get_db)):
-    # ensure operation exists
+    # counters are maintained on the operation row by every task write (db/counters.py)
     op = db.query(OperationDB).filter(OperationDB.id == operation_id).first()
     if not op:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
 
-    # Use SQLAlchemy func and coalesce to safely sum nullable columns
-    # Returns a single row with two fields (good_sum, bad_sum)
-    row = (
-        db.query(
-            func.coalesce(func.sum(TaskDB.good_pieces), 0).label("good_sum"),
-            func.coalesce(func.sum(TaskDB.bad_pieces), 0).label("bad_sum"),
-        )
-        .filter(TaskDB.operation_id == operation_id)
-        .one()
-    )
-
-    good = int(row.good_sum or 0)
-    bad = int(row.bad_sum or 0)
-    total = good + bad
-
-    return {"good_pieces": good, "bad_pieces": bad, "total_pieces": total}
+    return {
+        "good_pieces": op.good_pieces,
+        "bad_pieces": op.bad_pieces,
+        "total_pieces": op.good_pieces + op.bad_pieces,
+        "task_count": op.task_count,
+        "open_task_count": op.open_task_count,
+        "last_activity_at": op.last_activity_at,
+    }
 
 
 # -----------------------
 # Tasks
 # -----------------------
-@router.get("/task/{task_id}", response_model=s.Task, tags=["Tasks"], summary="Get task by id")
+@router.get("/task/{task_id}", response_model=s.Task, tags=["Tasks"], summary="Get task by id", dependencies=[conditional(*TASK_TABLES)])
 def get_task(task_id: int, db: Session = Depends(get_db)):
-    t = db.query(TaskDB).filter(TaskDB.id == task_id).first()
+    t = db.query(TaskDB).options(*task_load_options()).filter(TaskDB.id == task_id).first()
     if not t:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     return t
 
 
-@router.get("/operations/{operation_id}/tasks", response_model=List[s.Task], tags=["Tasks"], summary="List tasks for an operation")
+@router.get("/operations/{operation_id}/tasks", response_model=List[s.Task], tags=["Tasks"], summary="List tasks for an operation", dependencies=[conditional(*TASK_TABLES)])
 def get_tasks_for_operation(operation_id: int, db: Session = Depends(get_db)):
-    return db.query(TaskDB).filter(TaskDB.operation_id == operation_id).all()
+    return db.query(TaskDB).options(*task_load_options()).filter(TaskDB.operation_id == operation_id).all()
 
 
 @router.post("/operations/{operation_id}/tasks", response_model=s.Task, status_code=status.HTTP_201_CREATED, tags=["Tasks"], summary="Create task for operation")
@@ -416,7 +869,7 @@ def create_task(operation_id: int, task_in: s.TaskCreate, db: Session = Depends(
 
     # If operator_user_id provided, validate user exists and snapshot bitzer_id if not provided
     if "operator_user_id" in data and data["operator_user_id"] is not None:
-        user = db.query(UserDB).filter(UserDB.id == data["operator_user_id"]).first()
+        user = reference_cache.user(db, data["operator_user_id"])
         if not user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Referenced operator user not found")
         # snapshot bitzer_id if not provided
@@ -426,11 +879,123 @@ def create_task(operation_id: int, task_in: s.TaskCreate, db: Session = Depends(
     # create TaskDB with operation_id forced
     t = TaskDB(**data, operation_id=operation_id)
     db.add(t)
+    counters.apply_task_change(db, operation_id, counters.NO_CONTRIBUTION, counters.task_contribution(t))
     db.commit()
     db.refresh(t)
+    live.publish_task_changes(db, [(None, t)])
     return t
 
 
+def _snapshot_bitzer(data: dict, bitzer_by_user: dict) -> Optional[str]:
+    """Snapshot the operator's bitzer_id into `data` from pre-fetched users; return an error message if unknown."""
+    uid = data.get("operator_user_id")
+    if uid is None:
+        return None
+    if uid not in bitzer_by_user:
+        return "Referenced operator user not found"
+    if data.get("operator_bitzer_id") is None:
+        data["operator_bitzer_id"] = bitzer_by_user[uid]
+    return None
+
+
+@router.post("/tasks/batch", response_model=s.TaskBatchResponse, tags=["Tasks"], summary="Apply many task creates/updates/starts/stops in one transaction")
+def batch_tasks(payload: s.TaskBatchRequest, db: Session = Depends(get_db)):
+    items = payload.items
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    # one query each for the referenced tasks, operations and operator users
+    task_ids = {i.task_id for i in items if i.action != s.TaskBatchAction.create}
+    op_ids = {i.operation_id for i in items if i.action == s.TaskBatchAction.create}
+    user_ids = {i.task.operator_user_id for i in items if i.task is not None and i.task.operator_user_id is not None}
+
+    state_cols = (TaskDB.id, TaskDB.operation_id, TaskDB.good_pieces, TaskDB.bad_pieces, TaskDB.start_at, TaskDB.end_at)
+    original = {r.id: dict(r._mapping) for r in db.execute(select(*state_cols).where(TaskDB.id.in_(task_ids)))} if task_ids else {}
+    operations = set(db.scalars(select(OperationDB.id).where(OperationDB.id.in_(op_ids)))) if op_ids else set()
+    bitzer_by_user = reference_cache.bitzer_ids(db, user_ids) if user_ids else {}
+
+    state = {tid: dict(row) for tid, row in original.items()}
+    changed = defaultdict(dict)     # task_id -> column -> new value
+    creates = []                    # (item index, row)
+    results = []
+
+    for idx, item in enumerate(items):
+        error = None
+        if item.action == s.TaskBatchAction.create:
+            data = item.task.model_dump(exclude_unset=True)
+            if item.operation_id not in operations:
+                error = "Operation not found"
+            else:
+                error = _snapshot_bitzer(data, bitzer_by_user)
+            if not error:
+                creates.append((idx, {**data, "operation_id": item.operation_id}))
+        elif item.task_id not in state:
+            error = "Task not found"
+        else:
+            if item.action == s.TaskBatchAction.update:
+                data = item.task.model_dump(exclude_unset=True)
+                if "operator_user_id" in data and data["operator_user_id"] is None:
+                    data["operator_bitzer_id"] = None
+                else:
+                    error = _snapshot_bitzer(data, bitzer_by_user)
+            elif item.action == s.TaskBatchAction.start:
+                data = {"start_at": item.at or now, "end_at": None}
+            else:
+                data = {"end_at": item.at or now}
+                if item.good_pieces is not None:
+                    data["good_pieces"] = item.good_pieces
+                if item.bad_pieces is not None:
+                    data["bad_pieces"] = item.bad_pieces
+            if not error:
+                state[item.task_id].update(data)
+                changed[item.task_id].update(data)
+
+        results.append(s.TaskBatchResult(
+            index=idx,
+            action=item.action,
+            status="error" if error else "ok",
+            task_id=item.task_id,
+            detail=error,
+        ))
+
+    # tasks receiving identical values (e.g. a whole cell stopped at the same instant)
+    # share a single UPDATE ... WHERE id IN (...)
+    groups = defaultdict(list)
+    for tid, values in changed.items():
+        groups[tuple(sorted(values.items()))].append(tid)
+    for values, ids in groups.items():
+        db.execute(update(TaskDB).where(TaskDB.id.in_(ids)).values(dict(values)), execution_options={"synchronize_session": False})
+
+    if creates:
+        keys = set().union(*(row.keys() for _, row in creates))
+        rows = [{k: row.get(k) for k in keys} for _, row in creates]
+        new_ids = db.scalars(insert(TaskDB).returning(TaskDB.id, sort_by_parameter_order=True), rows).all()
+        for (idx, _), new_id in zip(creates, new_ids):
+            results[idx].task_id = new_id
+
+    # counters: one relative update per touched operation (and its order)
+    deltas = defaultdict(lambda: [counters.NO_CONTRIBUTION, counters.NO_CONTRIBUTION])
+    for tid in changed:
+        d = deltas[original[tid]["operation_id"]]
+        d[0] = counters.add(d[0], counters.row_contribution(original[tid]))
+        d[1] = counters.add(d[1], counters.row_contribution(state[tid]))
+    for _, row in creates:
+        d = deltas[row["operation_id"]]
+        d[1] = counters.add(d[1], counters.row_contribution(row))
+    for operation_id, (before, after) in sorted(deltas.items()):
+        counters.apply_task_change(db, operation_id, before, after)
+
+    db.commit()
+
+    if live.hub.active:
+        before_times = {tid: live.task_times(original[tid]) for tid in changed}
+        touched = [*changed, *(results[idx].task_id for idx, _ in creates)]
+        tasks = db.scalars(select(TaskDB).where(TaskDB.id.in_(touched))).all() if touched else []
+        live.publish_task_changes(db, [(before_times.get(t.id), t) for t in tasks])
+
+    failed = sum(1 for r in results if r.status == "error")
+    return {"applied": len(items) - failed, "failed": failed, "results": results}
+
+
 @router.put("/tasks/{task_id}", response_model=s.Task, tags=["Tasks"], summary="Update task (PUT)")
 def put_task(task_id: int, task_in: s.TaskUpdate, db: Session = Depends(get_db)):
     t = db.query(TaskDB).filter(TaskDB.id == task_id).first()
@@ -444,16 +1009,20 @@ def put_task(task_id: int, task_in: s.TaskUpdate, db: Session = Depends(get_db))
             # clearing operator
             data["operator_bitzer_id"] = None
         else:
-            user = db.query(UserDB).filter(UserDB.id == data["operator_user_id"]).first()
+            user = reference_cache.user(db, data["operator_user_id"])
             if not user:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Referenced operator user not found")
             if "operator_bitzer_id" not in data or data.get("operator_bitzer_id") is None:
                 data["operator_bitzer_id"] = user.bitzer_id
 
+    before = counters.task_contribution(t)
+    before_times = live.task_times(t)
     for k, v in data.items():
         setattr(t, k, v)
+    counters.apply_task_change(db, t.operation_id, before, counters.task_contribution(t))
     db.commit()
     db.refresh(t)
+    live.publish_task_changes(db, [(before_times, t)])
     return t
 
 
@@ -462,11 +1031,33 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     t = db.query(TaskDB).filter(TaskDB.id == task_id).first()
     if not t:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    before = counters.task_contribution(t)
+    change = (live.task_times(t), (t.id, t.operation_id))
     db.delete(t)
+    counters.apply_task_change(db, t.operation_id, before, counters.NO_CONTRIBUTION)
     db.commit()
+    live.publish_task_changes(db, [change])
     return None
 
 
-@router.get("/tasks", response_model=List[s.Task], tags=["Tasks"], summary="List all tasks")
-def list_tasks(db: Session = Depends(get_db)):
-    return db.query(TaskDB).all()
+@router.get("/tasks", response_model=List[s.Task], tags=["Tasks"], summary="List tasks (keyset paginated, filterable)", dependencies=[conditional(*TASK_TABLES)])
+def list_tasks(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to return every matching task"),
+    after: Optional[str] = Query(None, description="Cursor taken from the X-Next-Cursor header of the previous page"),
+    sort: s.TaskSortKey = Query(s.TaskSortKey.id, description="Sort key"),
+    desc: bool = Query(False, description="Sort descending"),
+    start_from: Optional[datetime.datetime] = Query(None, description="start_at >= start_from"),
+    start_to: Optional[datetime.datetime] = Query(None, description="start_at < start_to"),
+    fast: bool = FAST_QUERY,
+    db: Session = Depends(get_db),
+):
+    q = fastjson.task_rows_query(db) if fast else db.query(TaskDB).options(*task_load_options())
+    if start_from is not None:
+        q = q.filter(TaskDB.start_at >= start_from)
+    if start_to is not None:
+        q = q.filter(TaskDB.start_at < start_to)
+    rows = page(q, response, TASK_SORT_COLUMNS[sort], TaskDB.id, limit, after, desc)
+    if fast:
+        return fast_response(fastjson.assemble_tasks(rows), response)
+    return rows
@@ -0,0 +1,181 @@
+"""
+Async (asyncpg + AsyncSession) versions of the routes tablets hit at shift
+change: reading an operation and its tasks, and starting/stopping tasks.
+
+Enabled with DB_ASYNC=true (see db/database.py). main.py registers this router
+before api/orders.py, so these paths are served here and every other route
+keeps using the sync handlers. Behaviour and responses match the sync versions.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from db.database import AsyncSessionLocal
+from db.models import (
+    OperationDB,
+    TaskDB,
+    operation_load_options,
+    task_load_options,
+)
+from db import revisions, counters
+from db.reference_cache import reference_cache
+from db import schemas as s
+from api.orders import NotModified, ORDER_TABLES, TASK_TABLES, natural_key_query
+from api import live
+
+router = APIRouter()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def conditional(*tables: str):
+    """Async counterpart of api.orders.conditional."""
+    async def dependency(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+        etag = await db.run_sync(revisions.etag_for, tables)
+        if etag is None:
+            return
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = {c.strip() for c in if_none_match.split(",")}
+            if etag in candidates or "*" in candidates:
+                raise NotModified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return Depends(dependency)
+
+
+async def load_task(db: AsyncSession, task_id: int):
+    result = await db.execute(
+        select(TaskDB).options(*task_load_options()).where(TaskDB.id == task_id).execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+async def snapshot_operator(db: AsyncSession, data: dict):
+    """Validate operator_user_id and snapshot its bitzer_id, as the sync handlers do."""
+    user = await db.run_sync(reference_cache.user, data["operator_user_id"])
+    if not user:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Referenced operator user not found")
+    if "operator_bitzer_id" not in data or data.get("operator_bitzer_id") is None:
+        data["operator_bitzer_id"] = user.bitzer_id
+
+
+# -----------------------
+# Operations
+# -----------------------
+@router.get("/operation/{operation_id}", response_model=s.Operation, tags=["Operations"], summary="Get operation by id", dependencies=[conditional(*ORDER_TABLES)])
+async def get_operation(operation_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(OperationDB).options(*operation_load_options()).where(OperationDB.id == operation_id))
+    op = result.scalar_one_or_none()
+    if not op:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
+    return op
+
+
+@router.get("/operations/get_id", response_model=int, tags=["Operations"], summary="Get operation id by order_number and operation_code", dependencies=[conditional(*ORDER_TABLES)])
+async def get_operation_id(order_number: int, operation_code: str, db: AsyncSession = Depends(get_async_db)):
+    op_id = await db.scalar(natural_key_query(select(OperationDB.id), order_number, operation_code))
+    if op_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
+    return op_id
+
+
+@router.get(
+    "/operations/{operation_id}/pieces",
+    response_model=s.Progress,
+    tags=["Operations"],
+    summary="Return sum of good + bad pieces for an operation",
+    dependencies=[conditional(OperationDB.__tablename__)],
+)
+async def get_total_pieces(operation_id: int, db: AsyncSession = Depends(get_async_db)):
+    op = await db.get(OperationDB, operation_id)
+    if not op:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
+
+    return {
+        "good_pieces": op.good_pieces,
+        "bad_pieces": op.bad_pieces,
+        "total_pieces": op.good_pieces + op.bad_pieces,
+        "task_count": op.task_count,
+        "open_task_count": op.open_task_count,
+        "last_activity_at": op.last_activity_at,
+    }
+
+
+# -----------------------
+# Tasks
+# -----------------------
+@router.get("/task/{task_id}", response_model=s.Task, tags=["Tasks"], summary="Get task by id", dependencies=[conditional(*TASK_TABLES)])
+async def get_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    t = await load_task(db, task_id)
+    if not t:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return t
+
+
+@router.get("/operations/{operation_id}/tasks", response_model=List[s.Task], tags=["Tasks"], summary="List tasks for an operation", dependencies=[conditional(*TASK_TABLES)])
+async def get_tasks_for_operation(operation_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(TaskDB).options(*task_load_options()).where(TaskDB.operation_id == operation_id))
+    return result.scalars().all()
+
+
+@router.post("/operations/{operation_id}/tasks", response_model=s.Task, status_code=status.HTTP_201_CREATED, tags=["Tasks"], summary="Create task for operation")
+async def create_task(operation_id: int, task_in: s.TaskCreate, db: AsyncSession = Depends(get_async_db)):
+    op = await db.get(OperationDB, operation_id)
+    if not op:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
+
+    data = task_in.model_dump(exclude_unset=True)
+    if "operator_user_id" in data and data["operator_user_id"] is not None:
+        await snapshot_operator(db, data)
+
+    t = TaskDB(**data, operation_id=operation_id)
+    db.add(t)
+    await db.run_sync(counters.apply_task_change, operation_id, counters.NO_CONTRIBUTION, counters.task_contribution(t))
+    await db.commit()
+    t = await load_task(db, t.id)
+    await db.run_sync(live.publish_task_changes, [(None, t)])
+    return t
+
+
+@router.put("/tasks/{task_id}", response_model=s.Task, tags=["Tasks"], summary="Update task (PUT)")
+async def put_task(task_id: int, task_in: s.TaskUpdate, db: AsyncSession = Depends(get_async_db)):
+    t = await db.get(TaskDB, task_id)
+    if not t:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    data = task_in.model_dump(exclude_unset=True)
+
+    if "operator_user_id" in data:
+        if data["operator_user_id"] is None:
+            data["operator_bitzer_id"] = None
+        else:
+            await snapshot_operator(db, data)
+
+    before = counters.task_contribution(t)
+    before_times = live.task_times(t)
+    for k, v in data.items():
+        setattr(t, k, v)
+    await db.run_sync(counters.apply_task_change, t.operation_id, before, counters.task_contribution(t))
+    await db.commit()
+    t = await load_task(db, task_id)
+    await db.run_sync(live.publish_task_changes, [(before_times, t)])
+    return t
+
+
+@router.delete("/task/{task_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Tasks"], summary="Delete task")
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    t = await db.get(TaskDB, task_id)
+    if not t:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    before = counters.task_contribution(t)
+    change = (live.task_times(t), (t.id, t.operation_id))
+    await db.delete(t)
+    await db.run_sync(counters.apply_task_change, t.operation_id, before, counters.NO_CONTRIBUTION)
+    await db.commit()
+    await db.run_sync(live.publish_task_changes, [change])
+    return None
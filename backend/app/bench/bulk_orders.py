@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+bench/bulk_orders.py
+
+Measure order ingestion throughput against a live backend: POST /orders/bulk
+in batches versus the one-call-per-object path (POST /orders, POST /operations,
+POST /operations/{id}/tasks). Orders are created with consecutive numbers
+starting at --start, so pick a range that is free (or reset the orders
+tables afterwards with `python -m db.reset_db --orders`).
+
+Usage examples:
+  python -m bench.bulk_orders --url http://localhost:8000 --orders 2000
+  python -m bench.bulk_orders --orders 5000 --batch 500 --compare 200
+"""
+
+import argparse
+import random
+import time
+
+import httpx
+
+OPERATION_CODES = ["0010", "0040", "0110", "0210", "0310", "0410"]
+
+
+def gen_order(order_number: int, machine_ids, ops: int, tasks: int) -> dict:
+    return {
+        "order_number": order_number,
+        "material_number": random.randint(100000, 999999),
+        "start_date": "2025-03-01",
+        "end_date": "2025-03-14",
+        "num_pieces": random.randint(5, 200),
+        "operations": [
+            {
+                "operation_code": code,
+                "machine_id": random.choice(machine_ids) if machine_ids else None,
+                "tasks": [
+                    {
+                        "process_type": "PROCESSING",
+                        "start_at": "2025-03-02T08:00:00Z",
+                        "end_at": "2025-03-02T09:00:00Z",
+                        "good_pieces": random.randint(0, 50),
+                        "bad_pieces": random.randint(0, 5),
+                    }
+                    for _ in range(tasks)
+                ],
+            }
+            for code in OPERATION_CODES[:ops]
+        ],
+    }
+
+
+def run_bulk(client: httpx.Client, orders, batch: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(0, len(orders), batch):
+        r = client.post("/orders/bulk", json={"orders": orders[i:i + batch]})
+        r.raise_for_status()
+        failed = r.json()["failed"]
+        if failed:
+            raise SystemExit(f"{failed} orders rejected in batch starting at {i}; choose another --start")
+    return time.perf_counter() - t0
+
+
+def run_single(client: httpx.Client, orders) -> float:
+    t0 = time.perf_counter()
+    for o in orders:
+        header = {k: v for k, v in o.items() if k != "operations"}
+        r = client.post("/orders", json=header)
+        r.raise_for_status()
+        order_id = r.json()["id"]
+        for op in o["operations"]:
+            r = client.post("/operations", json={"order_id": order_id, "operation_code": op["operation_code"], "machine_id": op["machine_id"]})
+            r.raise_for_status()
+            op_id = r.json()["id"]
+            for t in op["tasks"]:
+                client.post(f"/operations/{op_id}/tasks", json=t).raise_for_status()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark POST /orders/bulk against per-object POSTs.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--orders", type=int, default=2000, help="Orders to ingest through /orders/bulk")
+    parser.add_argument("--batch", type=int, default=500, help="Orders per bulk request")
+    parser.add_argument("--operations", type=int, default=3, help="Operations per order")
+    parser.add_argument("--tasks", type=int, default=2, help="Tasks per operation")
+    parser.add_argument("--compare", type=int, default=100, metavar="N", help="Also ingest N orders one call at a time (0 to skip)")
+    parser.add_argument("--start", type=int, default=900000000, help="First order_number to use")
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.url, timeout=300) as client:
+        machine_ids = [m["id"] for m in client.get("/machines").json()]
+        bulk = [gen_order(args.start + i, machine_ids, args.operations, args.tasks) for i in range(args.orders)]
+        elapsed = run_bulk(client, bulk, args.batch)
+        print(f"bulk:   {args.orders} orders in {elapsed:.2f}s -> {args.orders / elapsed:,.0f} orders/s")
+
+        if args.compare:
+            single = [gen_order(args.start + args.orders + i, machine_ids, args.operations, args.tasks) for i in range(args.compare)]
+            elapsed_single = run_single(client, single)
+            rate_single = args.compare / elapsed_single
+            print(f"single: {args.compare} orders in {elapsed_single:.2f}s -> {rate_single:,.0f} orders/s")
+            print(f"speed-up: {(args.orders / elapsed) / rate_single:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
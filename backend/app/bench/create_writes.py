@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+bench/create_writes.py
+
+Write throughput of single-object creates (POST /orders and friends): the
+"SELECT for a duplicate, add, flush, commit, refresh" sequence the handlers
+used to run against the one INSERT ... ON CONFLICT DO NOTHING RETURNING of
+api.orders.insert_unique. Both run the same transaction around it (change
+stamp, revision bump, commit) on orders in the
+database named by DATABASE_URL, from --threads workers, and a share of the
+creates (--duplicates) reuse a taken order_number to exercise the 409 path.
+Round trips are counted at the cursor. With several threads a duplicate can
+pass the SELECT of the old sequence while its twin is being inserted; the
+unique constraint then fails the INSERT, which the handler answered with a
+500 ("raced" below). The gap in creates/s grows with the latency between the
+app and the database, so run it from the app host.
+
+Orders are created with consecutive numbers starting at --start and deleted
+at the end; point it at a scratch database all the same. Postgres only.
+
+Usage examples:
+  python -m bench.create_writes
+  python -m bench.create_writes --creates 5000 --threads 1 4 16 --duplicates 0.1
+"""
+
+import argparse
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete, event, exists
+from sqlalchemy.exc import IntegrityError
+
+from api.orders import insert_unique
+from db import archive
+from db.database import SessionLocal, engine
+from db.models import OrderDB, OrderArchiveDB
+
+_local = threading.local()
+
+
+def _count_statements(conn, cursor, statement, parameters, context, executemany):
+    _local.statements = getattr(_local, "statements", 0) + 1
+
+
+def check_then_insert(db, values: dict):
+    """The previous create_order body."""
+    existing = db.query(OrderDB).filter(OrderDB.order_number == values["order_number"]).first()
+    if existing or archive.archived_order_numbers(db, [values["order_number"]]):
+        return False
+    order = OrderDB(**values)
+    db.add(order)
+    db.flush()
+    db.commit()
+    db.refresh(order)
+    order.operations
+    return True
+
+
+def on_conflict_insert(db, values: dict):
+    """The create_order body after the change."""
+    archived = exists().where(OrderArchiveDB.order_number == values["order_number"])
+    created = insert_unique(db, OrderDB, values, [OrderDB.order_number], archived, operations=[])
+    if created is None or created[1]:
+        return False
+    db.commit()
+    return True
+
+
+PATTERNS = {"check-then-insert": check_then_insert, "on-conflict": on_conflict_insert}
+
+
+def run(create, numbers, threads: int):
+    """Returns (seconds, {outcome: count}, statements per create); outcomes are "created", "409" and "raced"."""
+    def one(number):
+        _local.statements = 0
+        with SessionLocal() as db:
+            try:
+                outcome = "created" if create(db, {"order_number": number, "material_number": 500000, "num_pieces": 10}) else "409"
+            except IntegrityError:
+                outcome = "raced"
+        return outcome, _local.statements
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(one, numbers))
+    elapsed = time.perf_counter() - t0
+    outcomes = {"created": 0, "409": 0, "raced": 0}
+    for outcome, _ in results:
+        outcomes[outcome] += 1
+    statements = sum(n for _, n in results) / len(results)
+    return elapsed, outcomes, statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark check-then-insert creates against INSERT ... ON CONFLICT.")
+    parser.add_argument("--creates", type=int, default=2000, help="Creates per pattern and thread count")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8], help="Concurrent writers to try")
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Share of creates that reuse a taken number")
+    parser.add_argument("--start", type=int, default=910000000, help="First order_number to use")
+    args = parser.parse_args()
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("Postgres only")
+
+    event.listen(engine, "before_cursor_execute", _count_statements)
+    counter = itertools.count(args.start)
+    rng = random.Random(7)
+    try:
+        print(f"{'pattern':<18} {'threads':>7} {'creates/s':>10} {'created':>8} {'409':>6} {'raced':>6} {'stmts/create':>13}")
+        for threads in args.threads:
+            for name, create in PATTERNS.items():
+                numbers = []
+                for _ in range(args.creates):
+                    if numbers and rng.random() < args.duplicates:
+                        numbers.append(rng.choice(numbers))
+                    else:
+                        numbers.append(next(counter))
+                elapsed, outcomes, statements = run(create, numbers, threads)
+                print(
+                    f"{name:<18} {threads:>7} {args.creates / elapsed:>10,.0f} {outcomes['created']:>8} "
+                    f"{outcomes['409']:>6} {outcomes['raced']:>6} {statements:>13.1f}"
+                )
+    finally:
+        event.remove(engine, "before_cursor_execute", _count_statements)
+        with SessionLocal() as db:
+            db.execute(delete(OrderDB).where(OrderDB.order_number.between(args.start, next(counter))))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
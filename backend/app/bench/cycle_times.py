@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+bench/cycle_times.py
+
+Benchmark the cycle-time statistics engine (db/cycle_times.py) at 10M tasks.
+
+By default the samples are synthetic arrays, which times the vectorized
+grouped statistics on their own and compares them with a plain Python
+group-by + statistics.quantiles over a smaller sample (--baseline).
+
+With --db the tasks are seeded into the database named by DATABASE_URL with
+generate_series and the whole /analytics/cycle-times path (streaming load,
+group mapping, statistics) is timed on them. Like bench/explain_check.py,
+everything runs in one transaction that is rolled back at the end; point it at
+a scratch database all the same. Postgres only.
+
+Usage examples:
+  python -m bench.cycle_times
+  python -m bench.cycle_times --tasks 10000000 --groups 5000 --baseline 500000
+  python -m bench.cycle_times --db --tasks 10000000 --tasks-per-operation 8
+"""
+
+import argparse
+import statistics
+import time
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from db.database import engine
+from db.cycle_times import BATCH_SIZE, cycle_time_stats, grouped_stats, load_groups, load_samples
+
+
+def synthetic(tasks: int, groups: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    group = rng.integers(0, groups, tasks)
+    # log-normal minutes per piece around a per-group mean, with a few stalls
+    centre = rng.uniform(0.5, 30.0, groups)
+    minutes = centre[group] * rng.lognormal(0.0, 0.25, tasks)
+    stalls = rng.random(tasks) < 0.002
+    minutes[stalls] *= rng.uniform(5, 50, stalls.sum())
+    return group, minutes
+
+
+def python_baseline(group, minutes) -> None:
+    by_group = defaultdict(list)
+    for g, m in zip(group.tolist(), minutes.tolist()):
+        by_group[g].append(m)
+    for values in by_group.values():
+        if len(values) > 1:
+            q = statistics.quantiles(values, n=100, method="inclusive")
+            q1, q3 = q[24], q[74]
+            fence = 1.5 * (q3 - q1)
+            sum(1 for v in values if v < q1 - fence or v > q3 + fence)
+        statistics.fmean(values)
+
+
+def run_synthetic(args) -> None:
+    t0 = time.perf_counter()
+    group, minutes = synthetic(args.tasks, args.groups)
+    print(f"generated {args.tasks:,} samples in {args.groups:,} groups in {time.perf_counter() - t0:.2f}s")
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        stats = grouped_stats(group, minutes)
+        best = min(best, time.perf_counter() - t0)
+    print(f"vectorized: {best:.2f}s -> {args.tasks / best:,.0f} samples/s "
+          f"({int(stats['outlier_count'].sum()):,} outliers)")
+
+    if args.baseline:
+        n = min(args.baseline, args.tasks)
+        t0 = time.perf_counter()
+        python_baseline(group[:n], minutes[:n])
+        elapsed = time.perf_counter() - t0
+        rate = n / elapsed
+        print(f"python:     {n:,} samples in {elapsed:.2f}s -> {rate:,.0f} samples/s "
+              f"(~{args.tasks / rate:.0f}s for {args.tasks:,})")
+        print(f"speed-up: {(args.tasks / best) / rate:.1f}x")
+
+
+def seed(conn, tasks: int, per_operation: int, machines: int, codes: int) -> None:
+    operations = -(-tasks // per_operation)
+    conn.execute(text(
+        "INSERT INTO machinesdb (machine_location, description, machine_id, machine_type, active) "
+        "SELECT 'cycle-bench-' || g, 'cycle time bench', g::text, 'CNC', true FROM generate_series(1, :n) g"
+    ), {"n": machines})
+    m_min = conn.scalar(text("SELECT min(id) FROM machinesdb WHERE machine_location LIKE 'cycle-bench-%'"))
+    base = conn.scalar(text("SELECT coalesce(max(order_number), 0) FROM ordersdb"))
+    # one operation per order keeps (order_id, operation_code) unique
+    conn.execute(text(
+        "INSERT INTO ordersdb (order_number, material_number, start_date, num_pieces) "
+        "SELECT :base + g, 100000 + g % 5000, date '2024-01-01' + g % 700, 100 FROM generate_series(1, :n) g"
+    ), {"base": base, "n": operations})
+    conn.execute(text(
+        "INSERT INTO operationsdb (order_id, operation_code, machine_id) "
+        "SELECT o.id, lpad(((o.id % :codes + 1) * 10)::text, 4, '0'), :m_min + o.id % :machines "
+        "FROM ordersdb o WHERE o.order_number > :base"
+    ), {"base": base, "codes": codes, "machines": machines, "m_min": m_min})
+    conn.execute(text(
+        "INSERT INTO tasksdb (operation_id, process_type, start_at, end_at, good_pieces, bad_pieces) "
+        "SELECT op.id, 'PROCESSING', "
+        "       timestamptz '2024-01-01' + (op.id % 20000) * interval '1 hour', "
+        "       timestamptz '2024-01-01' + (op.id % 20000) * interval '1 hour' "
+        "         + (1 + (op.id % 7) + random() * 3) * interval '1 minute' * (5 + k % 10), "
+        "       5 + k % 10, (random() < 0.1)::int "
+        "FROM operationsdb op JOIN ordersdb o ON o.id = op.order_id CROSS JOIN generate_series(1, :k) k "
+        "WHERE o.order_number > :base"
+    ), {"base": base, "k": per_operation})
+    conn.execute(text("ANALYZE ordersdb, operationsdb, tasksdb"))
+
+
+def run_db(args) -> None:
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("--db needs Postgres (DATABASE_URL)")
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            t0 = time.perf_counter()
+            seed(conn, args.tasks, args.tasks_per_operation, args.machines, args.codes)
+            print(f"seeded ~{args.tasks:,} tasks in {time.perf_counter() - t0:.1f}s")
+
+            db = Session(bind=conn)
+            t0 = time.perf_counter()
+            samples = load_samples(db, batch_size=args.batch)
+            t_load = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            sample_group, keys = load_groups(db, samples, batch_size=args.batch)
+            t_groups = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            grouped_stats(sample_group, samples.minutes)
+            t_stats = time.perf_counter() - t0
+            print(f"load samples:   {t_load:6.2f}s  ({len(samples) / t_load:,.0f} rows/s, {len(samples):,} samples)")
+            print(f"map operations: {t_groups:6.2f}s  ({len(keys):,} groups)")
+            print(f"statistics:     {t_stats:6.2f}s")
+
+            t0 = time.perf_counter()
+            rows = cycle_time_stats(db)
+            print(f"end to end (cycle_time_stats): {time.perf_counter() - t0:.2f}s, {len(rows):,} groups")
+            db.close()
+        finally:
+            trans.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cycle-time statistics at 10M tasks.")
+    parser.add_argument("--tasks", type=int, default=10_000_000)
+    parser.add_argument("--groups", type=int, default=2000, help="(operation code, machine) groups in synthetic mode")
+    parser.add_argument("--repeat", type=int, default=3, help="Synthetic runs; the best is reported")
+    parser.add_argument("--baseline", type=int, default=1_000_000, metavar="N", help="Samples for the pure Python comparison (0 to skip)")
+    parser.add_argument("--db", action="store_true", help="Seed the tasks into Postgres and time the full load + statistics path")
+    parser.add_argument("--tasks-per-operation", type=int, default=8)
+    parser.add_argument("--machines", type=int, default=200)
+    parser.add_argument("--codes", type=int, default=12, help="Distinct operation codes")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Rows fetched per batch")
+    args = parser.parse_args()
+
+    if args.db:
+        run_db(args)
+    else:
+        run_synthetic(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+bench/explain_check.py
+
+Plan regression check for the hot queries behind api/orders.py. Seeds a large
+synthetic dataset, ANALYZEs, runs EXPLAIN (FORMAT JSON) on every query below
+and exits with status 1 if any of them falls back to a sequential scan on
+ordersdb, operationsdb or tasksdb (the small machines/users tables may scan).
+Scans of non-empty tasksdb partitions count as tasksdb; the start_at window
+queries read most of a month and are checked for partition pruning instead.
+
+Everything happens in one transaction that is rolled back at the end, so the
+target database is left untouched; still, point it at a scratch copy rather
+than production. Postgres only (reads DATABASE_URL like the app).
+
+tests/test_query_plans.py runs the same check on a smaller dataset as part of
+the test suite; this script is for trying other sizes and reading the plans.
+
+Usage examples:
+  python -m bench.explain_check
+  python -m bench.explain_check --orders 50000 --operations 4 --tasks 8 --verbose
+"""
+
+import argparse
+import datetime
+import sys
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import func, select, text, tuple_
+
+from db.database import engine
+from db.models import OrderDB, OperationDB, TaskDB
+from db.partitions import ensure_partitions
+from api.orders import natural_key_query
+
+CHECKED_TABLES = {OrderDB.__tablename__, OperationDB.__tablename__, TaskDB.__tablename__}
+
+SEED_START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+WINDOW = (datetime.datetime(2024, 6, 10, tzinfo=datetime.timezone.utc), datetime.datetime(2024, 6, 20, tzinfo=datetime.timezone.utc))
+
+# query name -> most tasksdb partitions its plan may touch (sequential scans allowed)
+PRUNED = {"tasks in a start_at window": 1, "tasks page in a start_at window": 1}
+
+
+def seed(conn, orders: int, operations: int, tasks: int, machines: int, users: int) -> dict:
+    base = conn.scalar(text("SELECT coalesce(max(order_number), 0) FROM ordersdb"))
+    conn.execute(text(
+        "INSERT INTO machinesdb (machine_location, description, machine_id, machine_type, active) "
+        "SELECT 'explain-check-' || g, 'explain check', g::text, 'CNC', true FROM generate_series(1, :n) g"
+    ), {"n": machines})
+    conn.execute(text(
+        "INSERT INTO users (name, active, is_admin) "
+        "SELECT 'explain-check-' || g, true, false FROM generate_series(1, :n) g"
+    ), {"n": users})
+    m_min, m_max = conn.execute(text("SELECT min(id), max(id) FROM machinesdb WHERE machine_location LIKE 'explain-check-%'")).one()
+    u_min, u_max = conn.execute(text("SELECT min(id), max(id) FROM users WHERE name LIKE 'explain-check-%'")).one()
+
+    conn.execute(text(
+        "INSERT INTO ordersdb (order_number, material_number, start_date, end_date, num_pieces, change_stamp) "
+        "SELECT :base + g, 100000 + g % 5000, date '2024-01-01' + g % 700, date '2024-01-15' + g % 700, 100, g "
+        "FROM generate_series(1, :n) g"
+    ), {"base": base, "n": orders})
+    conn.execute(text(
+        "INSERT INTO operationsdb (order_id, operation_code, machine_id, change_stamp) "
+        "SELECT o.id, lpad((k * 10)::text, 4, '0'), :m_min + (o.id + k) % (:m_max - :m_min + 1), o.id * 10 + k "
+        "FROM ordersdb o CROSS JOIN generate_series(1, :k) k WHERE o.order_number > :base"
+    ), {"base": base, "k": operations, "m_min": m_min, "m_max": m_max})
+    # without statistics for the new rows the join below can be planned as nested loops over seq scans
+    conn.execute(text("ANALYZE ordersdb, operationsdb"))
+    # month partitions for the seeded range, so the tasks do not all land in the default partition
+    ensure_partitions(conn, since=SEED_START.date())
+    conn.execute(text(
+        "INSERT INTO tasksdb (operation_id, process_type, operator_user_id, start_at, end_at, good_pieces, bad_pieces, change_stamp) "
+        "SELECT op.id, 'PROCESSING', :u_min + (op.id + k) % (:u_max - :u_min + 1), "
+        "       timestamptz '2024-01-01' + (op.id % 20000) * interval '1 hour' + k * interval '5 minutes', "
+        "       timestamptz '2024-01-01' + (op.id % 20000) * interval '1 hour' + k * interval '5 minutes' + interval '4 minutes', "
+        "       10, 1, op.id * 100 + k "
+        "FROM operationsdb op JOIN ordersdb o ON o.id = op.order_id CROSS JOIN generate_series(1, :k) k "
+        "WHERE o.order_number > :base"
+    ), {"base": base, "k": tasks, "u_min": u_min, "u_max": u_max})
+    conn.execute(text("ANALYZE ordersdb, operationsdb, tasksdb, machinesdb, users"))
+
+    # representative ids from the middle of the seeded ranges
+    order_number = base + orders // 2
+    order_id, op_id = conn.execute(
+        select(OrderDB.id, OperationDB.id).join(OperationDB, OperationDB.order_id == OrderDB.id).where(OrderDB.order_number == order_number).limit(1)
+    ).one()
+    return {
+        "order_number": order_number,
+        "order_ids": list(range(order_id, order_id + 20)),
+        "operation_id": op_id,
+        "machine_id": (m_min + m_max) // 2,
+        "user_id": (u_min + u_max) // 2,
+        "stamp": conn.scalar(select(func.max(TaskDB.change_stamp))) - 100,
+    }
+
+
+def hot_queries(ids: dict):
+    """(name, statement) for the lookups the API runs on every request or write."""
+    return [
+        ("order by order_number", select(OrderDB).where(OrderDB.order_number == ids["order_number"])),
+        ("orders page by start_date", select(OrderDB).order_by(OrderDB.start_date, OrderDB.id).limit(50)),
+        ("orders page after a start_date cursor", select(OrderDB).where(tuple_(OrderDB.start_date, OrderDB.id) > (WINDOW[0].date(), ids["order_ids"][0])).order_by(OrderDB.start_date, OrderDB.id).limit(50)),
+        ("operations of orders (selectinload)", select(OperationDB).where(OperationDB.order_id.in_(ids["order_ids"]))),
+        ("operation by natural key", natural_key_query(select(OperationDB.id), ids["order_number"], "0010")),
+        ("tasks for operation", select(TaskDB).where(TaskDB.operation_id == ids["operation_id"])),
+        ("operation counters activity", select(func.max(func.coalesce(TaskDB.end_at, TaskDB.start_at))).where(TaskDB.operation_id == ids["operation_id"])),
+        ("tasks page by start_at", select(TaskDB).order_by(TaskDB.start_at, TaskDB.id).limit(50)),
+        ("tasks page after a start_at cursor", select(TaskDB).where(tuple_(TaskDB.start_at, TaskDB.id) > (WINDOW[0], 0)).order_by(TaskDB.start_at, TaskDB.id).limit(50)),
+        ("tasks in a start_at window", select(TaskDB).where(TaskDB.start_at >= WINDOW[0], TaskDB.start_at < WINDOW[1])),
+        ("tasks page in a start_at window", select(TaskDB).where(TaskDB.start_at >= WINDOW[0], TaskDB.start_at < WINDOW[1]).order_by(TaskDB.id).limit(50)),
+        ("delete_user reference check", select(TaskDB.id).where(TaskDB.operator_user_id == ids["user_id"]).limit(1)),
+        ("delete_machine reference check", select(OperationDB.id).where(OperationDB.machine_id == ids["machine_id"]).limit(1)),
+        ("task changes since cursor", select(TaskDB.id).where(TaskDB.change_stamp > ids["stamp"])),
+    ]
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from plan_nodes(child)
+
+
+def table_of(relation: str) -> str:
+    """Parent table of a tasksdb partition, other relations unchanged."""
+    return TaskDB.__tablename__ if relation.startswith(TaskDB.__tablename__ + "_") else relation
+
+
+def explain(conn, stmt) -> dict:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return conn.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()[0]["Plan"]
+
+
+class PlanCheck(NamedTuple):
+    name: str
+    plan: dict
+    nodes: List[dict]
+    problem: Optional[str]  # None when the plan is fine
+
+    @property
+    def indexes(self) -> List[str]:
+        return sorted({n["Index Name"] for n in self.nodes if "Index Name" in n})
+
+
+def check_plans(conn, ids: dict) -> List[PlanCheck]:
+    """EXPLAIN every hot query against the seeded data and say what, if anything, is wrong with its plan."""
+    # the planner rightly seq-scans the empty future months
+    filled = set(conn.scalars(text(f"SELECT DISTINCT tableoid::regclass::text FROM {TaskDB.__tablename__}")))
+    checks = []
+    for name, stmt in hot_queries(ids):
+        plan = explain(conn, stmt)
+        nodes = list(plan_nodes(plan))
+        problem = None
+        if name in PRUNED:
+            partitions = {n["Relation Name"] for n in nodes if n.get("Relation Name", "").startswith(TaskDB.__tablename__ + "_")}
+            if len(partitions) > PRUNED[name]:
+                problem = f"{len(partitions)} PARTITIONS"
+        else:
+            scans = [
+                n["Relation Name"] for n in nodes
+                if n["Node Type"] == "Seq Scan" and table_of(n.get("Relation Name", "")) in CHECKED_TABLES
+                and (table_of(n["Relation Name"]) == n["Relation Name"] or n["Relation Name"] in filled)
+            ]
+            if scans:
+                problem = "SEQ SCAN on " + ", ".join(scans)
+        checks.append(PlanCheck(name, plan, nodes, problem))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if a hot API query sequential-scans a large table.")
+    parser.add_argument("--orders", type=int, default=20000, help="Orders to seed")
+    parser.add_argument("--operations", type=int, default=4, help="Operations per order")
+    parser.add_argument("--tasks", type=int, default=6, help="Tasks per operation")
+    # enough distinct machines/users that the "any reference?" LIMIT 1 checks stay selective
+    parser.add_argument("--machines", type=int, default=500)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true", help="Print every plan node")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("explain_check needs Postgres (DATABASE_URL)")
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            ids = seed(conn, args.orders, args.operations, args.tasks, args.machines, args.users)
+            checks = check_plans(conn, ids)
+        finally:
+            trans.rollback()
+
+    for c in checks:
+        print(f"{c.name:<38} {c.problem or 'ok':<30} cost={c.plan['Total Cost']:<10} {', '.join(c.indexes)}")
+        if args.verbose:
+            for n in c.nodes:
+                print(f"    {n['Node Type']} {n.get('Relation Name', '')} {n.get('Index Name', '')}")
+
+    failures = [c.name for c in checks if c.problem]
+    if failures:
+        print(f"\n{len(failures)} quer{'y' if len(failures) == 1 else 'ies'} fell back to a sequential scan or an unpruned partition scan: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nall hot queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
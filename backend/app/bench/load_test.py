@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+bench/load_test.py
+
+Shift-change load test: many tablets reading an operation and starting /
+stopping tasks at the same moment. Run it against a live backend twice, once
+started normally and once with DB_ASYNC=true, and compare the numbers.
+
+The target must contain at least one operation (e.g. `python -m db.seed_db
+--machines 10 --users 10 --orders 20`). Tasks created by the run are deleted
+at the end.
+
+Usage examples:
+  python -m bench.load_test --url http://localhost:8000 --operation 1
+  python -m bench.load_test --url http://localhost:8000 --operation 1 --concurrency 50 100 200 --requests 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+
+async def tablet_cycle(client: httpx.AsyncClient, operation_id: int, created: list) -> None:
+    """One tablet at shift change: open the operation, start a task, stop it."""
+    r = await client.get(f"/operation/{operation_id}")
+    r.raise_for_status()
+    r = await client.get(f"/operations/{operation_id}/tasks")
+    r.raise_for_status()
+    now = datetime.now(timezone.utc).isoformat()
+    r = await client.post(f"/operations/{operation_id}/tasks", json={"process_type": "PROCESSING", "start_at": now})
+    r.raise_for_status()
+    task_id = r.json()["id"]
+    created.append(task_id)
+    r = await client.put(f"/tasks/{task_id}", json={"end_at": datetime.now(timezone.utc).isoformat(), "good_pieces": 1})
+    r.raise_for_status()
+
+
+async def run_level(url: str, operation_id: int, concurrency: int, cycles: int, created: list):
+    latencies = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def one():
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    await tablet_cycle(client, operation_id, created)
+                    latencies.append(time.perf_counter() - t0)
+                except httpx.HTTPError:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(cycles)))
+        elapsed = time.perf_counter() - t0
+
+    return elapsed, latencies, errors
+
+
+async def cleanup(url: str, task_ids: list) -> None:
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        for i in range(0, len(task_ids), 50):
+            await asyncio.gather(*(client.delete(f"/task/{tid}") for tid in task_ids[i:i + 50]))
+
+
+def pct(values, p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def main_async(args) -> None:
+    created: list = []
+    try:
+        print(f"{'concurrency':>11} {'cycles/s':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for level in args.concurrency:
+            elapsed, lat, errors = await run_level(args.url, args.operation, level, args.requests, created)
+            ok = len(lat)
+            print(
+                f"{level:>11} {ok / elapsed:>9.1f} {4 * ok / elapsed:>8.1f} "
+                f"{statistics.median(lat) * 1000 if lat else float('nan'):>8.1f} "
+                f"{pct(lat, 95) * 1000:>8.1f} {pct(lat, 99) * 1000:>8.1f} {errors:>6}"
+            )
+    finally:
+        if not args.keep:
+            await cleanup(args.url, created)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent tablet load test (compare DB_ASYNC=false vs true).")
+    parser.add_argument("--url", default="http://localhost:8000", help="Backend base URL")
+    parser.add_argument("--operation", type=int, required=True, help="Existing operation id to exercise")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100, 200], help="Concurrent tablets per level")
+    parser.add_argument("--requests", type=int, default=1000, help="Tablet cycles (4 requests each) per level")
+    parser.add_argument("--keep", action="store_true", help="Do not delete the tasks created by the run")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+bench/serialization.py
+
+Compare the regular response path (ORM objects -> response_model validation ->
+JSON) with the orjson fast path in db/fastjson.py on a synthetic /orders
+payload. No database is needed: the ORM objects are built transiently and the
+fast path is fed the equivalent row tuples.
+
+Usage examples:
+  python -m bench.serialization
+  python -m bench.serialization --orders 2000 --operations 4 --tasks 5 --repeat 5
+"""
+
+import argparse
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from pydantic import TypeAdapter
+
+from db import fastjson
+from db import schemas as s
+from db.models import OrderDB, OperationDB, TaskDB, MachineDB, UserDB, ProcessType, MachineType
+
+
+def build_dataset(n_orders: int, ops_per_order: int, tasks_per_op: int):
+    """Return (orm_orders, order_rows, operation_rows, task_rows) describing the same tree."""
+    machine = MachineDB(id=1, machine_location="11100", description="Serra de Corte", machine_id="10000995", machine_type=MachineType.CNC, active=True)
+    user = UserDB(id=1, name="Ana Silva", bitzer_id=1234, active=True, is_admin=False, created_at=datetime(2025, 1, 1, tzinfo=timezone.utc), updated_at=None)
+    start = datetime(2025, 3, 1, 8, 0, tzinfo=timezone.utc)
+
+    orm_orders: List[OrderDB] = []
+    order_rows, operation_rows, task_rows = [], [], []
+    op_id = task_id = 0
+    for o in range(1, n_orders + 1):
+        order = OrderDB(id=o, order_number=100000 + o, material_number=500000 + o, start_date=date(2025, 3, 1), end_date=date(2025, 3, 14), num_pieces=120)
+        order_rows.append((order.material_number, order.start_date, order.end_date, order.num_pieces, order.id, order.order_number))
+        for _ in range(ops_per_order):
+            op_id += 1
+            op = OperationDB(id=op_id, order_id=o, operation_code="0040", machine_id=machine.id)
+            op.machine = machine
+            operation_rows.append((o, "0040", machine.id, op_id, machine.machine_location, machine.description, machine.machine_id, machine.machine_type, machine.active, machine.id))
+            for _ in range(tasks_per_op):
+                task_id += 1
+                t_start = start + timedelta(minutes=task_id)
+                t = TaskDB(
+                    id=task_id, operation_id=op_id, process_type=ProcessType.PROCESSING, start_at=t_start, end_at=t_start + timedelta(hours=1),
+                    num_benches=1, num_machines=1, good_pieces=20, bad_pieces=1, operator_user_id=user.id, operator_bitzer_id=user.bitzer_id, notes=None,
+                )
+                t.operator_user = user
+                op.tasks.append(t)
+                task_rows.append((
+                    t.process_type, t.start_at, t.end_at, t.num_benches, t.num_machines, t.good_pieces, t.bad_pieces,
+                    t.operator_user_id, t.operator_bitzer_id, t.notes, t.id, t.operation_id,
+                    user.name, user.bitzer_id, user.active, user.is_admin, user.id, user.created_at, user.updated_at,
+                ))
+            order.operations.append(op)
+        orm_orders.append(order)
+    return orm_orders, order_rows, operation_rows, task_rows
+
+
+def regular_path(adapter: TypeAdapter, orm_orders) -> bytes:
+    # what FastAPI does with response_model=List[s.Order]: validate from attributes, then dump
+    return adapter.dump_json(adapter.validate_python(orm_orders, from_attributes=True))
+
+
+def fast_path(order_rows, operation_rows, task_rows) -> bytes:
+    ops = fastjson.assemble_operations(operation_rows, fastjson.assemble_tasks(task_rows))
+    return fastjson.dumps(fastjson.assemble_orders(order_rows, ops))
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization for /orders.")
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--operations", type=int, default=3, help="Operations per order")
+    parser.add_argument("--tasks", type=int, default=4, help="Tasks per operation")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the best time is reported")
+    args = parser.parse_args()
+
+    orm_orders, order_rows, operation_rows, task_rows = build_dataset(args.orders, args.operations, args.tasks)
+    adapter = TypeAdapter(List[s.Order])
+
+    a = regular_path(adapter, orm_orders)
+    b = fast_path(order_rows, operation_rows, task_rows)
+    print(f"Payload: {args.orders} orders, {len(operation_rows)} operations, {len(task_rows)} tasks, {len(b) / 1e6:.2f} MB")
+    print(f"Identical JSON: {a == b}")
+
+    t_regular = timed(lambda: regular_path(adapter, orm_orders), args.repeat)
+    t_fast = timed(lambda: fast_path(order_rows, operation_rows, task_rows), args.repeat)
+    print(f"regular (response_model): {t_regular * 1000:8.1f} ms  {args.orders / t_regular:10.0f} orders/s")
+    print(f"fast (orjson):            {t_fast * 1000:8.1f} ms  {args.orders / t_fast:10.0f} orders/s")
+    print(f"speed-up: {t_regular / t_fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+load_dotenv()
+
+
+class Settings(BaseSettings):
+    """Backend configuration, read from environment variables (or .env)."""
+
+    model_config = SettingsConfigDict(extra="ignore")
+
+    database_url: Optional[str] = None
+
+    # DB_ASYNC=true serves the hot task/operation routes from api/orders_async.py
+    # through asyncpg instead of the psycopg2 threadpool path
+    db_async: bool = False
+    async_database_url: Optional[str] = None
+
+    # connection pool (applies to the sync and the async engine separately)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0       # seconds to wait for a free connection
+    db_pool_recycle: int = 1800         # seconds before a connection is replaced
+    db_pool_pre_ping: bool = True
+
+    # in-process cache of machines and users (db/reference_cache.py); ttl 0 disables it
+    reference_cache_ttl: float = 300.0              # seconds
+    reference_cache_max_entries: int = 5000         # per table; larger tables are not cached
+
+    # plant calendar for /analytics: IANA time zone and shift start times (HH:MM, comma separated)
+    plant_timezone: str = "UTC"
+    plant_shifts: str = "06:00,14:00,22:00"
+
+    # seconds between incremental refreshes of the task rollups (db/rollups.py); 0 disables
+    rollup_refresh_interval: float = 60.0
+
+    # seconds a cached /analytics/cycle-times result is served after tasks or operations change
+    cycle_time_cache_ttl: float = 60.0
+
+    # orders whose end_date is this many days past, with every task closed, are moved to the archive tables
+    archive_after_days: int = 180
+
+    # bulk delete jobs (db/deletes.py): orders deleted per transaction, and seconds between
+    # each worker's checks for queued jobs (0 disables the runner in this worker)
+    delete_batch_size: int = 100
+    delete_job_poll_interval: float = 10.0
+
+
+settings = Settings()
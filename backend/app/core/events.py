@@ -0,0 +1,101 @@
+"""
+core/events.py
+
+In-process publish/subscribe hub behind the live feed (api/live.py).
+
+Write handlers publish plain dict events after their transaction commits;
+every connected WebSocket/SSE client owns a Subscription with a bounded queue
+and optional order/operation/machine filters. publish() may be called from the
+threadpool (sync handlers) or the event loop (async handlers).
+
+A client that falls more than QUEUE_SIZE events behind gets a single
+{"type": "resync"} instead of the backlog and should re-fetch what it shows.
+Events only reach clients connected to the worker process that handled the
+write.
+"""
+
+import asyncio
+import threading
+from typing import Iterable, Optional, Set
+
+QUEUE_SIZE = 256
+
+RESYNC_EVENT = {"type": "resync"}
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, order_ids=(), operation_ids=(), machine_ids=()):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+        self.set_filters(order_ids, operation_ids, machine_ids)
+
+    def set_filters(self, order_ids: Iterable[int] = (), operation_ids: Iterable[int] = (), machine_ids: Iterable[int] = ()) -> None:
+        """Replace the filters; an event matches if any of its ids is subscribed (no filters = everything)."""
+        self.order_ids: Set[int] = set(order_ids or ())
+        self.operation_ids: Set[int] = set(operation_ids or ())
+        self.machine_ids: Set[int] = set(machine_ids or ())
+
+    def matches(self, event: dict) -> bool:
+        if not (self.order_ids or self.operation_ids or self.machine_ids):
+            return True
+        return (
+            event.get("order_id") in self.order_ids
+            or event.get("operation_id") in self.operation_ids
+            or event.get("machine_id") in self.machine_ids
+        )
+
+    def _offer(self, event: dict) -> None:
+        # runs on the subscriber's loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self) -> dict:
+        if self.overflowed:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflowed = False
+            return RESYNC_EVENT
+        return await self.queue.get()
+
+
+class EventHub:
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """True while at least one client is connected, so publishers can skip building events."""
+        return bool(self._subscriptions)
+
+    def subscribe(self, order_ids=(), operation_ids=(), machine_ids=()) -> Subscription:
+        """Register a subscription on the running event loop."""
+        sub = Subscription(asyncio.get_running_loop(), order_ids, operation_ids, machine_ids)
+        with self._lock:
+            self._subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(sub)
+
+    def publish(self, event: Optional[dict]) -> None:
+        if not event:
+            return
+        with self._lock:
+            subs = list(self._subscriptions)
+        for sub in subs:
+            if sub.matches(event):
+                try:
+                    sub.loop.call_soon_threadsafe(sub._offer, event)
+                except RuntimeError:
+                    # loop already closed; the connection is going away
+                    self.unsubscribe(sub)
+
+
+hub = EventHub()
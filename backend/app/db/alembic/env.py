@@ -10,6 +10,8 @@ import os
 
 # Go two levels up to the project root (/backend)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+# ...and the app root itself, which the app modules import from (e.g. core.config)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from app.db.database import Base
 import app.db.models
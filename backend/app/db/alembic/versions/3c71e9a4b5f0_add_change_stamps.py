@@ -0,0 +1,50 @@
+"""Add change stamps and deleted_rows tombstones for delta sync
+
+Revision ID: 3c71e9a4b5f0
+Revises: 8f3a6d1c9e27
+Create Date: 2026-10-16 12:41:37.215604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c71e9a4b5f0'
+down_revision: Union[str, Sequence[str], None] = '8f3a6d1c9e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STAMPED_TABLES = ('ordersdb', 'operationsdb', 'tasksdb', 'machinesdb', 'users')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows keep a NULL stamp: they predate the first cursor any client can hold
+    for table in STAMPED_TABLES:
+        op.add_column(table, sa.Column('change_stamp', sa.BigInteger(), nullable=True))
+        op.create_index(f'ix_{table}_change_stamp', table, ['change_stamp'], unique=False)
+
+    op.create_table(
+        'deleted_rows',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('change_stamp', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_deleted_rows_change_stamp', 'deleted_rows', ['change_stamp'], unique=False)
+
+    op.execute("INSERT INTO table_revisions (table_name, revision) VALUES ('_changes', 0)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM table_revisions WHERE table_name = '_changes'")
+    op.drop_index('ix_deleted_rows_change_stamp', table_name='deleted_rows')
+    op.drop_table('deleted_rows')
+    for table in STAMPED_TABLES:
+        op.drop_index(f'ix_{table}_change_stamp', table_name=table)
+        op.drop_column(table, 'change_stamp')
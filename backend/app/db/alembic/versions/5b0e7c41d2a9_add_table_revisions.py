@@ -0,0 +1,37 @@
+"""Add table_revisions counters for ETags
+
+Revision ID: 5b0e7c41d2a9
+Revises: ce8cba02c26b
+Create Date: 2026-10-16 10:02:41.553870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e7c41d2a9'
+down_revision: Union[str, Sequence[str], None] = 'ce8cba02c26b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table = op.create_table(
+        'table_revisions',
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('revision', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('table_name'),
+    )
+    op.bulk_insert(table, [
+        {'table_name': name, 'revision': 0}
+        for name in ('ordersdb', 'operationsdb', 'tasksdb', 'machinesdb', 'users')
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('table_revisions')
@@ -0,0 +1,86 @@
+"""Add hourly/daily task rollup tables with their refresh state
+
+Revision ID: 5e2b9c7d4f18
+Revises: e17b5c93a0d4
+Create Date: 2026-10-16 16:05:12.408311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b9c7d4f18'
+down_revision: Union[str, Sequence[str], None] = 'e17b5c93a0d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the enum type already exists for tasksdb.process_type
+PROCESS_TYPE = postgresql.ENUM('PREPARATION', 'QUALITY_CONTROL', 'PROCESSING', name='processtype', create_type=False)
+
+
+def rollup_columns():
+    return [
+        sa.Column('machine_id', sa.Integer(), nullable=True),
+        sa.Column('operation_code', sa.String(), nullable=True),
+        sa.Column('operator_user_id', sa.Integer(), nullable=True),
+        sa.Column('process_type', PROCESS_TYPE, nullable=False),
+        sa.Column('task_count', sa.Integer(), nullable=False),
+        sa.Column('good_pieces', sa.Integer(), nullable=False),
+        sa.Column('bad_pieces', sa.Integer(), nullable=False),
+        sa.Column('busy_minutes', sa.Float(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_rollup_hourly',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        *rollup_columns(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_task_rollup_hourly_bucket_start', 'task_rollup_hourly', ['bucket_start'], unique=False)
+
+    op.create_table(
+        'task_rollup_daily',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        *rollup_columns(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_task_rollup_daily_day', 'task_rollup_daily', ['day'], unique=False)
+
+    op.create_table(
+        'rollup_dirty',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('start_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('change_stamp', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_rollup_dirty_change_stamp', 'rollup_dirty', ['change_stamp'], unique=False)
+
+    op.create_table(
+        'rollup_state',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('watermark', sa.BigInteger(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    # existing history is loaded with `python -m db.backfill_rollups`
+    op.execute("INSERT INTO rollup_state (name, watermark) VALUES ('tasks', 0)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rollup_state')
+    op.drop_index('ix_rollup_dirty_change_stamp', table_name='rollup_dirty')
+    op.drop_table('rollup_dirty')
+    op.drop_index('ix_task_rollup_daily_day', table_name='task_rollup_daily')
+    op.drop_table('task_rollup_daily')
+    op.drop_index('ix_task_rollup_hourly_bucket_start', table_name='task_rollup_hourly')
+    op.drop_table('task_rollup_hourly')
@@ -0,0 +1,72 @@
+"""Add progress counters to operations and orders
+
+Revision ID: 8f3a6d1c9e27
+Revises: 5b0e7c41d2a9
+Create Date: 2026-10-16 11:20:13.704215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a6d1c9e27'
+down_revision: Union[str, Sequence[str], None] = '5b0e7c41d2a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTER_TABLES = ('operationsdb', 'ordersdb')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in COUNTER_TABLES:
+        op.add_column(table, sa.Column('good_pieces', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('bad_pieces', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('task_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('open_task_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=True))
+
+    # backfill from existing history (same result as `python -m db.repair_counters`)
+    op.execute("""
+        UPDATE operationsdb o SET
+            good_pieces = s.good, bad_pieces = s.bad, task_count = s.tasks,
+            open_task_count = s.open_tasks, last_activity_at = s.last_activity
+        FROM (
+            SELECT operation_id,
+                   COALESCE(SUM(good_pieces), 0) AS good,
+                   COALESCE(SUM(bad_pieces), 0) AS bad,
+                   COUNT(*) AS tasks,
+                   COUNT(*) FILTER (WHERE end_at IS NULL) AS open_tasks,
+                   MAX(COALESCE(end_at, start_at)) AS last_activity
+            FROM tasksdb GROUP BY operation_id
+        ) s
+        WHERE s.operation_id = o.id
+    """)
+    op.execute("""
+        UPDATE ordersdb r SET
+            good_pieces = s.good, bad_pieces = s.bad, task_count = s.tasks,
+            open_task_count = s.open_tasks, last_activity_at = s.last_activity
+        FROM (
+            SELECT order_id,
+                   SUM(good_pieces) AS good,
+                   SUM(bad_pieces) AS bad,
+                   SUM(task_count) AS tasks,
+                   SUM(open_task_count) AS open_tasks,
+                   MAX(last_activity_at) AS last_activity
+            FROM operationsdb GROUP BY order_id
+        ) s
+        WHERE s.order_id = r.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in COUNTER_TABLES:
+        op.drop_column(table, 'last_activity_at')
+        op.drop_column(table, 'open_task_count')
+        op.drop_column(table, 'task_count')
+        op.drop_column(table, 'bad_pieces')
+        op.drop_column(table, 'good_pieces')
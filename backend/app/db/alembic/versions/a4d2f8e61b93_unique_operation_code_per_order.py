@@ -0,0 +1,35 @@
+"""Unique operation_code per order
+
+Revision ID: a4d2f8e61b93
+Revises: 3c71e9a4b5f0
+Create Date: 2026-10-16 13:55:08.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d2f8e61b93'
+down_revision: Union[str, Sequence[str], None] = '3c71e9a4b5f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # fails if an order already has two operations with the same code; merge or
+    # renumber them first (SELECT order_id, operation_code FROM operationsdb
+    # GROUP BY 1, 2 HAVING count(*) > 1)
+    op.create_unique_constraint(
+        'uq_operationsdb_order_id_operation_code',
+        'operationsdb',
+        ['order_id', 'operation_code'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_operationsdb_order_id_operation_code', 'operationsdb', type_='unique')
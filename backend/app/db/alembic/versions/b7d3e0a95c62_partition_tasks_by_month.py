@@ -0,0 +1,114 @@
+"""Partition tasksdb by month of start_at
+
+Revision ID: b7d3e0a95c62
+Revises: 5e2b9c7d4f18
+Create Date: 2026-10-16 17:20:44.581907
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e0a95c62'
+down_revision: Union[str, Sequence[str], None] = '5e2b9c7d4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    'id', 'operation_id', 'process_type', 'operator_user_id', 'operator_bitzer_id', 'start_at', 'end_at',
+    'num_benches', 'num_machines', 'good_pieces', 'bad_pieces', 'notes', 'change_stamp',
+)
+# the foreign keys are named explicitly: while the old table still holds the default names,
+# Postgres would name unnamed ones tasksdb_..._fkey1 and later migrations could not find them
+COLUMN_DDL = """
+    id integer NOT NULL DEFAULT nextval('tasksdb_id_seq'),
+    operation_id integer NOT NULL,
+    process_type processtype NOT NULL,
+    operator_user_id integer,
+    operator_bitzer_id integer,
+    start_at timestamp with time zone,
+    end_at timestamp with time zone,
+    num_benches integer,
+    num_machines integer,
+    good_pieces integer,
+    bad_pieces integer,
+    notes text,
+    change_stamp bigint,
+    CONSTRAINT tasksdb_operation_id_fkey FOREIGN KEY (operation_id) REFERENCES operationsdb (id),
+    CONSTRAINT tasksdb_operator_user_id_fkey FOREIGN KEY (operator_user_id) REFERENCES users (id)
+"""
+INDEXES = (
+    ('ix_tasksdb_start_at_id', ['start_at', 'id']),
+    ('ix_tasksdb_end_at_id', ['end_at', 'id']),
+    ('ix_tasksdb_operation_id_start_at', ['operation_id', 'start_at']),
+    ('ix_tasksdb_operator_user_id', ['operator_user_id']),
+    ('ix_tasksdb_change_stamp', ['change_stamp']),
+)
+MONTHS_AHEAD = 3
+
+
+def add_months(month: datetime.date, n: int) -> datetime.date:
+    y, m = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return datetime.date(y, m + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # tasksdb is rebuilt under an ACCESS EXCLUSIVE lock: plan a maintenance window on large databases.
+    # The old table keeps its data until the copy is done; its indexes are not needed for the copy.
+    op.execute("ALTER TABLE tasksdb RENAME TO tasksdb_unpartitioned")
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("ALTER TABLE tasksdb_unpartitioned RENAME CONSTRAINT tasksdb_pkey TO tasksdb_unpartitioned_pkey")
+    # keep the id sequence (and the ids already handed out) when the old table goes
+    op.execute("ALTER SEQUENCE tasksdb_id_seq OWNED BY NONE")
+
+    # no table-wide primary key: it would have to include start_at, which may be null;
+    # every partition gets its own primary key on id instead (see db/partitions.py)
+    op.execute(f"CREATE TABLE tasksdb ({COLUMN_DDL}) PARTITION BY RANGE (start_at)")
+    op.execute("CREATE TABLE tasksdb_default PARTITION OF tasksdb (PRIMARY KEY (id)) DEFAULT")
+
+    bind = op.get_bind()
+    first = bind.scalar(sa.text("SELECT min(start_at) FROM tasksdb_unpartitioned"))
+    this_month = datetime.datetime.now(datetime.timezone.utc).date().replace(day=1)
+    month = first.astimezone(datetime.timezone.utc).date().replace(day=1) if first else this_month
+    while month <= add_months(this_month, MONTHS_AHEAD):
+        upper = add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE tasksdb_p{month:%Y_%m} PARTITION OF tasksdb (PRIMARY KEY (id)) "
+            f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{upper} 00:00:00+00')"
+        )
+        month = upper
+
+    columns = ", ".join(COLUMNS)
+    op.execute(f"INSERT INTO tasksdb ({columns}) SELECT {columns} FROM tasksdb_unpartitioned")
+    op.drop_table('tasksdb_unpartitioned')
+    op.execute("ALTER SEQUENCE tasksdb_id_seq OWNED BY tasksdb.id")
+
+    # built after the copy, which is much faster than maintaining them row by row
+    for name, cols in INDEXES:
+        op.create_index(name, 'tasksdb', cols)
+    op.execute("ANALYZE tasksdb")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER SEQUENCE tasksdb_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE tasksdb RENAME TO tasksdb_partitioned")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_partitioned")
+
+    op.execute(f"CREATE TABLE tasksdb ({COLUMN_DDL}, PRIMARY KEY (id))")
+    columns = ", ".join(COLUMNS)
+    op.execute(f"INSERT INTO tasksdb ({columns}) SELECT {columns} FROM tasksdb_partitioned")
+    # drops every partition with it
+    op.drop_table('tasksdb_partitioned')
+    op.execute("ALTER SEQUENCE tasksdb_id_seq OWNED BY tasksdb.id")
+
+    for name, cols in INDEXES:
+        op.create_index(name, 'tasksdb', cols)
+    op.execute("ANALYZE tasksdb")
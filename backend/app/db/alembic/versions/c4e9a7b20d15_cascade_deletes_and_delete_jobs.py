@@ -0,0 +1,70 @@
+"""Cascade order and operation deletes, add delete jobs
+
+Revision ID: c4e9a7b20d15
+Revises: f2a8c6d41e07
+Create Date: 2026-10-17 09:12:37.402518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a7b20d15'
+down_revision: Union[str, Sequence[str], None] = 'f2a8c6d41e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (constraint, table, column, referenced table)
+FOREIGN_KEYS = (
+    ('operationsdb_order_id_fkey', 'operationsdb', 'order_id', 'ordersdb'),
+    ('tasksdb_operation_id_fkey', 'tasksdb', 'operation_id', 'operationsdb'),
+)
+
+
+# the existing key is looked up by its column rather than its name: databases built by create_all
+# and databases migrated from an older schema may have named it differently
+FOREIGN_KEY_NAME = sa.text("""
+    SELECT c.conname FROM pg_constraint c
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+    WHERE c.contype = 'f' AND c.conrelid = CAST(:table AS regclass) AND c.confrelid = CAST(:referred AS regclass)
+      AND array_length(c.conkey, 1) = 1 AND a.attname = :column
+""")
+
+
+def replace_foreign_keys(ondelete) -> None:
+    # re-adding a foreign key checks every row (on tasksdb, every partition) under a SHARE ROW EXCLUSIVE lock
+    bind = op.get_bind()
+    for name, table, column, referred in FOREIGN_KEYS:
+        existing = bind.scalar(FOREIGN_KEY_NAME, {"table": table, "column": column, "referred": referred})
+        if existing is not None:
+            op.drop_constraint(existing, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    replace_foreign_keys('CASCADE')
+    op.create_table(
+        'delete_jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('order_numbers', postgresql.ARRAY(sa.Integer()), nullable=True),
+        sa.Column('start_from', sa.Date(), nullable=True),
+        sa.Column('start_to', sa.Date(), nullable=True),
+        sa.Column('deleted', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('delete_jobs')
+    replace_foreign_keys(None)
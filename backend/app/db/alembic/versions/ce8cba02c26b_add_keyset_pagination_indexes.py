@@ -0,0 +1,36 @@
+"""Add keyset pagination indexes on orders and tasks
+
+Revision ID: ce8cba02c26b
+Revises: d9426e524902
+Create Date: 2026-10-16 09:12:04.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ce8cba02c26b'
+down_revision: Union[str, Sequence[str], None] = 'd9426e524902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_ordersdb_start_date_id', 'ordersdb', ['start_date', 'id'])
+    op.create_index('ix_ordersdb_end_date_id', 'ordersdb', ['end_date', 'id'])
+    op.create_index('ix_ordersdb_material_number_id', 'ordersdb', ['material_number', 'id'])
+    op.create_index('ix_tasksdb_start_at_id', 'tasksdb', ['start_at', 'id'])
+    op.create_index('ix_tasksdb_end_at_id', 'tasksdb', ['end_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasksdb_end_at_id', table_name='tasksdb')
+    op.drop_index('ix_tasksdb_start_at_id', table_name='tasksdb')
+    op.drop_index('ix_ordersdb_material_number_id', table_name='ordersdb')
+    op.drop_index('ix_ordersdb_end_date_id', table_name='ordersdb')
+    op.drop_index('ix_ordersdb_start_date_id', table_name='ordersdb')
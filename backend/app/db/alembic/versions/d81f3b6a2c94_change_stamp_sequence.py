@@ -0,0 +1,38 @@
+"""Draw change stamps from a sequence instead of the _changes counter row
+
+Revision ID: d81f3b6a2c94
+Revises: c4e9a7b20d15
+Create Date: 2026-10-17 15:26:08.713940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f3b6a2c94'
+down_revision: Union[str, Sequence[str], None] = 'c4e9a7b20d15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the app's create_all may have made it already
+    op.execute("CREATE SEQUENCE IF NOT EXISTS change_stamp_seq")
+    # carry on after the counter, so the cursors clients hold stay valid
+    op.execute(
+        "SELECT setval('change_stamp_seq', revision + 1, false) FROM table_revisions WHERE table_name = '_changes'"
+    )
+    op.execute("DELETE FROM table_revisions WHERE table_name = '_changes'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "INSERT INTO table_revisions (table_name, revision) "
+        "SELECT '_changes', CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM change_stamp_seq"
+    )
+    op.execute("DROP SEQUENCE change_stamp_seq")
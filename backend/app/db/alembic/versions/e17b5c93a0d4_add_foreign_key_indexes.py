@@ -0,0 +1,40 @@
+"""Add indexes on the foreign keys the API filters on
+
+Revision ID: e17b5c93a0d4
+Revises: a4d2f8e61b93
+Create Date: 2026-10-16 14:30:52.907116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e17b5c93a0d4'
+down_revision: Union[str, Sequence[str], None] = 'a4d2f8e61b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# operationsdb.order_id is already the leading column of uq_operationsdb_order_id_operation_code
+INDEXES = (
+    ('ix_tasksdb_operation_id_start_at', 'tasksdb', ['operation_id', 'start_at']),
+    ('ix_tasksdb_operator_user_id', 'tasksdb', ['operator_user_id']),
+    ('ix_operationsdb_machine_id', 'operationsdb', ['machine_id']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps tasksdb writable while the indexes build; it cannot run in a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,96 @@
+"""Add archive tables for closed orders, operations and tasks
+
+Revision ID: f2a8c6d41e07
+Revises: b7d3e0a95c62
+Create Date: 2026-10-16 18:42:09.130664
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a8c6d41e07'
+down_revision: Union[str, Sequence[str], None] = 'b7d3e0a95c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the enum type already exists for tasksdb.process_type
+PROCESS_TYPE = postgresql.ENUM('PREPARATION', 'QUALITY_CONTROL', 'PROCESSING', name='processtype', create_type=False)
+
+
+def counter_columns():
+    return [
+        sa.Column('good_pieces', sa.Integer(), nullable=False),
+        sa.Column('bad_pieces', sa.Integer(), nullable=False),
+        sa.Column('task_count', sa.Integer(), nullable=False),
+        sa.Column('open_task_count', sa.Integer(), nullable=False),
+        sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ordersdb_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('order_number', sa.Integer(), nullable=False),
+        sa.Column('material_number', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=True),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('num_pieces', sa.Integer(), nullable=False),
+        *counter_columns(),
+        sa.Column('change_stamp', sa.BigInteger(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('order_number'),
+    )
+
+    op.create_table(
+        'operationsdb_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('operation_code', sa.String(), nullable=False),
+        sa.Column('machine_id', sa.Integer(), nullable=True),
+        *counter_columns(),
+        sa.Column('change_stamp', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['ordersdb_archive.id'], deferrable=True, initially='DEFERRED'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_operationsdb_archive_order_id', 'operationsdb_archive', ['order_id'], unique=False)
+
+    op.create_table(
+        'tasksdb_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('operation_id', sa.Integer(), nullable=False),
+        sa.Column('process_type', PROCESS_TYPE, nullable=False),
+        sa.Column('operator_user_id', sa.Integer(), nullable=True),
+        sa.Column('operator_bitzer_id', sa.Integer(), nullable=True),
+        sa.Column('start_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('end_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('num_benches', sa.Integer(), nullable=True),
+        sa.Column('num_machines', sa.Integer(), nullable=True),
+        sa.Column('good_pieces', sa.Integer(), nullable=True),
+        sa.Column('bad_pieces', sa.Integer(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('change_stamp', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['operation_id'], ['operationsdb_archive.id'], deferrable=True, initially='DEFERRED'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tasksdb_archive_operation_id', 'tasksdb_archive', ['operation_id'], unique=False)
+    op.create_index('ix_tasksdb_archive_start_at_id', 'tasksdb_archive', ['start_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # archived orders go back to the hot tables first, so downgrading loses nothing
+    inspector = sa.inspect(op.get_bind())
+    for table in ('ordersdb', 'operationsdb', 'tasksdb'):
+        columns = ", ".join(c['name'] for c in inspector.get_columns(f'{table}_archive') if c['name'] != 'archived_at')
+        op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_archive")
+    op.drop_table('tasksdb_archive')
+    op.drop_table('operationsdb_archive')
+    op.drop_table('ordersdb_archive')
@@ -0,0 +1,169 @@
+"""
+db/analytics.py
+
+Set-based production analytics computed in Postgres.
+
+`machine_stats` answers "how busy was each machine, and what did it produce"
+for a time range in a single statement:
+
+  tasks      tasks that start in [start, end) on a machine, with their interval
+             cut off at `end` (open tasks run until now), shift and
+             production day
+  islands    gaps-and-islands over each machine's intervals (window functions),
+             so overlapping tasks on one machine count their busy time once
+  busy       merged interval lengths per group
+  pieces     task and piece totals per group
+
+A task belongs entirely to the shift/day in which it starts. Shifts are given
+by their local start times; the production day starts with the first shift,
+so night-shift tasks after midnight count towards the previous day.
+"""
+
+import datetime
+from typing import Dict, List, Sequence
+
+from sqlalchemy import Time, and_, case, cast, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from .models import MachineDB, OperationDB, TaskDB
+from .schemas import AnalyticsDimension
+
+D = AnalyticsDimension
+
+
+def parse_shifts(spec: str) -> List[datetime.time]:
+    """'06:00,14:00,22:00' -> sorted shift start times; raises ValueError on bad input."""
+    starts = sorted({datetime.time.fromisoformat(part.strip()) for part in spec.split(",") if part.strip()})
+    if not starts:
+        raise ValueError("at least one shift start time is required")
+    return starts
+
+
+def _shift_label(local_ts, starts: Sequence[datetime.time]):
+    """CASE mapping a local timestamp to the start time of its shift (before the first start = last shift)."""
+    t = cast(local_ts, Time)
+    whens = [(t >= literal(st, Time), st.strftime("%H:%M")) for st in reversed(starts)]
+    return case(*whens, else_=starts[-1].strftime("%H:%M"))
+
+
+def machine_stats(
+    db: Session,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    group_by: Sequence[AnalyticsDimension],
+    tz: str,
+    shifts: Sequence[datetime.time],
+    machine_type=None,
+    machine_ids: Sequence[int] = (),
+) -> List[Dict]:
+    now = func.now()
+    # only the part of a task inside the range is busy time (tasks start inside it)
+    task_end = func.least(func.coalesce(TaskDB.end_at, now), end)
+    local_start = func.timezone(tz, TaskDB.start_at)
+    day_offset = datetime.timedelta(hours=shifts[0].hour, minutes=shifts[0].minute)
+
+    dims = {
+        D.machine_type: MachineDB.machine_type,
+        D.process_type: TaskDB.process_type,
+        D.shift: _shift_label(local_start, shifts),
+        D.day: func.date(local_start - day_offset),
+    }
+    chosen = [d for d in dims if d in group_by]
+
+    filters = [
+        TaskDB.start_at >= start,
+        TaskDB.start_at < end,
+        OperationDB.machine_id.isnot(None),
+    ]
+    if machine_type is not None:
+        filters.append(MachineDB.machine_type == machine_type)
+    if machine_ids:
+        filters.append(OperationDB.machine_id.in_(machine_ids))
+
+    tasks = (
+        select(
+            TaskDB.id.label("task_id"),
+            OperationDB.machine_id.label("machine_id"),
+            TaskDB.start_at.label("s"),
+            task_end.label("e"),
+            func.coalesce(TaskDB.good_pieces, 0).label("good"),
+            func.coalesce(TaskDB.bad_pieces, 0).label("bad"),
+            *(dims[d].label(d.value) for d in chosen),
+        )
+        .join(OperationDB, OperationDB.id == TaskDB.operation_id)
+        .join(MachineDB, MachineDB.id == OperationDB.machine_id)
+        .where(and_(*filters), task_end > TaskDB.start_at)
+        .cte("tasks")
+    )
+
+    # busy time is merged per machine and per chosen dimension, then summed up to the requested groups
+    partition = [tasks.c.machine_id, *(tasks.c[d.value] for d in chosen)]
+    order = [tasks.c.s, tasks.c.task_id]
+    prev_end = func.max(tasks.c.e).over(partition_by=partition, order_by=order, rows=(None, -1))
+    flagged = select(tasks, prev_end.label("prev_end")).cte("flagged")
+
+    fpart = [flagged.c.machine_id, *(flagged.c[d.value] for d in chosen)]
+    new_island = case((or_(flagged.c.prev_end.is_(None), flagged.c.s > flagged.c.prev_end), 1), else_=0)
+    islands = select(
+        flagged,
+        func.sum(new_island).over(partition_by=fpart, order_by=[flagged.c.s, flagged.c.task_id]).label("island"),
+    ).cte("islands")
+
+    ipart = [islands.c.machine_id, *(islands.c[d.value] for d in chosen)]
+    merged = (
+        select(*ipart, (func.max(islands.c.e) - func.min(islands.c.s)).label("length"))
+        .group_by(*ipart, islands.c.island)
+        .cte("merged")
+    )
+
+    def keys(t):
+        cols = []
+        if D.machine in group_by:
+            cols.append(t.c.machine_id)
+        cols.extend(t.c[d.value] for d in chosen)
+        return cols
+
+    busy = (
+        select(*keys(merged), func.sum(func.extract("epoch", merged.c.length)).label("busy_seconds"))
+        .group_by(*keys(merged))
+        .cte("busy")
+    )
+    pieces = (
+        select(
+            *keys(tasks),
+            func.count().label("task_count"),
+            func.sum(tasks.c.good).label("good_pieces"),
+            func.sum(tasks.c.bad).label("bad_pieces"),
+        )
+        .group_by(*keys(tasks))
+        .cte("pieces")
+    )
+
+    key_names = [c.name for c in keys(tasks)]
+    on = and_(*(pieces.c[k].is_not_distinct_from(busy.c[k]) for k in key_names)) if key_names else literal(True)
+    stmt = select(pieces, busy.c.busy_seconds).join(busy, on)
+    if D.machine in group_by:
+        stmt = stmt.add_columns(MachineDB.machine_location, MachineDB.machine_type.label("machine_type_of_machine")).join(
+            MachineDB, MachineDB.id == pieces.c.machine_id
+        )
+    stmt = stmt.order_by(*(pieces.c[k] for k in key_names))
+
+    rows = []
+    for r in db.execute(stmt).mappings():
+        good, bad = int(r["good_pieces"] or 0), int(r["bad_pieces"] or 0)
+        busy_hours = float(r["busy_seconds"] or 0) / 3600
+        row = {
+            "task_count": r["task_count"],
+            "busy_hours": round(busy_hours, 4),
+            "good_pieces": good,
+            "bad_pieces": bad,
+            "scrap_rate": round(bad / (good + bad), 4) if good + bad else None,
+            "throughput_per_hour": round(good / busy_hours, 4) if busy_hours else None,
+        }
+        for k in key_names:
+            row[k] = r[k]
+        if D.machine in group_by:
+            row["machine_location"] = r["machine_location"]
+            row["machine_type"] = r["machine_type_of_machine"]
+        rows.append(row)
+    return rows
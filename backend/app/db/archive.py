@@ -0,0 +1,161 @@
+"""
+db/archive.py
+
+Archive tier for closed orders.
+
+An order whose end_date lies more than ARCHIVE_AFTER_DAYS in the past and that
+has no open task (end_at is null) is hardly ever touched again. `archive_orders`
+moves such orders, with their operations and tasks, from ordersdb /
+operationsdb / tasksdb into the *_archive tables, a batch of orders at a time,
+with one DELETE ... RETURNING -> INSERT statement per table. Ids and change
+stamps are kept.
+
+The list, search and sync endpoints read the hot tables only. Lookups by
+order_number fall back to the archive, and the exports and the rollups read
+both tiers through `union_tiers`, so archiving changes neither. For /changes,
+archived rows leave the hot set like deleted ones (with a tombstone).
+
+Archived rows are read-only: the write endpoints answer 404 for them, and an
+archived order_number cannot be reused.
+"""
+
+import datetime
+from typing import Callable, Iterable, NamedTuple, Optional, Set
+
+from sqlalchemy import delete, exists, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from .changes import transaction_stamp
+from .models import (
+    OrderDB,
+    OperationDB,
+    TaskDB,
+    OrderArchiveDB,
+    OperationArchiveDB,
+    TaskArchiveDB,
+    DeletedRowDB,
+    archived_order_load_options,
+)
+from . import revisions
+
+BATCH_SIZE = 500
+
+
+class Tier(NamedTuple):
+    order: type
+    operation: type
+    task: type
+
+
+HOT = Tier(OrderDB, OperationDB, TaskDB)
+ARCHIVE = Tier(OrderArchiveDB, OperationArchiveDB, TaskArchiveDB)
+TIERS = (HOT, ARCHIVE)
+
+
+def union_tiers(build: Callable[[Tier], object]):
+    """UNION ALL of the statement `build` makes for the hot and for the archive tables."""
+    return union_all(*(build(tier) for tier in TIERS))
+
+
+def get_archived_order(db: Session, order_number: int) -> Optional[OrderArchiveDB]:
+    return (
+        db.query(OrderArchiveDB)
+        .options(*archived_order_load_options())
+        .filter(OrderArchiveDB.order_number == order_number)
+        .first()
+    )
+
+
+def archived_order_numbers(db: Session, numbers: Iterable[int]) -> Set[int]:
+    """The given order numbers that belong to archived orders."""
+    numbers = list(numbers)
+    if not numbers:
+        return set()
+    return set(db.scalars(select(OrderArchiveDB.order_number).where(OrderArchiveDB.order_number.in_(numbers))))
+
+
+def cutoff_date(older_than_days: Optional[int] = None) -> datetime.date:
+    days = settings.archive_after_days if older_than_days is None else older_than_days
+    return datetime.date.today() - datetime.timedelta(days=days)
+
+
+def archivable(cutoff: datetime.date):
+    """Ids of the hot orders that ended before `cutoff` and have no open task."""
+    open_task = (
+        select(TaskDB.id)
+        .join(OperationDB, OperationDB.id == TaskDB.operation_id)
+        .where(OperationDB.order_id == OrderDB.id, TaskDB.end_at.is_(None))
+    )
+    return select(OrderDB.id).where(OrderDB.end_date < cutoff, ~exists(open_task))
+
+
+def _move(db: Session, hot, archive, whereclause, stamp: int) -> int:
+    """Move the rows of `hot` matching `whereclause` into `archive`, leaving tombstones; returns the row count."""
+    conn = db.connection()
+    conn.execute(
+        insert(DeletedRowDB.__table__).from_select(
+            ["table_name", "row_id", "change_stamp"],
+            select(literal(hot.name), hot.c.id, literal(stamp)).where(whereclause),
+        )
+    )
+    columns = [c.name for c in hot.columns]
+    moved = delete(hot).where(whereclause).returning(*hot.columns).cte("moved")
+    return conn.execute(insert(archive).from_select(columns, select(*(moved.c[name] for name in columns)))).rowcount
+
+
+def archive_batch(db: Session, cutoff: datetime.date, batch_size: int = BATCH_SIZE) -> Optional[int]:
+    """
+    Archive up to `batch_size` archivable orders (see module docstring). Returns
+    the number of orders moved, or None when there was none left; the caller commits.
+    """
+    orders, operations, tasks = OrderDB.__table__, OperationDB.__table__, TaskDB.__table__
+    # orders another archiver holds are skipped
+    ids = db.scalars(
+        archivable(cutoff).order_by(OrderDB.id).limit(batch_size).with_for_update(of=OrderDB, skip_locked=True)
+    ).all()
+    if not ids:
+        return None
+    # locking the operations holds off new tasks for them (their foreign key check waits),
+    # so the open task check below stays true until commit
+    db.execute(select(OperationDB.id).where(OperationDB.order_id.in_(ids)).with_for_update())
+    ids = db.scalars(archivable(cutoff).where(OrderDB.id.in_(ids))).all()
+    if not ids:
+        return 0
+
+    stamp = transaction_stamp(db)
+    op_ids = select(operations.c.id).where(operations.c.order_id.in_(ids)).scalar_subquery()
+    _move(db, tasks, TaskArchiveDB.__table__, tasks.c.operation_id.in_(op_ids), stamp)
+    _move(db, operations, OperationArchiveDB.__table__, operations.c.order_id.in_(ids), stamp)
+    moved = _move(db, orders, OrderArchiveDB.__table__, orders.c.id.in_(ids), stamp)
+
+    # ETags and cached results of the hot tables change; the rollups keep counting the tasks
+    revisions.bump(db, [OrderDB.__tablename__, OperationDB.__tablename__, TaskDB.__tablename__])
+    return moved
+
+
+def archive_orders(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    limit: Optional[int] = None,
+) -> int:
+    """
+    Archive every order whose end_date is more than `older_than_days` (default
+    ARCHIVE_AFTER_DAYS) days ago and whose tasks are all closed, committing
+    after each batch. Returns the number of orders archived.
+    """
+    cutoff = cutoff_date(older_than_days)
+    total = 0
+    while limit is None or total < limit:
+        size = batch_size if limit is None else min(batch_size, limit - total)
+        moved = archive_batch(db, cutoff, size)
+        db.commit()
+        if moved is None:
+            break
+        total += moved
+    return total
+
+
+def count_archivable(db: Session, older_than_days: Optional[int] = None) -> int:
+    return db.scalar(select(func.count()).select_from(archivable(cutoff_date(older_than_days)).subquery()))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+db/archive_orders.py
+
+Move closed orders (end_date older than ARCHIVE_AFTER_DAYS, every task
+finished) with their operations and tasks into the archive tables (see
+db/archive.py). Safe to run from cron while the API is serving.
+
+Examples:
+  python -m db.archive_orders
+  python -m db.archive_orders --older-than-days 365 --batch 1000
+  python -m db.archive_orders --dry-run
+"""
+
+import argparse
+import sys
+import time
+
+from db.database import SessionLocal
+from db.archive import BATCH_SIZE, archive_orders, count_archivable, cutoff_date
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive closed orders with their operations and tasks.")
+    parser.add_argument("--older-than-days", type=int, default=None, metavar="DAYS", help="Default: ARCHIVE_AFTER_DAYS")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Orders moved per transaction")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many orders")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the orders that would be archived")
+    args = parser.parse_args(argv)
+
+    session = SessionLocal()
+    try:
+        cutoff = cutoff_date(args.older_than_days)
+        if args.dry_run:
+            print(f"{count_archivable(session, args.older_than_days)} order(s) ended before {cutoff} with no open task.")
+            return 0
+        t0 = time.perf_counter()
+        moved = archive_orders(session, args.older_than_days, args.batch, args.limit)
+        print(f"✅ Archived {moved} order(s) that ended before {cutoff} in {time.perf_counter() - t0:.1f}s.")
+        return 0
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error while archiving orders: {e}")
+        return 2
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+db/backfill_rollups.py
+
+Rebuild the hourly/daily task rollups from tasksdb. Run once after upgrading
+(history from before the rollups existed is not picked up by the incremental
+refresh), and again after changing PLANT_TIMEZONE.
+
+Examples:
+  python -m db.backfill_rollups
+  python -m db.backfill_rollups --since 2025-01-01
+  python -m db.backfill_rollups --refresh     # only catch up incrementally
+"""
+
+import argparse
+import datetime
+import sys
+import time
+from zoneinfo import ZoneInfo
+
+from core.config import settings
+from db.database import SessionLocal, engine
+from db.rollups import backfill, ensure_state_row, refresh
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the task rollup tables from tasksdb.")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, metavar="YYYY-MM-DD", help="Only rebuild from this day (plant time zone)")
+    parser.add_argument("--step-days", type=int, default=31, help="Days rebuilt per transaction")
+    parser.add_argument("--refresh", action="store_true", help="Run one incremental refresh instead of a backfill")
+    args = parser.parse_args(argv)
+
+    ensure_state_row(engine)
+    session = SessionLocal()
+    t0 = time.perf_counter()
+    try:
+        if args.refresh:
+            hours = refresh(session, wait=True)
+            session.commit()
+            print(f"✅ Rollups refreshed: {hours} hour(s) rebuilt in {time.perf_counter() - t0:.1f}s.")
+            return 0
+
+        since = None
+        if args.since:
+            since = datetime.datetime.combine(args.since, datetime.time(), tzinfo=ZoneInfo(settings.plant_timezone))
+        steps = backfill(session, since, datetime.timedelta(days=args.step_days))
+        print(f"✅ Rollups rebuilt in {steps} step(s), {time.perf_counter() - t0:.1f}s.")
+        return 0
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error while rebuilding rollups: {e}")
+        return 2
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""
+db/columnar_export.py
+
+Columnar (Parquet / Arrow IPC) export of the denormalized task fact table,
+used by GET /export/tasks.parquet, /export/tasks.arrow and the nightly
+`python -m db.export_tasks` job.
+
+Rows are read through a server-side cursor `BATCH_SIZE` at a time and each
+batch becomes one Arrow record batch (one Parquet row group), so memory stays
+bounded by the batch size whatever the export range.
+
+`export_partitions` writes a Hive-style dataset, one file per production day
+in the plant time zone (start_date=YYYY-MM-DD/part-0.parquet), and records each
+day's task count and highest change stamp in _manifest.json. The stamp covers
+the operation, order and machine each task row is joined with, since their
+columns are copied into it. An incremental run compares those with the
+database and rewrites only the days that gained, changed or lost tasks, or
+whose joined rows changed; days that no longer have any are removed.
+
+Both read the hot and the archive tables (db/archive.py), so archiving an
+order changes neither an export nor the dataset.
+"""
+
+import datetime
+import json
+import os
+import shutil
+from typing import Callable, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.orm import Session
+
+from .models import MachineDB
+from .archive import HOT, Tier, union_tiers
+
+BATCH_SIZE = 50_000
+
+FORMATS = ("parquet", "arrow")
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrows"}
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+
+MANIFEST = "_manifest.json"
+PARTITION_KEY = "start_date"
+# pyarrow's default name for the partition of rows whose key is null (tasks without start_at)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+SCHEMA = pa.schema([
+    ("task_id", pa.int64()),
+    ("process_type", pa.string()),
+    ("start_at", TIMESTAMP),
+    ("end_at", TIMESTAMP),
+    ("good_pieces", pa.int32()),
+    ("bad_pieces", pa.int32()),
+    ("operator_user_id", pa.int64()),
+    ("operator_bitzer_id", pa.int64()),
+    ("operation_id", pa.int64()),
+    ("operation_code", pa.string()),
+    ("order_number", pa.int64()),
+    ("material_number", pa.int64()),
+    ("machine_id", pa.int64()),
+    ("machine_location", pa.string()),
+    ("machine_type", pa.string()),
+    ("change_stamp", pa.int64()),
+])
+
+
+def task_fact_select(tier: Tier = HOT):
+    """Task fact rows of one tier in SCHEMA order; enums come out as their text value."""
+    task, operation, order = tier.task, tier.operation, tier.order
+    return (
+        select(
+            task.id.label("task_id"),
+            cast(task.process_type, String).label("process_type"),
+            task.start_at,
+            task.end_at,
+            task.good_pieces,
+            task.bad_pieces,
+            task.operator_user_id,
+            task.operator_bitzer_id,
+            operation.id.label("operation_id"),
+            operation.operation_code,
+            order.order_number,
+            order.material_number,
+            operation.machine_id,
+            MachineDB.machine_location,
+            cast(MachineDB.machine_type, String).label("machine_type"),
+            task.change_stamp,
+        )
+        .join(operation, operation.id == task.operation_id)
+        .join(order, order.id == operation.order_id)
+        .outerjoin(MachineDB, MachineDB.id == operation.machine_id)
+    )
+
+
+def task_facts(where: Callable[[type], list] = lambda task: []):
+    """Task fact rows of both tiers in task id order; `where(task model)` returns the row filters."""
+    stmt = union_tiers(lambda tier: task_fact_select(tier).where(*where(tier.task)))
+    return stmt.order_by(stmt.selected_columns.task_id)
+
+
+def record_batches(db: Session, stmt, batch_size: int = BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        columns = zip(*partition)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, SCHEMA)], schema=SCHEMA
+        )
+
+
+class _Drain:
+    """Write-only file object whose contents are taken out after every write, for streaming responses."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _writer(fmt: str, sink):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, SCHEMA, compression="zstd")
+    return pa.ipc.new_stream(sink, SCHEMA)
+
+
+def stream(db: Session, stmt, fmt: str, batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """Encoded bytes of the export, yielded batch by batch (the Parquet footer comes last)."""
+    drain = _Drain()
+    writer = _writer(fmt, drain)
+    for batch in record_batches(db, stmt, batch_size):
+        writer.write_batch(batch)
+        chunk = drain.take()
+        if chunk:
+            yield chunk
+    writer.close()
+    yield drain.take()
+
+
+# -----------------------
+# Partitioned dataset
+# -----------------------
+def day_stats(db: Session, tz: str, since: Optional[datetime.date] = None, until: Optional[datetime.date] = None) -> Dict[str, dict]:
+    """
+    {partition: {"rows": task count, "max_stamp": highest change stamp}} per
+    local day of start_at; the stamps of the joined operations, orders and
+    machines count too.
+    """
+    def per_tier(tier: Tier):
+        task, operation, order = tier.task, tier.operation, tier.order
+        day = func.date(func.timezone(tz, task.start_at)).label("day")
+        # greatest() skips nulls (rows from before change stamps, tasks without a machine)
+        stamp = func.greatest(task.change_stamp, operation.change_stamp, order.change_stamp, MachineDB.change_stamp)
+        stmt = (
+            select(day, func.count().label("rows"), func.max(stamp).label("max_stamp"))
+            .join(operation, operation.id == task.operation_id)
+            .join(order, order.id == operation.order_id)
+            .outerjoin(MachineDB, MachineDB.id == operation.machine_id)
+            .group_by(day)
+        )
+        if since is not None:
+            stmt = stmt.where(day >= since)
+        if until is not None:
+            stmt = stmt.where(day < until)
+        return stmt
+
+    tiers = union_tiers(per_tier).subquery()
+    stmt = select(tiers.c.day, func.sum(tiers.c.rows), func.max(tiers.c.max_stamp)).group_by(tiers.c.day)
+    return {
+        (d.isoformat() if d is not None else NULL_PARTITION): {"rows": int(rows), "max_stamp": stamp}
+        for d, rows, stamp in db.execute(stmt)
+    }
+
+
+def _day_range(task, tz: str, partition: str) -> list:
+    if partition == NULL_PARTITION:
+        return [task.start_at.is_(None)]
+    # bounds as instants, so the start_at index (and partition pruning) is used
+    day = datetime.date.fromisoformat(partition)
+    lo = datetime.datetime.combine(day, datetime.time(), tzinfo=ZoneInfo(tz))
+    hi = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time(), tzinfo=ZoneInfo(tz))
+    return [task.start_at >= lo, task.start_at < hi]
+
+
+def read_manifest(out_dir: str) -> Optional[dict]:
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(out_dir: str, manifest: dict) -> None:
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+
+def write_partition(db: Session, out_dir: str, fmt: str, tz: str, partition: str, batch_size: int = BATCH_SIZE) -> None:
+    """(Re)write one day's file; the old file is replaced only once the new one is complete."""
+    part_dir = os.path.join(out_dir, f"{PARTITION_KEY}={partition}")
+    os.makedirs(part_dir, exist_ok=True)
+    path = os.path.join(part_dir, f"part-0.{EXTENSIONS[fmt]}")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        writer = _writer(fmt, f)
+        for batch in record_batches(db, task_facts(lambda task: _day_range(task, tz, partition)), batch_size):
+            writer.write_batch(batch)
+        writer.close()
+    os.replace(tmp, path)
+    # files left by an earlier export in another format
+    for name in os.listdir(part_dir):
+        if name != os.path.basename(path):
+            os.remove(os.path.join(part_dir, name))
+
+
+def export_partitions(
+    db: Session,
+    out_dir: str,
+    fmt: str,
+    tz: str,
+    since: Optional[datetime.date] = None,
+    until: Optional[datetime.date] = None,
+    full: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> Dict[str, List[str]]:
+    """
+    Bring the dataset in `out_dir` up to date for the days in [since, until)
+    (all days when None). Returns the partitions "written" and "removed".
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = read_manifest(out_dir)
+    if manifest is not None and not full and (manifest["format"] != fmt or manifest["timezone"] != tz):
+        raise ValueError(
+            f"{out_dir} holds a {manifest['format']} export in {manifest['timezone']}; "
+            "use a new directory or run a full export"
+        )
+    if manifest is None:
+        manifest = {"partitions": {}}
+    manifest.update(format=fmt, timezone=tz)
+
+    def in_range(partition: str) -> bool:
+        if partition == NULL_PARTITION:
+            return since is None and until is None
+        day = datetime.date.fromisoformat(partition)
+        return (since is None or day >= since) and (until is None or day < until)
+
+    current = day_stats(db, tz, since, until)
+    known = manifest["partitions"]
+    changed = sorted(p for p, stats in current.items() if full or known.get(p) != stats)
+    gone = sorted(p for p in known if in_range(p) and p not in current)
+
+    for partition in changed:
+        write_partition(db, out_dir, fmt, tz, partition, batch_size)
+        known[partition] = current[partition]
+        # saved after every day, so an interrupted run resumes where it stopped
+        _write_manifest(out_dir, manifest)
+    for partition in gone:
+        shutil.rmtree(os.path.join(out_dir, f"{PARTITION_KEY}={partition}"), ignore_errors=True)
+        del known[partition]
+    manifest["exported_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    _write_manifest(out_dir, manifest)
+    return {"written": changed, "removed": gone}
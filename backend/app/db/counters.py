@@ -0,0 +1,125 @@
+"""
+db/counters.py
+
+Incrementally maintained progress counters on operationsdb and ordersdb
+(good_pieces, bad_pieces, task_count, open_task_count, last_activity_at).
+
+Task writes call `apply_task_change` in the same transaction, which adds the
+difference between the task's old and new contribution with a single UPDATE
+per level, so concurrent writers never lose increments. last_activity_at is
+the latest task timestamp (end_at, or start_at while the task is open) and is
+re-derived from the operation's tasks, which is cheap with the operation_id
+index. `recompute` rebuilds everything from tasksdb (see db/repair_counters.py).
+"""
+
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import func, select, update, true
+from sqlalchemy.orm import Session
+
+from .models import OrderDB, OperationDB, TaskDB
+
+# (good, bad, tasks, open tasks)
+Contribution = Tuple[int, int, int, int]
+
+NO_CONTRIBUTION: Contribution = (0, 0, 0, 0)
+
+_NO_SYNC = {"synchronize_session": False}
+
+
+def task_contribution(task: Optional[TaskDB]) -> Contribution:
+    if task is None:
+        return NO_CONTRIBUTION
+    return (task.good_pieces or 0, task.bad_pieces or 0, 1, 1 if task.end_at is None else 0)
+
+
+def row_contribution(row) -> Contribution:
+    """task_contribution for a plain mapping of task columns."""
+    return (row.get("good_pieces") or 0, row.get("bad_pieces") or 0, 1, 1 if row.get("end_at") is None else 0)
+
+
+def add(a: Contribution, b: Contribution) -> Contribution:
+    return tuple(x + y for x, y in zip(a, b))
+
+
+def _task_activity():
+    return func.max(func.coalesce(TaskDB.end_at, TaskDB.start_at))
+
+
+def apply_task_change(db: Session, operation_id: int, before: Contribution, after: Contribution) -> None:
+    """Add (after - before) to the counters of the task's operation and order."""
+    d_good, d_bad, d_tasks, d_open = (a - b for a, b in zip(after, before))
+
+    # the task change must be visible to the last_activity_at subquery
+    db.flush()
+
+    op_activity = select(_task_activity()).where(TaskDB.operation_id == operation_id).scalar_subquery()
+    db.execute(
+        update(OperationDB)
+        .where(OperationDB.id == operation_id)
+        .values(
+            good_pieces=OperationDB.good_pieces + d_good,
+            bad_pieces=OperationDB.bad_pieces + d_bad,
+            task_count=OperationDB.task_count + d_tasks,
+            open_task_count=OperationDB.open_task_count + d_open,
+            last_activity_at=op_activity,
+        ),
+        execution_options=_NO_SYNC,
+    )
+
+    order_id = select(OperationDB.order_id).where(OperationDB.id == operation_id).scalar_subquery()
+    order_activity = (
+        select(func.max(OperationDB.last_activity_at))
+        .where(OperationDB.order_id == OrderDB.id)
+        .correlate(OrderDB)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(OrderDB)
+        .where(OrderDB.id == order_id)
+        .values(
+            good_pieces=OrderDB.good_pieces + d_good,
+            bad_pieces=OrderDB.bad_pieces + d_bad,
+            task_count=OrderDB.task_count + d_tasks,
+            open_task_count=OrderDB.open_task_count + d_open,
+            last_activity_at=order_activity,
+        ),
+        execution_options=_NO_SYNC,
+    )
+
+
+def recompute(db: Session, order_ids: Optional[Iterable[int]] = None) -> None:
+    """Rebuild the counters from tasksdb for the given orders (all orders when None)."""
+    order_ids = list(order_ids) if order_ids is not None else None
+
+    def per_operation(expr):
+        return select(expr).where(TaskDB.operation_id == OperationDB.id).correlate(OperationDB).scalar_subquery()
+
+    db.execute(
+        update(OperationDB)
+        .where(OperationDB.order_id.in_(order_ids) if order_ids is not None else true())
+        .values(
+            good_pieces=per_operation(func.coalesce(func.sum(TaskDB.good_pieces), 0)),
+            bad_pieces=per_operation(func.coalesce(func.sum(TaskDB.bad_pieces), 0)),
+            task_count=per_operation(func.count(TaskDB.id)),
+            open_task_count=per_operation(func.count(TaskDB.id).filter(TaskDB.end_at.is_(None))),
+            last_activity_at=per_operation(_task_activity()),
+        ),
+        execution_options=_NO_SYNC,
+    )
+
+    def per_order(expr):
+        return select(expr).where(OperationDB.order_id == OrderDB.id).correlate(OrderDB).scalar_subquery()
+
+    db.execute(
+        update(OrderDB)
+        .where(OrderDB.id.in_(order_ids) if order_ids is not None else true())
+        .values(
+            good_pieces=per_order(func.coalesce(func.sum(OperationDB.good_pieces), 0)),
+            bad_pieces=per_order(func.coalesce(func.sum(OperationDB.bad_pieces), 0)),
+            task_count=per_order(func.coalesce(func.sum(OperationDB.task_count), 0)),
+            open_task_count=per_order(func.coalesce(func.sum(OperationDB.open_task_count), 0)),
+            last_activity_at=per_order(func.max(OperationDB.last_activity_at)),
+        ),
+        execution_options=_NO_SYNC,
+    )
@@ -0,0 +1,268 @@
+"""
+db/cycle_times.py
+
+Cycle-time distributions (minutes per piece) per operation code and machine,
+for GET /analytics/cycle-times.
+
+A sample is a finished task with at least one piece: (end_at - start_at) /
+(good_pieces + bad_pieces). Samples are streamed from tasksdb through a
+server-side cursor in batches of `batch_size` rows straight into NumPy arrays,
+and the operations they belong to are mapped onto (operation code, machine)
+groups with searchsorted, so no per-task work runs in Python.
+
+`grouped_stats` sorts once by (group, minutes) and reads everything off the
+sorted array: percentiles are interpolated at computed offsets into each
+group's slice (the "linear" method of numpy.percentile), means come from
+np.bincount, and a sample is an outlier when it lies outside its group's
+Tukey fences [q1 - k * IQR, q3 + k * IQR].
+
+Results are cached in-process per query (`cache`): an entry is reused while
+tasksdb and operationsdb keep their revision (db/revisions.py), and for at
+least CYCLE_TIME_CACHE_TTL seconds even if they change, so a busy shop floor
+does not trigger a full reload on every request.
+"""
+
+import datetime
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from .models import OperationDB, TaskDB
+from .revisions import get_revisions
+
+BATCH_SIZE = 100_000
+PERCENTILES = (50, 90, 99)
+
+# outlier task ids listed per group (the furthest from the median first)
+OUTLIER_SAMPLE = 20
+
+NO_MACHINE = -1
+
+
+class Samples:
+    """Column arrays of the loaded samples, one entry per task."""
+
+    __slots__ = ("task_ids", "operation_ids", "minutes")
+
+    def __init__(self, task_ids: np.ndarray, operation_ids: np.ndarray, minutes: np.ndarray):
+        self.task_ids = task_ids
+        self.operation_ids = operation_ids
+        self.minutes = minutes
+
+    def __len__(self) -> int:
+        return len(self.minutes)
+
+
+def _operation_filter(operation_codes: Sequence[str], machine_ids: Sequence[int]):
+    conds = []
+    if operation_codes:
+        conds.append(OperationDB.operation_code.in_(operation_codes))
+    if machine_ids:
+        conds.append(OperationDB.machine_id.in_(machine_ids))
+    return conds
+
+
+def load_samples(
+    db: Session,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    operation_codes: Sequence[str] = (),
+    machine_ids: Sequence[int] = (),
+    batch_size: int = BATCH_SIZE,
+) -> Samples:
+    """Stream the samples of tasks starting in [start, end) into arrays, `batch_size` rows at a time."""
+    pieces = func.coalesce(TaskDB.good_pieces, 0) + func.coalesce(TaskDB.bad_pieces, 0)
+    minutes = cast(func.extract("epoch", TaskDB.end_at - TaskDB.start_at), Float) / 60 / pieces
+    stmt = select(TaskDB.id, TaskDB.operation_id, minutes).where(TaskDB.end_at > TaskDB.start_at, pieces > 0)
+    if start is not None:
+        stmt = stmt.where(TaskDB.start_at >= start)
+    if end is not None:
+        stmt = stmt.where(TaskDB.start_at < end)
+    op_conds = _operation_filter(operation_codes, machine_ids)
+    if op_conds:
+        stmt = stmt.where(TaskDB.operation_id.in_(select(OperationDB.id).where(*op_conds)))
+
+    batches = []
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for part in result.partitions():
+        flat = np.fromiter(itertools.chain.from_iterable(part), dtype=np.float64, count=3 * len(part))
+        batches.append(flat.reshape(-1, 3))
+    cols = np.concatenate(batches) if batches else np.empty((0, 3))
+    return Samples(cols[:, 0].astype(np.int64), cols[:, 1].astype(np.int64), cols[:, 2])
+
+
+def load_groups(db: Session, samples: Samples, batch_size: int = BATCH_SIZE):
+    """
+    Group index per sample (-1 if its operation is gone) plus the (operation_code, machine_id) of every group.
+    Operations are read in batches like the samples and matched by id with searchsorted.
+    """
+    wanted = np.unique(samples.operation_ids)
+    ids, machines, codes = [], [], []
+    stmt = select(OperationDB.id, OperationDB.machine_id, OperationDB.operation_code).order_by(OperationDB.id)
+    for part in db.execute(stmt.execution_options(yield_per=batch_size)).partitions():
+        batch_ids = np.fromiter((r[0] for r in part), dtype=np.int64, count=len(part))
+        keep = np.isin(batch_ids, wanted)
+        if not keep.any():
+            continue
+        rows = [r for r, k in zip(part, keep) if k]
+        ids.append(batch_ids[keep])
+        machines.append(np.fromiter((NO_MACHINE if r[1] is None else r[1] for r in rows), dtype=np.int64, count=len(rows)))
+        codes.extend(r[2] for r in rows)
+
+    if not codes:
+        return np.full(len(samples), -1, dtype=np.int64), []
+    op_ids = np.concatenate(ids)
+    op_machines = np.concatenate(machines)
+    code_values, code_index = np.unique(np.array(codes, dtype=object), return_inverse=True)
+
+    # one group per distinct (code, machine) pair
+    pairs = np.stack([code_index, op_machines], axis=1)
+    group_pairs, op_group = np.unique(pairs, axis=0, return_inverse=True)
+    keys = [(str(code_values[c]), None if m == NO_MACHINE else int(m)) for c, m in group_pairs]
+
+    # op_ids is sorted (ORDER BY id), so each sample finds its operation by binary search;
+    # samples whose operation was deleted in between get group -1
+    pos = np.minimum(np.searchsorted(op_ids, samples.operation_ids), len(op_ids) - 1)
+    found = op_ids[pos] == samples.operation_ids
+    return np.where(found, op_group.reshape(-1)[pos], -1), keys
+
+
+def grouped_stats(groups: np.ndarray, values: np.ndarray, percentiles: Sequence[float] = PERCENTILES, fence: float = 1.5) -> Dict[str, np.ndarray]:
+    """
+    Per-group count, mean, min, max, percentiles and Tukey-fence outliers of
+    `values`, for dense non-negative group ids. The per-group arrays follow
+    "group" (the ids present, ascending); "outlier" is a mask over the input rows.
+    """
+    if len(values) == 0:
+        empty = np.empty(0)
+        out = {"group": empty.astype(np.int64), "count": empty.astype(np.int64), "mean": empty, "min": empty, "max": empty,
+               "q1": empty, "q3": empty, "outlier_count": empty.astype(np.int64), "outlier": empty.astype(bool)}
+        out.update({f"p{p:g}": empty for p in percentiles})
+        return out
+
+    # one sort by (group, value); the last key is the primary one
+    order = np.lexsort((values, groups))
+    g = groups[order]
+    v = values[order]
+
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    counts = np.diff(np.r_[starts, len(g)])
+    last = starts + counts - 1
+    present = g[starts]
+
+    def percentile(p: float) -> np.ndarray:
+        pos = starts + (counts - 1) * (p / 100.0)
+        lo_idx = np.floor(pos).astype(np.int64)
+        hi_idx = np.minimum(lo_idx + 1, last)
+        return v[lo_idx] + (v[hi_idx] - v[lo_idx]) * (pos - lo_idx)
+
+    # fences are looked up per row by group id, so flags line up with the input
+    q1, q3 = percentile(25), percentile(75)
+    n_groups = int(present[-1]) + 1
+    low_fence = np.full(n_groups, -np.inf)
+    high_fence = np.full(n_groups, np.inf)
+    low_fence[present] = q1 - fence * (q3 - q1)
+    high_fence[present] = q3 + fence * (q3 - q1)
+    outlier = (values < low_fence[groups]) | (values > high_fence[groups])
+
+    out = {
+        "group": present,
+        "count": counts,
+        "mean": np.bincount(groups, weights=values, minlength=n_groups)[present] / counts,
+        "min": v[starts],
+        "max": v[last],
+        "q1": q1,
+        "q3": q3,
+        "outlier_count": np.bincount(groups[outlier], minlength=n_groups)[present],
+        "outlier": outlier,
+    }
+    out.update({f"p{p:g}": percentile(p) for p in percentiles})
+    return out
+
+
+def cycle_time_stats(
+    db: Session,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    operation_codes: Sequence[str] = (),
+    machine_ids: Sequence[int] = (),
+    fence: float = 1.5,
+) -> List[Dict]:
+    """Rows for /analytics/cycle-times, one per (operation_code, machine_id), minutes per piece."""
+    samples = load_samples(db, start, end, operation_codes, machine_ids)
+    sample_group, keys = load_groups(db, samples)
+    keep = sample_group >= 0
+    if not keep.all():
+        samples = Samples(samples.task_ids[keep], samples.operation_ids[keep], samples.minutes[keep])
+        sample_group = sample_group[keep]
+    stats = grouped_stats(sample_group, samples.minutes, fence=fence)
+
+    # outlier ids per group, furthest from the median first
+    median_of = dict(zip(stats["group"].tolist(), stats["p50"].tolist()))
+    flagged = np.flatnonzero(stats["outlier"])
+    flagged_groups = sample_group[flagged]
+    outliers: Dict[int, List[int]] = {}
+    for grp in np.unique(flagged_groups).tolist():
+        idx = flagged[flagged_groups == grp]
+        worst = idx[np.argsort(-np.abs(samples.minutes[idx] - median_of[grp]))[:OUTLIER_SAMPLE]]
+        outliers[grp] = samples.task_ids[worst].tolist()
+
+    rows = []
+    for i, grp in enumerate(stats["group"].tolist()):
+        code, machine_id = keys[grp]
+        rows.append({
+            "operation_code": code,
+            "machine_id": machine_id,
+            "task_count": int(stats["count"][i]),
+            "mean": round(float(stats["mean"][i]), 4),
+            "min": round(float(stats["min"][i]), 4),
+            "p50": round(float(stats["p50"][i]), 4),
+            "p90": round(float(stats["p90"][i]), 4),
+            "p99": round(float(stats["p99"][i]), 4),
+            "max": round(float(stats["max"][i]), 4),
+            "outlier_count": int(stats["outlier_count"][i]),
+            "outlier_task_ids": outliers.get(grp, []),
+        })
+    rows.sort(key=lambda r: (r["operation_code"], r["machine_id"] is None, r["machine_id"] or 0))
+    return rows
+
+
+class CycleTimeCache:
+    """Small LRU of computed results keyed by query parameters (see module docstring)."""
+
+    TABLES = (TaskDB.__tablename__, OperationDB.__tablename__)
+
+    def __init__(self, ttl: float, max_entries: int = 32):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, db: Session, key: Hashable, compute: Callable[[], object]):
+        """Cached value for `key` (and when it was computed), computing it when missing or stale."""
+        revs = get_revisions(db, self.TABLES)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] == revs or now - entry[1] < self.ttl):
+                self._entries.move_to_end(key)
+                return entry[2], entry[3]
+
+        value = compute()
+        computed_at = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            self._entries[key] = (revs, now, value, computed_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value, computed_at
+
+
+cache = CycleTimeCache(settings.cycle_time_cache_ttl)
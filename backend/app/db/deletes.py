@@ -0,0 +1,228 @@
+"""
+db/deletes.py
+
+Deleting orders and operations, one at a time and in bulk.
+
+operationsdb.order_id and tasksdb.operation_id are ON DELETE CASCADE, so an
+order (or an operation) goes with one DELETE and Postgres removes its children
+in the same statement. The cascaded rows never pass through the session hooks,
+so beforehand the same transaction leaves their tombstones for /changes
+(db/changes.py) and marks their hours for the rollups (db/rollups.py), and
+afterwards it bumps their tables' revisions.
+
+Large deletions run as delete jobs (POST /orders/bulk-delete): a delete_jobs
+row holds the selection, order numbers or a start_date range, and the
+JobRunner thread of some worker works it off BATCH_SIZE orders at a time, one
+transaction per batch. A batch holds its orders' rows until it commits, and
+/changes reports nothing stamped after a transaction that is still running
+(db/changes.py), so short batches keep both to milliseconds rather than the
+whole deletion. A batch commits the job's progress with it; a job whose worker
+went away is taken over after STALE_AFTER and carries on with the orders that
+are left. Archived orders are read-only and never selected.
+"""
+
+import datetime
+import logging
+import threading
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from .changes import tombstone
+from .database import SessionLocal
+from .models import OrderDB, OperationDB, TaskDB, DeleteJobDB
+from . import revisions, rollups
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = settings.delete_batch_size
+STALE_AFTER = datetime.timedelta(minutes=5)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# set by submit_job so this worker's runner starts at once instead of at its next poll
+_wakeup = threading.Event()
+
+
+def _tasks_going(db: Session, tasks_where) -> None:
+    tombstone(db, TaskDB.__table__, tasks_where)
+    rollups.mark_tasks(db, tasks_where)
+
+
+def delete_orders(db: Session, whereclause) -> List[Row]:
+    """
+    Delete the orders matching `whereclause` with their operations and tasks;
+    returns the (id, order_number) of the deleted orders. The caller commits.
+    """
+    # lock the orders, then their operations: new operations and tasks wait on their foreign key
+    # check until commit, so the tombstones and dirty marks below cover every row the cascade removes
+    db.execute(select(OrderDB.id).where(whereclause).with_for_update())
+    operations_where = OperationDB.order_id.in_(select(OrderDB.id).where(whereclause))
+    db.execute(select(OperationDB.id).where(operations_where).with_for_update())
+    _tasks_going(db, TaskDB.operation_id.in_(select(OperationDB.id).where(operations_where)))
+    tombstone(db, OperationDB.__table__, operations_where)
+    rows = db.execute(
+        delete(OrderDB)
+        .where(whereclause)
+        .returning(OrderDB.id, OrderDB.order_number)
+        .execution_options(synchronize_session=False)
+    ).all()
+    revisions.bump(db, [OperationDB.__tablename__, TaskDB.__tablename__])
+    return rows
+
+
+def delete_operation(db: Session, operation_id: int) -> Optional[Row]:
+    """
+    Delete an operation with its tasks; returns its (id, order_id,
+    operation_code, machine_id), or None if there is no such operation. The
+    caller recomputes the order's counters and commits.
+    """
+    # new tasks of the operation wait on their foreign key check until commit
+    db.execute(select(OperationDB.id).where(OperationDB.id == operation_id).with_for_update())
+    _tasks_going(db, TaskDB.operation_id == operation_id)
+    row = db.execute(
+        delete(OperationDB)
+        .where(OperationDB.id == operation_id)
+        .returning(OperationDB.id, OperationDB.order_id, OperationDB.operation_code, OperationDB.machine_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    revisions.bump(db, [TaskDB.__tablename__])
+    return row
+
+
+# -----------------------
+# Delete jobs
+# -----------------------
+def selection(job: DeleteJobDB):
+    """Filter on OrderDB for the orders a job deletes."""
+    if job.order_numbers is not None:
+        return OrderDB.order_number.in_(job.order_numbers)
+    return and_(OrderDB.start_date >= job.start_from, OrderDB.start_date <= job.start_to)
+
+
+def submit_job(
+    db: Session,
+    order_numbers: Optional[Sequence[int]] = None,
+    start_from: Optional[datetime.date] = None,
+    start_to: Optional[datetime.date] = None,
+) -> DeleteJobDB:
+    job = DeleteJobDB(
+        status=QUEUED,
+        order_numbers=list(order_numbers) if order_numbers is not None else None,
+        start_from=start_from,
+        start_to=start_to,
+        deleted=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _wakeup.set()
+    return job
+
+
+def claim_job(db: Session) -> Optional[DeleteJobDB]:
+    """Take the oldest queued job, or a running one whose worker stopped reporting progress, and commit."""
+    stale = func.now() - STALE_AFTER
+    job = db.scalars(
+        select(DeleteJobDB)
+        .where(or_(
+            DeleteJobDB.status == QUEUED,
+            and_(DeleteJobDB.status == RUNNING, DeleteJobDB.updated_at < stale),
+        ))
+        .order_by(DeleteJobDB.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if job is None:
+        return None
+    job.status = RUNNING
+    job.updated_at = func.now()
+    db.commit()
+    return job
+
+
+def _set_job(db: Session, job_id: int, **values) -> None:
+    db.execute(
+        update(DeleteJobDB)
+        .where(DeleteJobDB.id == job_id)
+        .values(updated_at=func.now(), **values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def run_job(
+    db: Session,
+    job: DeleteJobDB,
+    batch_size: int = BATCH_SIZE,
+    on_deleted: Optional[Callable[[List[Row]], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Delete a claimed job's orders `batch_size` at a time, committing after each
+    batch; `on_deleted` gets the (id, order_number) rows of every committed
+    batch. A job interrupted by `stop` goes back to the queue.
+    """
+    job_id, where = job.id, selection(job)
+    try:
+        while True:
+            if stop is not None and stop.is_set():
+                _set_job(db, job_id, status=QUEUED)
+                db.commit()
+                return
+            ids = db.scalars(select(OrderDB.id).where(where).order_by(OrderDB.id).limit(batch_size)).all()
+            if not ids:
+                break
+            rows = delete_orders(db, OrderDB.id.in_(ids))
+            _set_job(db, job_id, deleted=DeleteJobDB.deleted + len(rows))
+            db.commit()
+            if on_deleted is not None and rows:
+                on_deleted(rows)
+        _set_job(db, job_id, status=DONE, finished_at=func.now())
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        _set_job(db, job_id, status=FAILED, error=str(e), finished_at=func.now())
+        db.commit()
+        raise
+
+
+class JobRunner(threading.Thread):
+    """Runs the delete jobs, one after the other; checks for new ones every `interval` seconds or when woken."""
+
+    def __init__(self, interval: float, on_deleted: Optional[Callable[[List[Row]], None]] = None):
+        super().__init__(name="delete-job-runner", daemon=True)
+        self.interval = interval
+        self.on_deleted = on_deleted
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+        _wakeup.set()
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            _wakeup.clear()
+            db = SessionLocal()
+            try:
+                job = claim_job(db)
+                if job is not None:
+                    run_job(db, job, on_deleted=self.on_deleted, stop=self._stop)
+                    continue
+            except Exception:
+                db.rollback()
+                log.exception("delete job failed")
+            finally:
+                db.close()
+            _wakeup.wait(self.interval)
+
+
+def start_job_runner(engine, on_deleted: Optional[Callable[[List[Row]], None]] = None) -> Optional[JobRunner]:
+    """Start this worker's delete job runner (Postgres only, DELETE_JOB_POLL_INTERVAL > 0)."""
+    if engine.dialect.name != "postgresql" or settings.delete_job_poll_interval <= 0:
+        return None
+    runner = JobRunner(settings.delete_job_poll_interval, on_deleted)
+    runner.start()
+    return runner
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+db/export_tasks.py
+
+Write the task fact table as a Parquet (or Arrow IPC) dataset partitioned by
+production day, for pandas / notebooks / DuckDB:
+
+  <out>/start_date=2025-03-01/part-0.parquet
+  <out>/start_date=2025-03-02/part-0.parquet
+  <out>/_manifest.json
+
+Runs are incremental: only the days whose tasks were added, changed or deleted
+since the previous run into the same directory are rewritten, so a nightly job
+writes just the new and touched partitions. Postgres only.
+
+Examples:
+  python -m db.export_tasks --out /data/tasks
+  python -m db.export_tasks --out /data/tasks --from 2025-01-01 --to 2025-04-01
+  python -m db.export_tasks --out /data/tasks_arrow --format arrow --full
+
+Read it back with e.g. pandas.read_parquet("/data/tasks").
+"""
+
+import argparse
+import datetime
+import sys
+import time
+
+from core.config import settings
+from db.database import SessionLocal
+from db.columnar_export import BATCH_SIZE, FORMATS, export_partitions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export tasks as a day-partitioned Parquet/Arrow dataset.")
+    parser.add_argument("--out", required=True, help="Dataset directory (created if missing)")
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--from", dest="since", type=datetime.date.fromisoformat, metavar="YYYY-MM-DD", help="First day to export")
+    parser.add_argument("--to", dest="until", type=datetime.date.fromisoformat, metavar="YYYY-MM-DD", help="Day after the last one to export")
+    parser.add_argument("--full", action="store_true", help="Rewrite every day in range, not only the changed ones")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Rows fetched and written per batch")
+    args = parser.parse_args(argv)
+
+    session = SessionLocal()
+    t0 = time.perf_counter()
+    try:
+        result = export_partitions(
+            session, args.out, args.format, settings.plant_timezone,
+            since=args.since, until=args.until, full=args.full, batch_size=args.batch,
+        )
+        print(
+            f"✅ {len(result['written'])} partition(s) written, {len(result['removed'])} removed "
+            f"in {time.perf_counter() - t0:.1f}s."
+        )
+        return 0
+    except Exception as e:
+        print(f"❌ Error while exporting tasks: {e}")
+        return 2
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
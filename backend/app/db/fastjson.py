@@ -0,0 +1,171 @@
+"""
+db/fastjson.py
+
+Fast serialization path for the large list endpoints.
+
+Instead of loading ORM objects and letting `response_model` validate and copy
+every nested Operation/Task/User/Machine through Pydantic, these helpers select
+plain column tuples, stitch the tree together with dicts and encode it once
+with orjson. The dict keys mirror the field order of the schemas in
+db/schemas.py, so the wire shape is the same as the regular path.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence
+
+import orjson
+from sqlalchemy.orm import Session
+
+from .models import OrderDB, OperationDB, TaskDB, MachineDB, UserDB
+
+# Pydantic renders UTC offsets as "Z"; OPT_UTC_Z makes orjson do the same
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+# -----------------------
+# Column lists (order matches the schema field order)
+# -----------------------
+ORDER_COLUMNS = (
+    OrderDB.material_number,
+    OrderDB.start_date,
+    OrderDB.end_date,
+    OrderDB.num_pieces,
+    OrderDB.id,
+    OrderDB.order_number,
+)
+
+OPERATION_COLUMNS = (
+    OperationDB.order_id,
+    OperationDB.operation_code,
+    OperationDB.machine_id,
+    OperationDB.id,
+)
+
+MACHINE_COLUMNS = (
+    MachineDB.machine_location,
+    MachineDB.description,
+    MachineDB.machine_id,
+    MachineDB.machine_type,
+    MachineDB.active,
+    MachineDB.id,
+)
+
+TASK_COLUMNS = (
+    TaskDB.process_type,
+    TaskDB.start_at,
+    TaskDB.end_at,
+    TaskDB.num_benches,
+    TaskDB.num_machines,
+    TaskDB.good_pieces,
+    TaskDB.bad_pieces,
+    TaskDB.operator_user_id,
+    TaskDB.operator_bitzer_id,
+    TaskDB.notes,
+    TaskDB.id,
+    TaskDB.operation_id,
+)
+
+USER_COLUMNS = (
+    UserDB.name,
+    UserDB.bitzer_id,
+    UserDB.active,
+    UserDB.is_admin,
+    UserDB.id,
+    UserDB.created_at,
+    UserDB.updated_at,
+)
+
+_ORDER_KEYS = tuple(c.key for c in ORDER_COLUMNS)
+_OPERATION_KEYS = tuple(c.key for c in OPERATION_COLUMNS)
+_MACHINE_KEYS = tuple(c.key for c in MACHINE_COLUMNS)
+_TASK_KEYS = tuple(c.key for c in TASK_COLUMNS)
+_USER_KEYS = tuple(c.key for c in USER_COLUMNS)
+
+_N_OP = len(OPERATION_COLUMNS)
+_N_TASK = len(TASK_COLUMNS)
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, option=ORJSON_OPTIONS)
+
+
+# -----------------------
+# Row -> dict assembly (pure, no DB access)
+# -----------------------
+def assemble_tasks(task_rows: Iterable[Sequence]) -> List[Dict[str, Any]]:
+    """Rows are TASK_COLUMNS followed by USER_COLUMNS (user part all None when unassigned)."""
+    out = []
+    for row in task_rows:
+        task = dict(zip(_TASK_KEYS, row[:_N_TASK]))
+        user = row[_N_TASK:]
+        task["operator_user"] = dict(zip(_USER_KEYS, user)) if user[-3] is not None else None
+        out.append(task)
+    return out
+
+
+def assemble_operations(operation_rows: Iterable[Sequence], tasks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows are OPERATION_COLUMNS followed by MACHINE_COLUMNS; tasks are attached by operation_id."""
+    by_operation = defaultdict(list)
+    for t in tasks:
+        by_operation[t["operation_id"]].append(t)
+
+    out = []
+    for row in operation_rows:
+        op = dict(zip(_OPERATION_KEYS, row[:_N_OP]))
+        machine = row[_N_OP:]
+        op["tasks"] = by_operation.get(op["id"], [])
+        op["machine"] = dict(zip(_MACHINE_KEYS, machine)) if machine[-1] is not None else None
+        out.append(op)
+    return out
+
+
+def assemble_orders(order_rows: Iterable[Sequence], operations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    by_order = defaultdict(list)
+    for op in operations:
+        by_order[op["order_id"]].append(op)
+
+    out = []
+    for row in order_rows:
+        order = dict(zip(_ORDER_KEYS, row))
+        order["operations"] = by_order.get(order["id"], [])
+        out.append(order)
+    return out
+
+
+# -----------------------
+# DB fetchers
+# -----------------------
+def order_rows_query(db: Session):
+    return db.query(*ORDER_COLUMNS)
+
+
+def _prefixed(prefix: str, columns):
+    # joined tables share column names (id, machine_id, ...); labels keep the
+    # task/operation values reachable by name, e.g. for the pagination cursor
+    return [c.label(f"{prefix}_{c.key}") for c in columns]
+
+
+def task_rows_query(db: Session):
+    return db.query(*TASK_COLUMNS, *_prefixed("user", USER_COLUMNS)).outerjoin(UserDB, UserDB.id == TaskDB.operator_user_id)
+
+
+def fetch_operations(db: Session, order_ids: List[int]) -> List[Dict[str, Any]]:
+    """Operations (with machine and tasks) for the given orders in two queries."""
+    if not order_ids:
+        return []
+    op_rows = (
+        db.query(*OPERATION_COLUMNS, *_prefixed("machine", MACHINE_COLUMNS))
+        .outerjoin(MachineDB, MachineDB.id == OperationDB.machine_id)
+        .filter(OperationDB.order_id.in_(order_ids))
+        .order_by(OperationDB.id)
+        .all()
+    )
+    op_ids = [r[3] for r in op_rows]
+    task_rows = []
+    if op_ids:
+        task_rows = task_rows_query(db).filter(TaskDB.operation_id.in_(op_ids)).order_by(TaskDB.id).all()
+    return assemble_operations(op_rows, assemble_tasks(task_rows))
+
+
+def build_orders(db: Session, order_rows: Sequence) -> List[Dict[str, Any]]:
+    """Full Order trees for already-fetched ORDER_COLUMNS rows."""
+    return assemble_orders(order_rows, fetch_operations(db, [r.id for r in order_rows]))
@@ -0,0 +1,156 @@
+"""
+db/invalidation.py
+
+Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+
+Write handlers call `notify(db, entity, row_id)` before committing. The
+message is a pg_notify on CHANNEL inside the writing transaction, so Postgres
+delivers it to the other workers/replicas only if the transaction commits; the
+writing process dispatches it to its own subscribers right after the commit.
+
+Every worker runs a Listener thread (started from main.py) holding one
+dedicated connection that LISTENs on CHANNEL and calls the subscribers
+registered with `subscribe(entity, callback)` (see db/reference_cache.py).
+When the listener (re)connects it dispatches an "everything changed" message
+(entity None), since notifications sent while it was away are lost.
+
+On other databases (sqlite in development) notify() only dispatches locally.
+"""
+
+import json
+import logging
+import os
+import select
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from .database import AppSession
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+
+# (pid, id) of this process, so the listener skips messages it already dispatched
+_origin = (None, None)
+
+# callback(entity, row_id); entity None means "anything may have changed"
+Callback = Callable[[Optional[str], Optional[int]], None]
+
+_subscribers: Dict[Optional[str], List[Callback]] = defaultdict(list)
+_PENDING_KEY = "pending_invalidations"
+
+
+def subscribe(entity: Optional[str], callback: Callback) -> None:
+    """Call `callback` for every invalidation of `entity` (or of every entity when None)."""
+    _subscribers[entity].append(callback)
+
+
+def dispatch(entity: Optional[str], row_id: Optional[int] = None) -> None:
+    if entity is None:
+        callbacks = [cb for cbs in _subscribers.values() for cb in cbs]
+    else:
+        callbacks = _subscribers.get(entity, []) + _subscribers.get(None, [])
+    for cb in callbacks:
+        try:
+            cb(entity, row_id)
+        except Exception:
+            log.exception("cache invalidation callback failed for %s/%s", entity, row_id)
+
+
+def origin() -> str:
+    """
+    Id of the current process in the messages it sends. Made on first use in
+    each process rather than at import: workers forked from a preloaded app
+    would otherwise share it and skip each other's messages.
+    """
+    global _origin
+    pid = os.getpid()
+    if _origin[0] != pid:
+        _origin = (pid, uuid.uuid4().hex)
+    return _origin[1]
+
+
+def notify(db: Session, entity: str, row_id: Optional[int] = None) -> None:
+    """Announce a change of `entity` (row `row_id`, or unspecified rows when None) once `db` commits."""
+    db.info.setdefault(_PENDING_KEY, []).append((entity, row_id))
+    if db.get_bind().dialect.name == "postgresql":
+        payload = json.dumps({"entity": entity, "id": row_id, "origin": origin()})
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+
+@event.listens_for(AppSession, "after_commit")
+def _dispatch_committed(session):
+    for entity, row_id in session.info.pop(_PENDING_KEY, ()):
+        dispatch(entity, row_id)
+
+
+@event.listens_for(AppSession, "after_rollback")
+def _drop_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class Listener(threading.Thread):
+    """Background LISTEN loop on a dedicated connection detached from the engine's pool."""
+
+    POLL_SECONDS = 5.0
+    RETRY_SECONDS = 5.0
+
+    def __init__(self, engine):
+        super().__init__(name="cache-invalidation-listener", daemon=True)
+        self.engine = engine
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                log.exception("cache invalidation listener lost its connection; retrying")
+                self._stop.wait(self.RETRY_SECONDS)
+
+    def _listen(self) -> None:
+        proxy = self.engine.raw_connection()
+        proxy.detach()
+        conn = proxy.dbapi_connection
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            # anything may have changed while we were not listening
+            dispatch(None)
+
+            while not self._stop.is_set():
+                if select.select([conn], [], [], self.POLL_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._handle(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def _handle(self, payload: str) -> None:
+        try:
+            msg = json.loads(payload)
+        except ValueError:
+            log.warning("ignoring malformed invalidation message %r", payload)
+            return
+        if msg.get("origin") == origin():
+            return
+        dispatch(msg.get("entity"), msg.get("id"))
+
+
+def start_listener(engine) -> Optional[Listener]:
+    """Start the LISTEN thread for this worker (Postgres only); returns None elsewhere."""
+    if engine.dialect.name != "postgresql":
+        return None
+    listener = Listener(engine)
+    listener.start()
+    return listener
@@ -1,16 +1,22 @@
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     Date,
     DateTime,
     ForeignKey,
     Enum,
+    Sequence,
     Boolean,
+    Float,
     Text,
+    Index,
+    UniqueConstraint,
     func,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import relationship, selectinload, joinedload
 import enum
 from .database import Base
 
@@ -40,8 +46,25 @@ class OrderDB(Base):
 
     num_pieces = Column(Integer, nullable=False)
 
-    # relationships
-    operations = relationship("OperationDB", back_populates="order")
+    # progress counters, maintained by db/counters.py on every task write
+    good_pieces = Column(Integer, nullable=False, default=0, server_default="0")
+    bad_pieces = Column(Integer, nullable=False, default=0, server_default="0")
+    task_count = Column(Integer, nullable=False, default=0, server_default="0")
+    open_task_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
+
+    # change stamp for delta sync, set on every insert/update (see db/changes.py)
+    change_stamp = Column(BigInteger, nullable=True, index=True)
+
+    # relationships; the database deletes an order's operations (and their tasks) with it
+    operations = relationship("OperationDB", back_populates="order", passive_deletes=True)
+
+    # (sort column, id) indexes back the keyset pagination on /orders
+    __table_args__ = (
+        Index("ix_ordersdb_start_date_id", "start_date", "id"),
+        Index("ix_ordersdb_end_date_id", "end_date", "id"),
+        Index("ix_ordersdb_material_number_id", "material_number", "id"),
+    )
 
 
 class MachineDB(Base):
@@ -54,7 +77,10 @@ class MachineDB(Base):
     machine_type = Column(Enum(MachineType), nullable=False)
 
     active = Column(Boolean, nullable=False, default=True)
-    
+
+    # change stamp for delta sync, set on every insert/update (see db/changes.py)
+    change_stamp = Column(BigInteger, nullable=True, index=True)
+
     # relationships
     operations = relationship("OperationDB", back_populates="machine")
     
@@ -71,6 +97,9 @@ class UserDB(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # change stamp for delta sync, set on every insert/update (see db/changes.py)
+    change_stamp = Column(BigInteger, nullable=True, index=True)
+
     # relationships
     tasks = relationship("TaskDB", back_populates="operator_user")
 
@@ -78,21 +107,44 @@ class OperationDB(Base):
     __tablename__ = "operationsdb"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    order_id = Column(Integer, ForeignKey("ordersdb.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("ordersdb.id", ondelete="CASCADE"), nullable=False)
     operation_code = Column(String, nullable=False)
     machine_id = Column(Integer, ForeignKey("machinesdb.id"), nullable=True)
 
+    # progress counters, maintained by db/counters.py on every task write
+    good_pieces = Column(Integer, nullable=False, default=0, server_default="0")
+    bad_pieces = Column(Integer, nullable=False, default=0, server_default="0")
+    task_count = Column(Integer, nullable=False, default=0, server_default="0")
+    open_task_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
+
+    # change stamp for delta sync, set on every insert/update (see db/changes.py)
+    change_stamp = Column(BigInteger, nullable=True, index=True)
+
     # relationships
     order = relationship("OrderDB", back_populates="operations")
     machine = relationship("MachineDB", back_populates="operations")
-    tasks = relationship("TaskDB", back_populates="operation")
+    tasks = relationship("TaskDB", back_populates="operation", passive_deletes=True)
+
+    # one operation per code within an order; also backs the (order_number, operation_code) lookup
+    # and, as its leading column, every lookup by order_id
+    __table_args__ = (
+        UniqueConstraint("order_id", "operation_code", name="uq_operationsdb_order_id_operation_code"),
+        Index("ix_operationsdb_machine_id", "machine_id"),
+    )
+
+
+# tasksdb is range partitioned by month of start_at on Postgres (see db/partitions.py). A partitioned
+# table cannot have a primary key that leaves out the partition key, and start_at may be null, so ids
+# come from this sequence and each partition has its own primary key on id
+TASK_ID_SEQ = Sequence("tasksdb_id_seq")
 
 
 class TaskDB(Base):
     __tablename__ = "tasksdb"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    operation_id = Column(Integer, ForeignKey("operationsdb.id"), nullable=False)
+    id = Column(Integer, TASK_ID_SEQ, server_default=TASK_ID_SEQ.next_value(), nullable=False, insert_sentinel=True)
+    operation_id = Column(Integer, ForeignKey("operationsdb.id", ondelete="CASCADE"), nullable=False)
     process_type = Column(Enum(ProcessType), nullable=False)
 
     operator_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -110,6 +162,234 @@ class TaskDB(Base):
     
     notes = Column(Text, nullable=True)
 
+    # change stamp for delta sync, set on every insert/update (see db/changes.py)
+    change_stamp = Column(BigInteger, nullable=True, index=True)
+
     # relationships
     operator_user = relationship("UserDB", back_populates="tasks")
     operation = relationship("OperationDB", back_populates="tasks")
+
+    # (sort column, id) indexes back the keyset pagination on /tasks; the foreign key
+    # indexes back the per-operation task reads/counters and the user delete check
+    __table_args__ = (
+        Index("ix_tasksdb_start_at_id", "start_at", "id"),
+        Index("ix_tasksdb_end_at_id", "end_at", "id"),
+        Index("ix_tasksdb_operation_id_start_at", "operation_id", "start_at"),
+        Index("ix_tasksdb_operator_user_id", "operator_user_id"),
+        {"postgresql_partition_by": "RANGE (start_at)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# delta-sync change stamps, one per writing transaction (see db/changes.py)
+CHANGE_STAMP_SEQ = Sequence("change_stamp_seq", metadata=Base.metadata)
+
+
+class TableRevisionDB(Base):
+    """Monotonic per-table change counter, bumped by every write (see db/revisions.py)."""
+    __tablename__ = "table_revisions"
+
+    table_name = Column(String, primary_key=True)
+    revision = Column(BigInteger, nullable=False, default=0)
+
+
+class DeletedRowDB(Base):
+    """Tombstone for a deleted row, so /changes can report deletions (see db/changes.py)."""
+    __tablename__ = "deleted_rows"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    change_stamp = Column(BigInteger, nullable=False, index=True)
+
+
+# -----------------------
+# Archive of closed orders (see db/archive.py)
+# -----------------------
+# Same columns and ids as the hot tables; archived rows are read-only. Machines and
+# users are referenced without foreign keys, so they can still be deleted later. The
+# foreign keys inside the archive are checked at commit: tasks move before their operations.
+class OrderArchiveDB(Base):
+    __tablename__ = "ordersdb_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_number = Column(Integer, unique=True, nullable=False)
+    material_number = Column(Integer, nullable=False)
+
+    start_date = Column(Date, nullable=True)
+    end_date = Column(Date, nullable=True)
+
+    num_pieces = Column(Integer, nullable=False)
+
+    good_pieces = Column(Integer, nullable=False)
+    bad_pieces = Column(Integer, nullable=False)
+    task_count = Column(Integer, nullable=False)
+    open_task_count = Column(Integer, nullable=False)
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
+
+    change_stamp = Column(BigInteger, nullable=True)
+    archived_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # relationships
+    operations = relationship("OperationArchiveDB", back_populates="order")
+
+
+class OperationArchiveDB(Base):
+    __tablename__ = "operationsdb_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, ForeignKey("ordersdb_archive.id", deferrable=True, initially="DEFERRED"), nullable=False, index=True)
+    operation_code = Column(String, nullable=False)
+    machine_id = Column(Integer, nullable=True)
+
+    good_pieces = Column(Integer, nullable=False)
+    bad_pieces = Column(Integer, nullable=False)
+    task_count = Column(Integer, nullable=False)
+    open_task_count = Column(Integer, nullable=False)
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
+
+    change_stamp = Column(BigInteger, nullable=True)
+
+    # relationships
+    order = relationship("OrderArchiveDB", back_populates="operations")
+    machine = relationship("MachineDB", primaryjoin="foreign(OperationArchiveDB.machine_id) == MachineDB.id", viewonly=True)
+    tasks = relationship("TaskArchiveDB", back_populates="operation")
+
+
+class TaskArchiveDB(Base):
+    __tablename__ = "tasksdb_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    operation_id = Column(Integer, ForeignKey("operationsdb_archive.id", deferrable=True, initially="DEFERRED"), nullable=False, index=True)
+    process_type = Column(Enum(ProcessType), nullable=False)
+
+    operator_user_id = Column(Integer, nullable=True)
+    operator_bitzer_id = Column(Integer, nullable=True)
+
+    start_at = Column(DateTime(timezone=True), nullable=True)
+    end_at = Column(DateTime(timezone=True), nullable=True)
+
+    num_benches = Column(Integer, nullable=True)
+    num_machines = Column(Integer, nullable=True)
+
+    good_pieces = Column(Integer, nullable=True)
+    bad_pieces = Column(Integer, nullable=True)
+
+    notes = Column(Text, nullable=True)
+
+    change_stamp = Column(BigInteger, nullable=True)
+
+    # relationships
+    operator_user = relationship("UserDB", primaryjoin="foreign(TaskArchiveDB.operator_user_id) == UserDB.id", viewonly=True)
+    operation = relationship("OperationArchiveDB", back_populates="tasks")
+
+    # start_at ranges of the exports and rollup rebuilds
+    __table_args__ = (
+        Index("ix_tasksdb_archive_start_at_id", "start_at", "id"),
+    )
+
+
+# -----------------------
+# Task rollups (see db/rollups.py)
+# -----------------------
+class TaskHourlyRollupDB(Base):
+    """Tasks aggregated per UTC hour of start_at and (machine, operation code, operator, process type)."""
+    __tablename__ = "task_rollup_hourly"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    machine_id = Column(Integer, nullable=True)
+    operation_code = Column(String, nullable=True)
+    operator_user_id = Column(Integer, nullable=True)
+    process_type = Column(Enum(ProcessType), nullable=False)
+
+    task_count = Column(Integer, nullable=False)
+    good_pieces = Column(Integer, nullable=False)
+    bad_pieces = Column(Integer, nullable=False)
+    busy_minutes = Column(Float, nullable=False)     # summed durations of the finished tasks
+
+
+class TaskDailyRollupDB(Base):
+    """The hourly rollup summed per production day in the plant time zone."""
+    __tablename__ = "task_rollup_daily"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False, index=True)
+
+    machine_id = Column(Integer, nullable=True)
+    operation_code = Column(String, nullable=True)
+    operator_user_id = Column(Integer, nullable=True)
+    process_type = Column(Enum(ProcessType), nullable=False)
+
+    task_count = Column(Integer, nullable=False)
+    good_pieces = Column(Integer, nullable=False)
+    bad_pieces = Column(Integer, nullable=False)
+    busy_minutes = Column(Float, nullable=False)
+
+
+class RollupDirtyDB(Base):
+    """Old start_at of a task that moved or was deleted, so the refresher also rebuilds the bucket it left."""
+    __tablename__ = "rollup_dirty"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    start_at = Column(DateTime(timezone=True), nullable=False)
+    change_stamp = Column(BigInteger, nullable=False, index=True)
+
+
+class RollupStateDB(Base):
+    """Change stamp up to which the rollups are current."""
+    __tablename__ = "rollup_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(BigInteger, nullable=False, default=0)
+    refreshed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class DeleteJobDB(Base):
+    """Background bulk delete of orders, by order number or start_date range (see db/deletes.py)."""
+    __tablename__ = "delete_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    status = Column(String, nullable=False, default="queued")      # queued | running | done | failed
+    order_numbers = Column(ARRAY(Integer), nullable=True)
+    start_from = Column(Date, nullable=True)
+    start_to = Column(Date, nullable=True)
+    deleted = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # moved forward by every committed batch; a running job that stops moving is taken over
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# -----------------------
+# Loader strategies
+# -----------------------
+# The response schemas walk order -> operations -> tasks -> operator_user and
+# operation -> machine. Lazy loading that tree issues one query per node, so the
+# read endpoints pass these options to load each level in a single extra query.
+def task_load_options():
+    return (joinedload(TaskDB.operator_user),)
+
+
+def operation_load_options():
+    return (
+        joinedload(OperationDB.machine),
+        selectinload(OperationDB.tasks).joinedload(TaskDB.operator_user),
+    )
+
+
+def order_load_options():
+    return (
+        selectinload(OrderDB.operations).joinedload(OperationDB.machine),
+        selectinload(OrderDB.operations).selectinload(OperationDB.tasks).joinedload(TaskDB.operator_user),
+    )
+
+
+def archived_order_load_options():
+    return (
+        selectinload(OrderArchiveDB.operations).joinedload(OperationArchiveDB.machine),
+        selectinload(OrderArchiveDB.operations).selectinload(OperationArchiveDB.tasks).joinedload(TaskArchiveDB.operator_user),
+    )
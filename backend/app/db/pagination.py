@@ -0,0 +1,120 @@
+"""
+db/pagination.py
+
+Keyset (cursor) pagination for the list endpoints.
+
+Pages are ordered by (sort column, id) and the cursor carries the last row's
+values, so the next page is a range condition the database answers from the
+(sort column, id) index instead of skipping OFFSET rows. Rows whose sort value
+is NULL come after (ascending) or before (descending) the others and are paged
+through as a separate range of the same index.
+"""
+
+import base64
+import datetime
+import json
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, tuple_
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(value: Any, row_id: int) -> str:
+    """Pack the sort value and id of the last row into an opaque token."""
+    kind = None
+    if isinstance(value, datetime.datetime):
+        kind, value = "datetime", value.isoformat()
+    elif isinstance(value, datetime.date):
+        kind, value = "date", value.isoformat()
+    elif hasattr(value, "value"):  # enums
+        value = value.value
+    raw = json.dumps({"v": value, "t": kind, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, kind, row_id = data["v"], data.get("t"), int(data["id"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if value is not None:
+        if kind == "datetime":
+            value = datetime.datetime.fromisoformat(value)
+        elif kind == "date":
+            value = datetime.date.fromisoformat(value)
+    return value, row_id
+
+
+def _phases(sort_col, id_col, after: Optional[Tuple[Any, int]], descending: bool) -> List[Tuple[Any, list]]:
+    """
+    (filter, ordering) of the index ranges the page is read from, in page order.
+
+    Ascending sorts put NULLs last and descending sorts put them first, the
+    order a B-tree index on (sort column, id) yields in either direction, so a
+    first page is one scan from the start of the index. After a cursor the
+    rows with a sort value and the NULL rows are two ranges, each with a single
+    range start: the row-value comparison (sort, id) > (value, last_id), which
+    skips NULLs, and `sort IS NULL AND id > last_id`. The cursor's value says
+    which of the two it stopped in.
+    """
+    by_id = id_col.desc() if descending else id_col.asc()
+    if sort_col is id_col:
+        if after is None:
+            return [(None, [by_id])]
+        return [(id_col < after[1] if descending else id_col > after[1], [by_id])]
+
+    by_value = sort_col.desc().nulls_first() if descending else sort_col.asc().nulls_last()
+    if after is None:
+        return [(None, [by_value, by_id])]
+
+    value, last_id = after
+    nullable = getattr(sort_col.expression, "nullable", True)
+    if value is None:
+        # stopped among the NULLs: the rest of them, then (descending) every value
+        nulls = and_(sort_col.is_(None), id_col < last_id if descending else id_col > last_id)
+        phases = [(nulls, [by_id])]
+        if descending:
+            phases.append((sort_col.isnot(None), [by_value, by_id]))
+        return phases
+
+    key = tuple_(sort_col, id_col)
+    phases = [(key < (value, last_id) if descending else key > (value, last_id), [by_value, by_id])]
+    if nullable and not descending:
+        phases.append((sort_col.is_(None), [by_id]))
+    return phases
+
+
+def paginate(
+    query,
+    sort_col,
+    id_col,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Apply keyset ordering/filtering to `query` and return (rows, next_cursor).
+
+    With no `limit` every remaining row is returned and next_cursor is None.
+    """
+    cursor = decode_cursor(after) if after else None
+    rows: List[Any] = []
+    for where, ordering in _phases(sort_col, id_col, cursor, descending):
+        q = query.filter(where) if where is not None else query
+        q = q.order_by(*ordering)
+        if limit is None:
+            rows.extend(q.all())
+            continue
+        rows.extend(q.limit(limit + 1 - len(rows)).all())
+        if len(rows) > limit:
+            break
+
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_col.key), getattr(last, id_col.key))
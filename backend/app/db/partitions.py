@@ -0,0 +1,146 @@
+"""
+db/partitions.py
+
+Monthly range partitions of tasksdb (Postgres).
+
+tasksdb is declared PARTITION BY RANGE (start_at) in db/models.py. Each month
+lives in its own table, tasksdb_pYYYY_MM, holding [first of the month, first of
+the next) in UTC, with a primary key on id. tasksdb_default takes the tasks
+without start_at and any month that has no partition yet. Queries with a
+start_at bound (/tasks?start_from=..., analytics, rollups, exports) only visit
+the months they need, and old months can be detached, which only changes the
+catalog, and then be dumped or dropped on their own.
+
+`ensure_partitions` creates the months up to `ahead` months from now; the app
+runs it at start-up and `python -m db.task_partitions` from cron keeps it ahead
+of the calendar. A month created after some of its tasks already went to the
+default partition takes those rows over.
+"""
+
+import datetime
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .models import TaskDB
+
+PARENT = TaskDB.__tablename__
+DEFAULT_PARTITION = f"{PARENT}_default"
+MONTHS_AHEAD = 3
+
+_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def month_start(d: datetime.date) -> datetime.date:
+    return d.replace(day=1)
+
+
+def add_months(month: datetime.date, n: int) -> datetime.date:
+    y, m = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return datetime.date(y, m + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{PARENT}_p{month:%Y_%m}"
+
+
+def _bound(month: datetime.date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.scalar(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"), {"t": PARENT}
+    ))
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, Optional[datetime.datetime], Optional[datetime.datetime]]]:
+    """(name, lower, upper) of every partition, oldest first; the default partition has no bounds."""
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:t)"
+    ), {"t": PARENT})
+    out = []
+    for name, bound in rows:
+        m = _BOUND.search(bound)
+        if m:
+            out.append((name, datetime.datetime.fromisoformat(m.group(1)), datetime.datetime.fromisoformat(m.group(2))))
+        else:
+            out.append((name, None, None))
+    out.sort(key=lambda p: (p[1] is not None, p[1] or datetime.datetime.min))
+    return out
+
+
+def ensure_default(conn: Connection) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} (PRIMARY KEY (id)) DEFAULT"
+    ))
+
+
+def create_month(conn: Connection, month: datetime.date) -> None:
+    """Create the partition of `month`, moving its rows out of the default partition if there are any."""
+    name, lo, hi = partition_name(month), _bound(month), _bound(add_months(month, 1))
+    # keeps new rows of this month from landing in the default partition while we work
+    conn.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE"))
+    stray = conn.scalar(text(
+        f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE start_at >= :lo AND start_at < :hi"
+    ), {"lo": lo, "hi": hi})
+    if not stray:
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT} (PRIMARY KEY (id)) FOR VALUES FROM ('{lo}') TO ('{hi}')"
+        ))
+        return
+
+    # build it outside the parent, then attach: the indexes and foreign keys come from the parent
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS, PRIMARY KEY (id))"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE start_at >= :lo AND start_at < :hi RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"lo": lo, "hi": hi})
+    conn.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+
+
+def ensure_partitions(conn: Connection, ahead: int = MONTHS_AHEAD, since: Optional[datetime.date] = None) -> List[str]:
+    """Create the default partition and the months from `since` (default: this month) to `ahead` months out."""
+    if not is_partitioned(conn):
+        return []
+    ensure_default(conn)
+    existing = {name for name, _, _ in list_partitions(conn)}
+    this_month = month_start(datetime.datetime.now(datetime.timezone.utc).date())
+    month = month_start(since) if since else this_month
+    created = []
+    while month <= add_months(this_month, ahead):
+        if partition_name(month) not in existing:
+            create_month(conn, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_before(conn: Connection, before: datetime.date, drop: bool = False) -> List[str]:
+    """
+    Detach (and optionally drop) the month partitions that end on or before
+    `before`. Detached tables keep their rows under the same name. Their tasks
+    leave the API, and the counters on operations/orders keep counting them
+    until `python -m db.repair_counters` runs.
+    """
+    cutoff = datetime.datetime.combine(month_start(before), datetime.time(), tzinfo=datetime.timezone.utc)
+    detached = []
+    for name, _, upper in list_partitions(conn):
+        if upper is not None and upper <= cutoff:
+            conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+            if drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+            detached.append(name)
+    return detached
+
+
+def ensure_task_partitions(engine, ahead: int = MONTHS_AHEAD) -> List[str]:
+    """Start-up hook: make sure inserts have a partition to go to (no-op unless tasksdb is partitioned)."""
+    with engine.begin() as conn:
+        return ensure_partitions(conn, ahead)
@@ -0,0 +1,108 @@
+"""
+db/pool_stats.py
+
+Connection pool instrumentation: pool classes that time every checkout
+(waiting for a free connection, opening a new one and the pre-ping), and a
+snapshot function used by the /admin/pool endpoint.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# latest checkout durations kept per pool for the percentiles
+WINDOW = 10_000
+
+
+class CheckoutStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WINDOW)
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self._waits.append(seconds)
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts, timeouts = self.checkouts, self.timeouts
+
+        def pct(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000, 3)
+
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_ms_p50": pct(50),
+            "wait_ms_p95": pct(95),
+            "wait_ms_p99": pct(99),
+            "wait_ms_max": round(waits[-1] * 1000, 3) if waits else None,
+        }
+
+
+class _TimedCheckout:
+    """Mixin: record how long each connect() (pool checkout) takes."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.checkout_stats = CheckoutStats()
+
+    def recreate(self):
+        # pool recreation (e.g. after dispose) keeps the accumulated stats
+        new = super().recreate()
+        new.checkout_stats = self.checkout_stats
+        return new
+
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            self.checkout_stats.record(time.perf_counter() - t0, timed_out=True)
+            raise
+        self.checkout_stats.record(time.perf_counter() - t0)
+        return conn
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool) -> Dict:
+    status = {
+        "pool_class": type(pool).__name__,
+        "size": None,
+        "checked_out": None,
+        "idle": None,
+        "overflow": None,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    stats = getattr(pool, "checkout_stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
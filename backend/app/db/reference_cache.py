@@ -0,0 +1,132 @@
+"""
+db/reference_cache.py
+
+In-process TTL cache of the reference tables (machines and users), which the
+task/operation dialogs list on every open and the task handlers consult to
+snapshot operator bitzer_ids, but which change only a few times a week.
+
+Each table is cached as one snapshot of all its rows (validated response
+schemas), reloaded through the caller's session when its TTL runs out or
+after `invalidate`. Tables with more than `max_entries` rows are not cached
+and callers fall back to the database. Lookups by id that miss the snapshot
+also go to the database, so a row created by another process is never
+reported as missing.
+
+The machine and user write handlers announce their changes through
+db/invalidation.py, which drops the snapshot in every worker once the write
+commits.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from .models import MachineDB, UserDB
+from . import schemas as s
+from . import invalidation
+
+MACHINES = MachineDB.__tablename__
+USERS = UserDB.__tablename__
+
+CACHED_TABLES = {
+    MACHINES: (MachineDB, s.Machine),
+    USERS: (UserDB, s.User),
+}
+
+
+class _Snapshot:
+    __slots__ = ("rows", "by_id", "expires_at")
+
+    def __init__(self, rows, expires_at: float):
+        self.rows = rows
+        self.by_id = {r.id: r for r in rows}
+        self.expires_at = expires_at
+
+
+class ReferenceCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, _Snapshot] = {}
+        # bumped by invalidate() so a load that raced with a write is discarded
+        self._generations: Dict[str, int] = {name: 0 for name in CACHED_TABLES}
+
+    def _snapshot(self, db: Session, table: str) -> Optional[_Snapshot]:
+        if self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            snap = self._snapshots.get(table)
+            generation = self._generations[table]
+        if snap is not None and snap.expires_at > now:
+            return snap
+
+        model, schema = CACHED_TABLES[table]
+        objs = db.scalars(select(model).order_by(model.id).limit(self.max_entries + 1)).all()
+        if len(objs) > self.max_entries:
+            return None
+        snap = _Snapshot([schema.model_validate(o) for o in objs], now + self.ttl)
+        with self._lock:
+            if self._generations[table] == generation:
+                self._snapshots[table] = snap
+        return snap
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        """Drop the snapshot of `table` (every table when None)."""
+        with self._lock:
+            for name in ([table] if table else list(CACHED_TABLES)):
+                self._generations[name] += 1
+                self._snapshots.pop(name, None)
+
+    def warm(self, engine) -> None:
+        with Session(engine) as db:
+            for table in CACHED_TABLES:
+                self._snapshot(db, table)
+
+    # -----------------------
+    # Lookups
+    # -----------------------
+    def machines(self, db: Session) -> Optional[List[s.Machine]]:
+        """Every machine ordered by id, or None if the table is not cached."""
+        snap = self._snapshot(db, MACHINES)
+        return snap.rows if snap else None
+
+    def users(self, db: Session) -> Optional[List[s.User]]:
+        """Every user ordered by id, or None if the table is not cached."""
+        snap = self._snapshot(db, USERS)
+        return snap.rows if snap else None
+
+    def _get(self, db: Session, table: str, row_id: int):
+        snap = self._snapshot(db, table)
+        if snap is not None and row_id in snap.by_id:
+            return snap.by_id[row_id]
+        model, schema = CACHED_TABLES[table]
+        obj = db.get(model, row_id)
+        return schema.model_validate(obj) if obj is not None else None
+
+    def machine(self, db: Session, machine_id: int) -> Optional[s.Machine]:
+        return self._get(db, MACHINES, machine_id)
+
+    def user(self, db: Session, user_id: int) -> Optional[s.User]:
+        return self._get(db, USERS, user_id)
+
+    def bitzer_ids(self, db: Session, user_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+        """bitzer_id per existing user id; unknown ids are left out."""
+        user_ids = set(user_ids)
+        snap = self._snapshot(db, USERS)
+        found = {uid: snap.by_id[uid].bitzer_id for uid in user_ids if uid in snap.by_id} if snap else {}
+        missing = user_ids - found.keys()
+        if missing:
+            found.update(db.execute(select(UserDB.id, UserDB.bitzer_id).where(UserDB.id.in_(missing))).all())
+        return found
+
+
+reference_cache = ReferenceCache(settings.reference_cache_ttl, settings.reference_cache_max_entries)
+
+for _table in CACHED_TABLES:
+    invalidation.subscribe(_table, lambda entity, row_id: reference_cache.invalidate(entity))
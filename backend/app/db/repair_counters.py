@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+db/repair_counters.py
+
+Recompute the progress counters on operationsdb / ordersdb from tasksdb.
+Use after manual SQL edits, restores, or if the counters are ever suspected
+to have drifted.
+
+Examples:
+  python -m db.repair_counters
+  python -m db.repair_counters --order 123456 --order 123457
+"""
+
+import argparse
+import sys
+
+from db.database import SessionLocal
+from db.models import OrderDB
+from db.counters import recompute
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute operation/order progress counters from tasks.")
+    parser.add_argument("--order", type=int, action="append", metavar="ORDER_NUMBER", help="Only repair this order (repeatable)")
+    args = parser.parse_args(argv)
+
+    session = SessionLocal()
+    try:
+        order_ids = None
+        if args.order:
+            rows = session.query(OrderDB.id, OrderDB.order_number).filter(OrderDB.order_number.in_(args.order)).all()
+            missing = set(args.order) - {r.order_number for r in rows}
+            if missing:
+                print(f"❌ Unknown order number(s): {', '.join(map(str, sorted(missing)))}")
+                return 2
+            order_ids = [r.id for r in rows]
+
+        recompute(session, order_ids)
+        session.commit()
+        scope = f"{len(order_ids)} order(s)" if order_ids is not None else "all orders"
+        print(f"✅ Counters recomputed for {scope}.")
+        return 0
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Error while recomputing counters: {e}")
+        return 2
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
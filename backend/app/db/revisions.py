@@ -0,0 +1,124 @@
+"""
+db/revisions.py
+
+Per-table revision counters used to build ETags for the GET endpoints.
+
+Every AppSession (SessionLocal, and AsyncSessionLocal underneath) bumps the
+counter of each tracked table it writes to, inside the same transaction as the
+write itself, so a reader never sees a new revision before the data it
+describes is committed. Both
+unit-of-work flushes (db.add / db.delete / attribute changes) and bulk
+statements (query(...).delete(), session.execute(update(...))) are covered.
+
+The tables written are collected during the transaction and their counters
+bumped once, in name order, just before it commits: the counter rows are the
+last rows a writer locks, so writers that meet on them never hold rows the
+other one still needs, and they hold them only for the commit.
+"""
+
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, update, select
+from sqlalchemy.orm import Session
+
+from .database import AppSession
+from .models import (
+    OrderDB,
+    OperationDB,
+    TaskDB,
+    MachineDB,
+    UserDB,
+    TableRevisionDB,
+)
+
+TRACKED_TABLES = (
+    OrderDB.__tablename__,
+    OperationDB.__tablename__,
+    TaskDB.__tablename__,
+    MachineDB.__tablename__,
+    UserDB.__tablename__,
+)
+
+_PENDING_KEY = "revision_bumps"
+
+
+def ensure_revision_rows(engine) -> None:
+    """Insert a zero revision for every tracked table that has none yet."""
+    with Session(engine) as db:
+        existing = set(db.scalars(select(TableRevisionDB.table_name)))
+        for name in TRACKED_TABLES:
+            if name not in existing:
+                db.add(TableRevisionDB(table_name=name, revision=0))
+        db.commit()
+
+
+def get_revisions(db: Session, tables: Iterable[str]) -> Dict[str, int]:
+    tables = list(tables)
+    rows = db.execute(
+        select(TableRevisionDB.table_name, TableRevisionDB.revision).where(TableRevisionDB.table_name.in_(tables))
+    )
+    return {name: rev for name, rev in rows}
+
+
+def etag_for(db: Session, tables: Iterable[str]) -> Optional[str]:
+    """Weak ETag for a response built from `tables`, or None if a counter is missing."""
+    tables = list(tables)
+    revs = get_revisions(db, tables)
+    if len(revs) != len(tables):
+        return None
+    return 'W/"' + "-".join(str(revs[t]) for t in tables) + '"'
+
+
+def bump(db: Session, tables: Iterable[str]) -> None:
+    """Bump the revisions of `tables` when the session's transaction commits."""
+    tables = set(tables) & set(TRACKED_TABLES)
+    if tables:
+        db.info.setdefault(_PENDING_KEY, set()).update(tables)
+
+
+@event.listens_for(AppSession, "before_commit")
+def _bump_before_commit(session):
+    # the commit's own flush runs after this hook; do it first so its tables are counted
+    session.flush()
+    # sorted so concurrent writers always lock the counter rows in the same order
+    for name in sorted(session.info.pop(_PENDING_KEY, ())):
+        session.connection().execute(
+            update(TableRevisionDB)
+            .where(TableRevisionDB.table_name == name)
+            .values(revision=TableRevisionDB.revision + 1)
+        )
+
+
+@event.listens_for(AppSession, "after_transaction_end")
+def _forget_bumps(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def _statement_table(orm_execute_state) -> Optional[str]:
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        return mapper.local_table.name
+    table = getattr(orm_execute_state.statement, "table", None)
+    return getattr(table, "name", None)
+
+
+@event.listens_for(AppSession, "after_flush")
+def _bump_after_flush(session, flush_context):
+    changed = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    bump(session, changed)
+
+
+@event.listens_for(AppSession, "do_orm_execute")
+def _bump_after_bulk(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    result = orm_execute_state.invoke_statement()
+    name = _statement_table(orm_execute_state)
+    if name:
+        bump(orm_execute_state.session, [name])
+    return result
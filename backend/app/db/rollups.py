@@ -0,0 +1,434 @@
+"""
+db/rollups.py
+
+Hourly and daily task rollups for the dashboards (GET /analytics/rollups/*).
+
+task_rollup_hourly holds, per UTC hour of start_at and per (machine, operation
+code, operator, process type), the task count, good/bad pieces and the summed
+duration of the finished tasks. task_rollup_daily sums the hourly rows per
+production day in the plant time zone (PLANT_TIMEZONE). As in /analytics/machines,
+a task belongs entirely to the bucket in which it starts.
+
+The rollups are refreshed incrementally from the delta-sync change stamps (see
+db/changes.py): rollup_state keeps the stamp they are current up to, and a
+refresh rebuilds only the hours that contain
+
+  - a task stamped after the watermark (created or updated), or
+  - an entry in rollup_dirty stamped after it: the old start_at of a task that
+    was deleted or moved to another hour, or of the tasks of an operation whose
+    machine or code changed. The listeners below write these in the same
+    transaction as the change itself; `mark_tasks` does it for the tasks a
+    database cascade deletes (db/deletes.py).
+
+Each affected hour is recomputed in one statement from tasksdb and the archived
+tasks (db/archive.py), so archiving leaves the rollups as they are, then the days
+containing those hours are recomputed from the hourly table. Refreshing is
+idempotent, so a refresh that races a backfill or another worker only repeats
+work. `start_refresher` runs it periodically in each worker (Postgres only);
+history written before the rollups existed is loaded with
+`python -m db.backfill_rollups`.
+"""
+
+import datetime
+import logging
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, case, delete, event, func, insert, literal, or_, select
+from sqlalchemy.orm import Session, attributes
+
+from core.config import settings
+from .changes import current_cursor, transaction_stamp
+from .database import AppSession, SessionLocal
+from .archive import Tier, union_tiers
+from .models import (
+    OperationDB,
+    TaskDB,
+    TaskHourlyRollupDB,
+    TaskDailyRollupDB,
+    RollupDirtyDB,
+    RollupStateDB,
+)
+
+log = logging.getLogger(__name__)
+
+STATE = "tasks"
+HOUR = datetime.timedelta(hours=1)
+
+# statements OR together at most this many bucket ranges
+_RANGES_PER_STATEMENT = 200
+
+Range = Tuple[datetime.datetime, datetime.datetime]
+
+
+# -----------------------
+# Dirty tracking
+# -----------------------
+def _old_value(obj, key):
+    hist = attributes.get_history(obj, key)
+    values = hist.deleted or hist.unchanged
+    return values[0] if values else None
+
+
+@event.listens_for(AppSession, "before_flush")
+def _mark_left_buckets(session, flush_context, instances):
+    starts = []
+    moved_operations = []
+    for obj in session.dirty:
+        if isinstance(obj, TaskDB) and attributes.get_history(obj, "start_at").deleted:
+            starts.append(_old_value(obj, "start_at"))
+        elif isinstance(obj, OperationDB) and (
+            attributes.get_history(obj, "machine_id").deleted or attributes.get_history(obj, "operation_code").deleted
+        ):
+            moved_operations.append(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, TaskDB):
+            starts.append(_old_value(obj, "start_at"))
+
+    starts = [st for st in starts if st is not None]
+    if not starts and not moved_operations:
+        return
+
+    stamp = transaction_stamp(session)
+    conn = session.connection()
+    if starts:
+        conn.execute(insert(RollupDirtyDB.__table__), [{"start_at": st, "change_stamp": stamp} for st in starts])
+    if moved_operations:
+        conn.execute(
+            insert(RollupDirtyDB.__table__).from_select(
+                ["start_at", "change_stamp"],
+                select(TaskDB.start_at, literal(stamp)).where(
+                    TaskDB.operation_id.in_(moved_operations), TaskDB.start_at.isnot(None)
+                ),
+            )
+        )
+
+
+@event.listens_for(AppSession, "do_orm_execute")
+def _mark_bulk_task_writes(orm_execute_state):
+    """Remember the current start_at of the tasks a bulk UPDATE/DELETE is about to change."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not TaskDB:
+        return None
+
+    session = orm_execute_state.session
+    stamp = transaction_stamp(session)
+    affected = select(TaskDB.start_at, literal(stamp)).where(TaskDB.start_at.isnot(None))
+    if isinstance(orm_execute_state.parameters, list):
+        # bulk UPDATE by primary key
+        affected = affected.where(TaskDB.id.in_([p["id"] for p in orm_execute_state.parameters]))
+    elif orm_execute_state.statement.whereclause is not None:
+        affected = affected.where(orm_execute_state.statement.whereclause)
+    session.connection().execute(insert(RollupDirtyDB.__table__).from_select(["start_at", "change_stamp"], affected))
+    return None
+
+
+def mark_tasks(db: Session, whereclause) -> None:
+    """Mark the hours of the tasks matching `whereclause` dirty, for deletes no listener sees (database cascades)."""
+    stamp = transaction_stamp(db)
+    db.connection().execute(
+        insert(RollupDirtyDB.__table__).from_select(
+            ["start_at", "change_stamp"],
+            select(TaskDB.start_at, literal(stamp)).where(whereclause, TaskDB.start_at.isnot(None)),
+        )
+    )
+
+
+# -----------------------
+# Refresh
+# -----------------------
+def ensure_state_row(engine) -> None:
+    with Session(engine) as db:
+        if db.get(RollupStateDB, STATE) is None:
+            db.add(RollupStateDB(name=STATE, watermark=0))
+            db.commit()
+
+
+def get_state(db: Session) -> Optional[RollupStateDB]:
+    return db.get(RollupStateDB, STATE)
+
+
+def _lock_state(db: Session, wait: bool) -> Optional[RollupStateDB]:
+    """Lock the state row for this transaction; None if another refresher holds it (and wait is False)."""
+    stmt = select(RollupStateDB).where(RollupStateDB.name == STATE).with_for_update(skip_locked=not wait)
+    return db.scalars(stmt).first()
+
+
+def _hour_ranges(hours: Iterable[datetime.datetime]) -> List[Range]:
+    """Merge bucket starts into [start, end) ranges of consecutive hours."""
+    ranges: List[Range] = []
+    for h in sorted(set(hours)):
+        if ranges and ranges[-1][1] == h:
+            ranges[-1] = (ranges[-1][0], h + HOUR)
+        else:
+            ranges.append((h, h + HOUR))
+    return ranges
+
+
+def _day_ranges(days: Iterable[datetime.date], tz: ZoneInfo) -> List[Range]:
+    """[start, end) instants of local days; DST days are 23 or 25 hours long."""
+    def midnight(d):
+        return datetime.datetime.combine(d, datetime.time(), tzinfo=tz)
+
+    return [(midnight(d), midnight(d + datetime.timedelta(days=1))) for d in sorted(set(days))]
+
+
+def _within(column, ranges: Sequence[Range]):
+    return or_(*(and_(column >= a, column < b) for a, b in ranges))
+
+
+def _chunks(ranges: Sequence[Range]):
+    for i in range(0, len(ranges), _RANGES_PER_STATEMENT):
+        yield ranges[i:i + _RANGES_PER_STATEMENT]
+
+
+def _local_day(tz: ZoneInfo):
+    return func.date(func.timezone(tz.key, TaskHourlyRollupDB.bucket_start))
+
+
+def _task_rows(tier: Tier, ranges: Sequence[Range]):
+    task, operation = tier.task, tier.operation
+    return (
+        select(
+            func.date_trunc("hour", task.start_at).label("bucket_start"),
+            operation.machine_id,
+            operation.operation_code,
+            task.operator_user_id,
+            task.process_type,
+            task.good_pieces,
+            task.bad_pieces,
+            case((task.end_at > task.start_at, func.extract("epoch", task.end_at - task.start_at) / 60)).label("minutes"),
+        )
+        .join(operation, operation.id == task.operation_id)
+        .where(_within(task.start_at, ranges))
+    )
+
+
+def rebuild_hours(db: Session, ranges: Sequence[Range]) -> None:
+    """Recompute the hourly rows for the given [start, end) ranges (whole hours) from the hot and archived tasks."""
+    hourly = TaskHourlyRollupDB
+    for chunk in _chunks(ranges):
+        db.execute(delete(hourly).where(_within(hourly.bucket_start, chunk)), execution_options={"synchronize_session": False})
+        tasks = union_tiers(lambda tier: _task_rows(tier, chunk)).subquery()
+        keys = (tasks.c.bucket_start, tasks.c.machine_id, tasks.c.operation_code, tasks.c.operator_user_id, tasks.c.process_type)
+        rows = (
+            select(
+                *keys,
+                func.count(),
+                func.coalesce(func.sum(tasks.c.good_pieces), 0),
+                func.coalesce(func.sum(tasks.c.bad_pieces), 0),
+                func.coalesce(func.sum(tasks.c.minutes), 0),
+            )
+            .group_by(*keys)
+        )
+        db.execute(
+            insert(hourly).from_select(
+                ["bucket_start", "machine_id", "operation_code", "operator_user_id", "process_type",
+                 "task_count", "good_pieces", "bad_pieces", "busy_minutes"],
+                rows,
+            )
+        )
+
+
+def rebuild_days(db: Session, days: Iterable[datetime.date], tz: ZoneInfo) -> None:
+    """Recompute the daily rows for the given local days from the hourly table."""
+    hourly, daily = TaskHourlyRollupDB, TaskDailyRollupDB
+    days = sorted(set(days))
+    day = _local_day(tz)
+    keys = (hourly.machine_id, hourly.operation_code, hourly.operator_user_id, hourly.process_type)
+    for i in range(0, len(days), _RANGES_PER_STATEMENT):
+        chunk = days[i:i + _RANGES_PER_STATEMENT]
+        db.execute(delete(daily).where(daily.day.in_(chunk)), execution_options={"synchronize_session": False})
+        rows = (
+            select(
+                day,
+                *keys,
+                func.sum(hourly.task_count),
+                func.sum(hourly.good_pieces),
+                func.sum(hourly.bad_pieces),
+                func.sum(hourly.busy_minutes),
+            )
+            .where(_within(hourly.bucket_start, _day_ranges(chunk, tz)))
+            .group_by(day, *keys)
+        )
+        db.execute(
+            insert(daily).from_select(
+                ["day", "machine_id", "operation_code", "operator_user_id", "process_type",
+                 "task_count", "good_pieces", "bad_pieces", "busy_minutes"],
+                rows,
+            )
+        )
+
+
+def dirty_hours(db: Session, since: int, until: int) -> List[datetime.datetime]:
+    """Start of every hour touched by a change stamped in (since, until]."""
+    touched = select(func.date_trunc("hour", TaskDB.start_at)).where(
+        TaskDB.change_stamp > since, TaskDB.change_stamp <= until, TaskDB.start_at.isnot(None)
+    )
+    left = select(func.date_trunc("hour", RollupDirtyDB.start_at)).where(
+        RollupDirtyDB.change_stamp > since, RollupDirtyDB.change_stamp <= until
+    )
+    return list(db.scalars(touched.union(left)))
+
+
+def refresh(db: Session, wait: bool = False) -> Optional[int]:
+    """
+    Bring the rollups up to the latest committed change stamp. Returns the
+    number of hours rebuilt, or None if another worker is refreshing (when
+    wait is False). The caller commits.
+    """
+    state = _lock_state(db, wait)
+    if state is None:
+        return None
+
+    # every row stamped <= cursor is committed (see db/changes.py)
+    cursor = current_cursor(db)
+    if cursor <= state.watermark:
+        return 0
+
+    tz = ZoneInfo(settings.plant_timezone)
+    hours = dirty_hours(db, state.watermark, cursor)
+    if hours:
+        rebuild_hours(db, _hour_ranges(hours))
+        rebuild_days(db, {h.astimezone(tz).date() for h in hours}, tz)
+
+    db.execute(
+        delete(RollupDirtyDB).where(RollupDirtyDB.change_stamp <= cursor),
+        execution_options={"synchronize_session": False},
+    )
+    state.watermark = cursor
+    state.refreshed_at = func.now()
+    return len(hours)
+
+
+def backfill(db: Session, since: Optional[datetime.datetime] = None, step: datetime.timedelta = datetime.timedelta(days=31)) -> int:
+    """
+    Rebuild both tables from the hot and archived tasks starting at or after `since`
+    (all history when None), committing once per `step`. Returns the number of
+    steps. Changes made meanwhile are picked up by the next refresh.
+    """
+    cursor = current_cursor(db)
+    bounds = union_tiers(lambda tier: select(func.min(tier.task.start_at).label("first"), func.max(tier.task.start_at).label("last"))).subquery()
+    first, last = db.execute(select(func.min(bounds.c.first), func.max(bounds.c.last))).one()
+    db.rollback()
+    if first is None:
+        return 0
+
+    tz = ZoneInfo(settings.plant_timezone)
+    # whole local days, so the daily rows of the first and last day are complete
+    lo = datetime.datetime.combine((max(first, since) if since else first).astimezone(tz).date(), datetime.time(), tzinfo=tz)
+    hi = last.astimezone(tz) + datetime.timedelta(days=1)
+
+    steps = 0
+    while lo < hi:
+        upper = datetime.datetime.combine((lo + step).date(), datetime.time(), tzinfo=tz)
+        rebuild_hours(db, [(lo, upper)])
+        days = [lo.date() + datetime.timedelta(days=i) for i in range((upper.date() - lo.date()).days)]
+        rebuild_days(db, days, tz)
+        db.commit()
+        lo, steps = upper, steps + 1
+
+    state = _lock_state(db, wait=True)
+    if state is not None and cursor > state.watermark:
+        state.watermark = cursor
+        state.refreshed_at = func.now()
+    db.commit()
+    return steps
+
+
+# -----------------------
+# Queries
+# -----------------------
+# group_by dimension -> rollup column
+DIMENSION_COLUMNS = {
+    "machine": "machine_id",
+    "operation_code": "operation_code",
+    "operator": "operator_user_id",
+    "process_type": "process_type",
+}
+
+
+def series(
+    db: Session,
+    model,
+    bucket,
+    lo,
+    hi,
+    group_by: Sequence[str],
+    machine_ids: Sequence[int] = (),
+    operator_ids: Sequence[int] = (),
+    operation_codes: Sequence[str] = (),
+    process_type=None,
+) -> List[dict]:
+    """Rollup rows of `model` with lo <= bucket < hi, summed per bucket and the `group_by` dimensions."""
+    keys = [getattr(model, DIMENSION_COLUMNS[d]) for d in group_by]
+    stmt = (
+        select(
+            bucket,
+            *keys,
+            func.sum(model.task_count).label("task_count"),
+            func.sum(model.good_pieces).label("good_pieces"),
+            func.sum(model.bad_pieces).label("bad_pieces"),
+            func.sum(model.busy_minutes).label("busy_minutes"),
+        )
+        .where(bucket >= lo, bucket < hi)
+        .group_by(bucket, *keys)
+        .order_by(bucket, *keys)
+    )
+    if machine_ids:
+        stmt = stmt.where(model.machine_id.in_(machine_ids))
+    if operator_ids:
+        stmt = stmt.where(model.operator_user_id.in_(operator_ids))
+    if operation_codes:
+        stmt = stmt.where(model.operation_code.in_(operation_codes))
+    if process_type is not None:
+        stmt = stmt.where(model.process_type == process_type)
+
+    rows = []
+    for r in db.execute(stmt).mappings():
+        row = dict(r)
+        busy_hours = (row["busy_minutes"] or 0) / 60
+        row["busy_minutes"] = round(row["busy_minutes"] or 0, 2)
+        row["pieces_per_hour"] = round(row["good_pieces"] / busy_hours, 4) if busy_hours else None
+        rows.append(row)
+    return rows
+
+
+# -----------------------
+# Background refresher
+# -----------------------
+class Refresher(threading.Thread):
+    """Runs `refresh` every `interval` seconds; workers that find the state row locked skip their turn."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="rollup-refresher", daemon=True)
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                refresh(db)
+                db.commit()
+            except Exception:
+                db.rollback()
+                log.exception("rollup refresh failed")
+            finally:
+                db.close()
+
+
+def start_refresher(engine) -> Optional[Refresher]:
+    """Start the periodic refresh for this worker (Postgres only, ROLLUP_REFRESH_INTERVAL > 0)."""
+    if engine.dialect.name != "postgresql" or settings.rollup_refresh_interval <= 0:
+        return None
+    ensure_state_row(engine)
+    refresher = Refresher(settings.rollup_refresh_interval)
+    refresher.start()
+    return refresher
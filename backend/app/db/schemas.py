@@ -1,4 +1,4 @@
-from pydantic import BaseModel, model_validator, constr
+from pydantic import BaseModel, Field, model_validator, constr
 import datetime
 from typing import List, Optional, Annotated
 import enum
@@ -18,6 +18,34 @@ class MachineType(str, enum.Enum):
     CONVENTIONAL = "CONVENTIONAL"
 
 
+class OrderSortKey(str, enum.Enum):
+    order_number = "order_number"
+    start_date = "start_date"
+    end_date = "end_date"
+    material_number = "material_number"
+
+
+class TaskSortKey(str, enum.Enum):
+    id = "id"
+    start_at = "start_at"
+    end_at = "end_at"
+
+
+class AnalyticsDimension(str, enum.Enum):
+    machine = "machine"
+    machine_type = "machine_type"
+    process_type = "process_type"
+    shift = "shift"
+    day = "day"
+
+
+class RollupDimension(str, enum.Enum):
+    machine = "machine"
+    operation_code = "operation_code"
+    operator = "operator"
+    process_type = "process_type"
+
+
 # -------------------------------
 # User Schemas
 # -------------------------------
@@ -184,6 +212,291 @@ class Order(OrderBase):
     model_config = {"from_attributes": True}
 
 
+class OrderSummary(OrderBase):
+    id: int
+    order_number: int
+    num_operations: int = 0
+    good_pieces: int = 0
+    bad_pieces: int = 0
+    total_pieces: int = 0
+
+    model_config = {"from_attributes": True}
+
+
+# -------------------------------
+# Bulk Ingestion Schemas
+# -------------------------------
+MAX_BULK_ORDERS = 1000
+
+
+class BulkOperationCreate(BaseModel):
+    """OperationCreate without order_id (taken from the parent order); the machine may be given by id or location."""
+    operation_code: str
+    machine_id: Optional[int] = None
+    machine_location: Optional[str] = None
+    tasks: List[TaskCreate] = []
+
+
+class BulkOrderCreate(OrderCreate):
+    operations: List[BulkOperationCreate] = []
+
+
+class BulkOrderRequest(BaseModel):
+    orders: List[BulkOrderCreate] = Field(..., max_length=MAX_BULK_ORDERS)
+
+
+class BulkOrderResult(BaseModel):
+    index: int
+    order_number: int
+    status: str                     # "created" | "error"
+    order_id: Optional[int] = None
+    operations: int = 0
+    tasks: int = 0
+    detail: Optional[str] = None
+
+
+class BulkOrderResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkOrderResult]
+
+
+# -------------------------------
+# Bulk Delete Schemas
+# -------------------------------
+MAX_BULK_DELETE = 10000
+
+
+class BulkOrderDelete(BaseModel):
+    """Either order_numbers, or start_from and start_to (inclusive, on the order start_date)."""
+    order_numbers: Optional[List[int]] = Field(None, max_length=MAX_BULK_DELETE)
+    start_from: Optional[datetime.date] = None
+    start_to: Optional[datetime.date] = None
+
+    @model_validator(mode="after")
+    def check_selection(self) -> "BulkOrderDelete":
+        has_range = self.start_from is not None or self.start_to is not None
+        if (self.order_numbers is not None) == has_range:
+            raise ValueError("give either order_numbers or start_from and start_to")
+        if has_range:
+            if self.start_from is None or self.start_to is None:
+                raise ValueError("a date range needs both start_from and start_to")
+            if self.start_from > self.start_to:
+                raise ValueError("start_from cannot be after start_to")
+        return self
+
+
+class DeleteJob(BaseModel):
+    id: int
+    status: str                     # "queued" | "running" | "done" | "failed"
+    order_numbers: Optional[List[int]] = None
+    start_from: Optional[datetime.date] = None
+    start_to: Optional[datetime.date] = None
+    deleted: int = 0                # orders deleted so far
+    error: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    updated_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+# -------------------------------
+# Task Batch Schemas
+# -------------------------------
+MAX_TASK_BATCH = 500
+
+
+class TaskBatchAction(str, enum.Enum):
+    create = "create"
+    update = "update"
+    start = "start"
+    stop = "stop"
+
+
+class TaskBatchItem(BaseModel):
+    action: TaskBatchAction
+    task_id: Optional[int] = None                   # update / start / stop
+    operation_id: Optional[int] = None              # create
+    task: Optional[TaskUpdate] = None               # fields for create / update
+    at: Optional[datetime.datetime] = None          # start / stop instant, defaults to now
+    good_pieces: Optional[int] = None               # stop: final counts
+    bad_pieces: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_action_fields(self) -> "TaskBatchItem":
+        if self.action == TaskBatchAction.create:
+            if self.operation_id is None or self.task is None:
+                raise ValueError("create requires operation_id and task")
+            TaskCreate.model_validate(self.task.model_dump(exclude_unset=True))
+        else:
+            if self.task_id is None:
+                raise ValueError(f"{self.action.value} requires task_id")
+            if self.action == TaskBatchAction.update and self.task is None:
+                raise ValueError("update requires task")
+        return self
+
+
+class TaskBatchRequest(BaseModel):
+    items: List[TaskBatchItem] = Field(..., max_length=MAX_TASK_BATCH)
+
+
+class TaskBatchResult(BaseModel):
+    index: int
+    action: TaskBatchAction
+    status: str                     # "ok" | "error"
+    task_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class TaskBatchResponse(BaseModel):
+    applied: int
+    failed: int
+    results: List[TaskBatchResult]
+
+
+# -------------------------------
+# Progress Schemas
+# -------------------------------
+class Progress(BaseModel):
+    good_pieces: int = 0
+    bad_pieces: int = 0
+    total_pieces: int = 0
+    task_count: int = 0
+    open_task_count: int = 0
+    last_activity_at: Optional[datetime.datetime] = None
+
+
+class OrderProgress(Progress):
+    order_number: int
+    num_pieces: int
+
+
+class OperationSummary(Progress):
+    """An operation resolved by its natural key, with machine and piece totals but no tasks."""
+    id: int
+    order_id: int
+    order_number: int
+    num_pieces: int
+    operation_code: str
+    machine_id: Optional[int] = None
+    machine: Optional[Machine] = None
+
+
+# -------------------------------
+# Delta Sync Schemas
+# -------------------------------
+class EntityChanges(BaseModel):
+    upserted: List[int] = Field(default_factory=list)
+    deleted: List[int] = Field(default_factory=list)
+
+
+class Changes(BaseModel):
+    """Ids changed since the requested cursor; pass `cursor` as `since` on the next call."""
+    cursor: int
+    more: bool = Field(False, description="More changes follow `cursor`; call again right away")
+    orders: EntityChanges = Field(default_factory=EntityChanges)
+    operations: EntityChanges = Field(default_factory=EntityChanges)
+    tasks: EntityChanges = Field(default_factory=EntityChanges)
+    machines: EntityChanges = Field(default_factory=EntityChanges)
+    users: EntityChanges = Field(default_factory=EntityChanges)
+
+
+# -------------------------------
+# Analytics Schemas
+# -------------------------------
+class MachineAnalyticsRow(BaseModel):
+    # grouping keys; None when not part of group_by
+    machine_id: Optional[int] = None
+    machine_location: Optional[str] = None
+    machine_type: Optional[MachineType] = None
+    process_type: Optional[ProcessType] = None
+    shift: Optional[str] = None
+    day: Optional[datetime.date] = None
+
+    task_count: int
+    busy_hours: float               # union of the task intervals per machine, overlaps counted once
+    good_pieces: int
+    bad_pieces: int
+    scrap_rate: Optional[float] = None              # bad / (good + bad)
+    throughput_per_hour: Optional[float] = None     # good pieces per busy hour
+
+
+class MachineAnalytics(BaseModel):
+    start: datetime.datetime
+    end: datetime.datetime
+    timezone: str
+    shifts: List[str]
+    group_by: List[AnalyticsDimension]
+    rows: List[MachineAnalyticsRow]
+
+
+class RollupRow(BaseModel):
+    # bucket: bucket_start on /hourly, day on /daily
+    bucket_start: Optional[datetime.datetime] = None
+    day: Optional[datetime.date] = None
+
+    # grouping keys; None when not part of group_by
+    machine_id: Optional[int] = None
+    operation_code: Optional[str] = None
+    operator_user_id: Optional[int] = None
+    process_type: Optional[ProcessType] = None
+
+    task_count: int
+    good_pieces: int
+    bad_pieces: int
+    busy_minutes: float             # summed durations of the finished tasks
+    pieces_per_hour: Optional[float] = None     # good pieces per busy hour
+
+
+class RollupSeries(BaseModel):
+    watermark: int                  # change stamp the rollups are current up to (see GET /changes)
+    refreshed_at: Optional[datetime.datetime] = None
+    group_by: List[RollupDimension]
+    rows: List[RollupRow]
+
+
+class CycleTimeGroup(BaseModel):
+    # minutes per piece: (end_at - start_at) / (good_pieces + bad_pieces) of finished tasks
+    operation_code: str
+    machine_id: Optional[int] = None
+    task_count: int
+    mean: float
+    min: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+    outlier_count: int                  # outside the group's Tukey fences
+    outlier_task_ids: List[int]         # the furthest from the median, at most 20
+
+
+class CycleTimes(BaseModel):
+    computed_at: datetime.datetime      # cached results may be up to CYCLE_TIME_CACHE_TTL old
+    task_count: int
+    groups: List[CycleTimeGroup]
+
+
+# -------------------------------
+# Admin / Diagnostics Schemas
+# -------------------------------
+class PoolStatus(BaseModel):
+    engine: str
+    pool_class: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    idle: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout: Optional[float] = None
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_ms_p50: Optional[float] = None
+    wait_ms_p95: Optional[float] = None
+    wait_ms_p99: Optional[float] = None
+    wait_ms_max: Optional[float] = None
+
+
 # -------------------------------
 # Resolve Forward References
 # -------------------------------
@@ -191,4 +504,5 @@ User.model_rebuild()
 Task.model_rebuild()
 Operation.model_rebuild()
 Order.model_rebuild()
+OrderSummary.model_rebuild()
 Machine.model_rebuild()
@@ -18,6 +18,8 @@ from typing import List, Optional
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from db.counters import recompute
+
 # Import your models (adjust import path if different)
 from db.models import (
     Base,
@@ -261,6 +263,10 @@ def seed_orders_operations_tasks(session, count: int):
                 session.add(task)
                 inserted_tasks += 1
 
+        # tasks were inserted directly, so derive the progress counters once
+        session.flush()
+        recompute(session, [order.id])
+
         # commit per order to keep transactions reasonably sized
         session.commit()
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+db/task_partitions.py
+
+Maintain the monthly partitions of tasksdb (see db/partitions.py). Run it from
+cron, e.g. daily, so next months' partitions exist before their first task.
+
+Examples:
+  python -m db.task_partitions
+  python -m db.task_partitions --ahead 6 --list
+  python -m db.task_partitions --detach-before 2024-01
+  python -m db.task_partitions --detach-before 2024-01 --drop
+"""
+
+import argparse
+import datetime
+import sys
+
+from db.database import engine
+from db.partitions import MONTHS_AHEAD, detach_before, ensure_partitions, is_partitioned, list_partitions
+
+
+def parse_month(value: str) -> datetime.date:
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create upcoming tasksdb partitions and detach old ones.")
+    parser.add_argument("--ahead", type=int, default=MONTHS_AHEAD, help="Months to create ahead of the current one")
+    parser.add_argument("--detach-before", type=parse_month, metavar="YYYY-MM", help="Detach the months before this one")
+    parser.add_argument("--drop", action="store_true", help="Drop the detached months instead of keeping them as tables")
+    parser.add_argument("--list", action="store_true", help="Print the partitions afterwards")
+    args = parser.parse_args(argv)
+    if args.drop and not args.detach_before:
+        parser.error("--drop needs --detach-before")
+
+    try:
+        with engine.begin() as conn:
+            if not is_partitioned(conn):
+                print("❌ tasksdb is not partitioned (run `alembic upgrade head` on Postgres first).")
+                return 2
+            created = ensure_partitions(conn, args.ahead)
+            print(f"✅ Created {len(created)} partition(s){': ' + ', '.join(created) if created else ''}.")
+
+        if args.detach_before:
+            # its own transaction: DETACH takes a short exclusive lock on tasksdb
+            with engine.begin() as conn:
+                detached = detach_before(conn, args.detach_before, args.drop)
+            verb = "Dropped" if args.drop else "Detached"
+            print(f"✅ {verb} {len(detached)} partition(s){': ' + ', '.join(detached) if detached else ''}.")
+            if detached:
+                print("   Run `python -m db.repair_counters` to take their tasks out of the progress counters.")
+
+        if args.list:
+            with engine.connect() as conn:
+                for name, lower, upper in list_partitions(conn):
+                    span = f"{lower:%Y-%m-%d} .. {upper:%Y-%m-%d}" if lower else "default"
+                    print(f"  {name:<24} {span}")
+        return 0
+    except Exception as e:
+        print(f"❌ Error while maintaining partitions: {e}")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,43 @@
 # main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from api import orders
-from db.database import Base, engine
+from api import orders, export, admin, changes, live, analytics
+from db.database import Base, engine, DB_ASYNC
 from db.models import Base
+from db.revisions import ensure_revision_rows
+from db.reference_cache import reference_cache
+from db.invalidation import start_listener
+from db.rollups import start_refresher
+from db.partitions import ensure_task_partitions
+from db.deletes import start_job_runner
 
 # Create all tables
 Base.metadata.create_all(bind=engine)
+# default partition plus the coming months of tasksdb; `python -m db.task_partitions` keeps them ahead
+ensure_task_partitions(engine)
+ensure_revision_rows(engine)
+reference_cache.warm(engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # per-worker LISTEN thread that evicts cached machines/users changed by other workers
+    listener = start_listener(engine)
+    # incremental refresh of the task rollups behind /analytics/rollups
+    refresher = start_refresher(engine)
+    # bulk delete jobs (POST /orders/bulk-delete), whichever worker takes them
+    runner = start_job_runner(engine, on_deleted=orders.publish_deleted_orders)
+    yield
+    if listener is not None:
+        listener.stop()
+    if refresher is not None:
+        refresher.stop()
+    if runner is not None:
+        runner.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow your frontend origin (e.g. localhost:3000) or * for all origins
 origins = [
@@ -21,8 +50,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Export-Cursor", "Location"],
 )
 
 
 # Include the orders router
-app.include_router(orders.router)
\ No newline at end of file
+if DB_ASYNC:
+    from api import orders_async
+
+    # registered first so its async handlers take precedence for the routes it defines
+    app.include_router(orders_async.router)
+app.include_router(orders.router)
+app.include_router(export.router)
+app.include_router(admin.router)
+app.include_router(changes.router)
+app.include_router(live.router)
+app.include_router(analytics.router)
+
+
+@app.exception_handler(orders.NotModified)
+def not_modified_handler(request: Request, exc: orders.NotModified):
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": "no-cache"})
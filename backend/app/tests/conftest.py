@@ -0,0 +1,59 @@
+"""
+Shared fixtures for the backend tests.
+
+The tests run against the Postgres database named by DATABASE_URL and are
+skipped without one. Each test works inside a transaction that is rolled back
+at the end (the handlers' commits only release savepoints), so the database
+is left as it was found.
+"""
+
+import os
+
+import pytest
+
+POSTGRES = os.environ.get("DATABASE_URL", "").startswith("postgresql")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    """What main creates at start-up, so the tests also run on an empty database."""
+    if not POSTGRES:
+        return
+    from db.database import engine
+    from db.models import Base
+    from db.partitions import ensure_task_partitions
+    from db.revisions import ensure_revision_rows
+
+    Base.metadata.create_all(bind=engine)
+    ensure_task_partitions(engine)
+    ensure_revision_rows(engine)
+
+
+@pytest.fixture
+def db():
+    from db.database import AppSession, engine
+
+    conn = engine.connect()
+    outer = conn.begin()
+    session = AppSession(bind=conn, join_transaction_mode="create_savepoint", autoflush=False)
+    try:
+        yield session
+    finally:
+        session.close()
+        outer.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def client(db):
+    """TestClient whose requests all use the `db` session (no lifespan: no listener or refresher threads)."""
+    from fastapi.testclient import TestClient
+
+    import main
+    from api import orders
+
+    main.app.dependency_overrides[orders.get_db] = lambda: db
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.app.dependency_overrides.clear()
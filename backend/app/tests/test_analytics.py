@@ -0,0 +1,61 @@
+"""
+Busy time from db/analytics.py machine_stats stays inside the requested range:
+tasks that are still open, or close after the range ends, only count up to its end.
+"""
+
+import datetime
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("needs a Postgres DATABASE_URL", allow_module_level=True)
+
+from db import analytics
+from db.models import MachineDB, MachineType, OperationDB, OrderDB, ProcessType, TaskDB
+from db.schemas import AnalyticsDimension as D
+
+UTC = datetime.timezone.utc
+START = datetime.datetime(2024, 1, 1, tzinfo=UTC)
+END = datetime.datetime(2024, 1, 2, tzinfo=UTC)
+WINDOW_HOURS = (END - START).total_seconds() / 3600
+
+
+@pytest.fixture
+def machine(db):
+    machine = MachineDB(machine_location="TEST-AN", description="analytics", machine_id="AN", machine_type=MachineType.CNC)
+    order = OrderDB(order_number=987670000, material_number=987654323, num_pieces=10)
+    op = OperationDB(operation_code="0010", machine=machine)
+    order.operations.append(op)
+    op.tasks.extend([
+        # still open: runs until now, years after END
+        TaskDB(process_type=ProcessType.PROCESSING, start_at=START + datetime.timedelta(hours=2)),
+        # closed a week after END
+        TaskDB(process_type=ProcessType.PREPARATION, start_at=START + datetime.timedelta(hours=20), end_at=END + datetime.timedelta(days=7)),
+        # wholly inside the range
+        TaskDB(process_type=ProcessType.PROCESSING, start_at=START, end_at=START + datetime.timedelta(hours=1)),
+    ])
+    db.add(order)
+    db.commit()
+    return machine.id
+
+
+def stats(db, machine_id, group_by):
+    return analytics.machine_stats(
+        db, START, END, group_by, "UTC", analytics.parse_shifts("06:00,14:00,22:00"), machine_ids=[machine_id]
+    )
+
+
+def test_busy_time_is_cut_off_at_the_end_of_the_range(db, machine):
+    [row] = stats(db, machine, [D.machine])
+    assert row["task_count"] == 3
+    # 00:00-01:00 plus 02:00 until the end of the range
+    assert row["busy_hours"] == pytest.approx(1 + WINDOW_HOURS - 2)
+
+
+@pytest.mark.parametrize("group_by", [[D.machine], [D.machine, D.process_type], [D.machine, D.shift]])
+def test_busy_time_never_exceeds_the_range(db, machine, group_by):
+    rows = stats(db, machine, group_by)
+    assert rows
+    for row in rows:
+        assert row["busy_hours"] <= WINDOW_HOURS
@@ -0,0 +1,104 @@
+"""
+Delta-sync change stamps (db/changes.py): writers don't wait for one another,
+the cursor stays below writers that are still running, and changes_since
+pages through long histories.
+"""
+
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("needs a Postgres DATABASE_URL", allow_module_level=True)
+
+from sqlalchemy import text
+
+from db import changes
+from db.database import AppSession, engine
+from db.models import OrderDB
+
+FIRST_ORDER = 987690000
+
+
+def add_order(db, number: int) -> int:
+    """Flush a new order; returns the transaction's stamp (the transaction stays open)."""
+    db.add(OrderDB(order_number=number, material_number=987654325, num_pieces=1))
+    db.flush()
+    return changes.transaction_stamp(db)
+
+
+@pytest.fixture
+def other():
+    """A second session on its own connection; it gives up after a second instead of waiting for a lock."""
+    conn = engine.connect()
+    conn.begin()
+    conn.execute(text("SET LOCAL lock_timeout = '1s'"))
+    session = AppSession(bind=conn, join_transaction_mode="create_savepoint", autoflush=False)
+    try:
+        yield session
+    finally:
+        session.close()
+        conn.rollback()
+        conn.close()
+
+
+def test_cursor_stays_below_running_writers(db, other):
+    first = add_order(db, FIRST_ORDER)
+    second = add_order(other, FIRST_ORDER + 1)
+    assert second > first
+    with engine.connect() as reader:
+        cursor = changes.current_cursor(reader)
+        assert cursor < first
+        assert changes.last_stamp(reader) >= second
+    other.rollback()
+    with engine.connect() as reader:
+        assert changes.current_cursor(reader) < first
+
+
+def test_cursor_reaches_finished_writers(other):
+    stamp = add_order(other, FIRST_ORDER + 2)
+    other.rollback()
+    with engine.connect() as reader:
+        assert changes.current_cursor(reader) >= stamp
+
+
+def test_changes_since_pages_by_stamp(db):
+    # five transactions of one order, then one of three
+    stamps = []
+    for i in range(5):
+        stamps.append(add_order(db, FIRST_ORDER + 10 + i))
+        db.commit()
+    for i in range(3):
+        db.add(OrderDB(order_number=FIRST_ORDER + 20 + i, material_number=987654325, num_pieces=1))
+    db.flush()
+    stamps.append(changes.transaction_stamp(db))
+    db.commit()
+    since, until = stamps[0] - 1, stamps[-1]
+
+    pages = []
+    while since < until:
+        end, ids = changes.changes_since(db, since, until, limit=2)
+        pages.append(len(ids[OrderDB.__tablename__]["upserted"]))
+        since = end
+    # a stamp is never split, even when it holds more rows than the limit
+    assert pages == [2, 2, 1, 3]
+
+    end, ids = changes.changes_since(db, stamps[0] - 1, until)
+    assert end == until
+    assert len(ids[OrderDB.__tablename__]["upserted"]) == 8
+
+
+def test_cursor_from_before_a_running_writer_is_accepted(client, db):
+    stamp = add_order(db, FIRST_ORDER + 30)
+    r = client.get("/changes", params={"since": stamp})
+    assert r.status_code == 200
+    assert r.json()["cursor"] == stamp
+    r = client.get("/changes", params={"since": stamp + 10**9})
+    assert r.status_code == 400
+
+
+def test_cursor_ignores_other_advisory_locks(other):
+    # a shared single-key lock (split into classid/objid) and a two-key lock of another class
+    other.execute(text("SELECT pg_advisory_xact_lock_shared(1), pg_advisory_xact_lock_shared(1, 2)"))
+    with engine.connect() as reader:
+        assert changes.current_cursor(reader) == changes.last_stamp(reader)
@@ -0,0 +1,101 @@
+"""
+How the create and update endpoints answer constraint failures: only the
+constraints they know map to 4xx, anything else surfaces, and a refused
+write leaves nothing behind in the session.
+"""
+
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("needs a Postgres DATABASE_URL", allow_module_level=True)
+
+from sqlalchemy.exc import IntegrityError
+
+from api import orders
+from db import schemas as s
+from db.models import MachineDB, MachineType, OperationDB, OrderArchiveDB, OrderDB
+from db.reference_cache import reference_cache
+
+ORDER_NUMBER = 987680000
+
+
+@pytest.fixture
+def order(db):
+    order = OrderDB(order_number=ORDER_NUMBER, material_number=987654324, num_pieces=1)
+    db.add(order)
+    db.commit()
+    return order.id
+
+
+@pytest.fixture
+def vanished_machine(db, monkeypatch):
+    """A machine the reference cache still returns after it was deleted."""
+    machine = MachineDB(machine_location="TEST-CE", description="gone", machine_id="CE", machine_type=MachineType.CNC)
+    db.add(machine)
+    db.commit()
+    cached = s.Machine.model_validate(machine)
+    db.delete(machine)
+    db.commit()
+    monkeypatch.setattr(reference_cache, "machine", lambda db, machine_id: cached if machine_id == cached.id else None)
+    return cached.id
+
+
+def test_archived_order_number_is_refused_without_a_row(client, db):
+    number = ORDER_NUMBER + 1
+    db.add(OrderArchiveDB(
+        id=987680001, order_number=number, material_number=1, num_pieces=1,
+        good_pieces=0, bad_pieces=0, task_count=0, open_task_count=0,
+    ))
+    db.commit()
+    r = client.post("/orders", json={"order_number": number, "material_number": 1, "num_pieces": 1})
+    assert r.status_code == 409
+    assert db.query(OrderDB).filter(OrderDB.order_number == number).count() == 0
+
+
+def test_operation_on_a_deleted_machine(client, order, vanished_machine):
+    r = client.post("/operations", json={"order_id": order, "operation_code": "0010", "machine_id": vanished_machine})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Referenced machine not found"
+
+
+def test_operation_on_a_missing_order(client, order):
+    r = client.post("/operations", json={"order_id": order + 10**6, "operation_code": "0010"})
+    assert r.status_code == 404
+
+
+def test_other_integrity_errors_are_not_masked(client, order, vanished_machine, monkeypatch):
+    monkeypatch.setattr(orders, "constraint_name", lambda error: "operationsdb_some_check")
+    with pytest.raises(IntegrityError):
+        client.post("/operations", json={"order_id": order, "operation_code": "0010", "machine_id": vanished_machine})
+
+
+@pytest.fixture
+def operations(db, order):
+    """Operations 0010 and 0020 on `order`, 0030 on a second order; their ids in that order."""
+    other = OrderDB(order_number=ORDER_NUMBER + 2, material_number=987654324, num_pieces=1)
+    ops = [
+        OperationDB(order_id=order, operation_code="0010"),
+        OperationDB(order_id=order, operation_code="0020"),
+        OperationDB(order=other, operation_code="0030"),
+    ]
+    db.add_all(ops)
+    db.commit()
+    return [o.id for o in ops]
+
+
+def test_patched_operation_code_conflicts(client, db, operations):
+    first, second, _ = operations
+    r = client.patch(f"/operations/{second}", json={"operation_code": "0010"})
+    assert r.status_code == 409
+    assert db.get(OperationDB, second).operation_code == "0020"
+
+
+def test_moved_operation_conflicts_in_its_new_order(client, db, operations):
+    first, _, elsewhere = operations
+    target = db.get(OperationDB, elsewhere).order_id
+    # 0030 is free in the operation's old order, taken in the new one
+    r = client.patch(f"/operations/{first}", json={"order_id": target, "operation_code": "0030"})
+    assert r.status_code == 409
+    assert db.get(OperationDB, first).order_id != target
@@ -0,0 +1,76 @@
+"""
+Keyset pagination (db/pagination.py) returns every row exactly once, in sort
+order, when the sort column holds NULLs; the NULLs are read as their own range.
+"""
+
+import datetime
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("needs a Postgres DATABASE_URL", allow_module_level=True)
+
+from sqlalchemy import event
+
+from db.database import engine
+from db.models import OrderDB
+from db.pagination import paginate
+
+MATERIAL = 987654322
+FIRST_ORDER = 987660000
+
+# start_date per order; equal dates exercise the id tie-break
+START_DATES = [None, 3, 1, None, 3, 2, None, 1, 3, None, 2]
+
+
+@pytest.fixture
+def orders(db):
+    base = datetime.date(2024, 1, 1)
+    for i, day in enumerate(START_DATES):
+        start = base + datetime.timedelta(days=day) if day is not None else None
+        db.add(OrderDB(order_number=FIRST_ORDER + i, material_number=MATERIAL, num_pieces=1, start_date=start))
+    db.commit()
+    return db.query(OrderDB).filter(OrderDB.material_number == MATERIAL)
+
+
+def expected(query, descending: bool):
+    """Ids in page order: (start_date, id) with NULLs last ascending and first descending."""
+    rows = query.all()
+    values = sorted((o for o in rows if o.start_date is not None), key=lambda o: (o.start_date, o.id), reverse=descending)
+    nulls = sorted((o for o in rows if o.start_date is None), key=lambda o: o.id, reverse=descending)
+    ordered = nulls + values if descending else values + nulls
+    return [o.id for o in ordered]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 20])
+def test_pages_cover_nulls_and_values(orders, limit, descending):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = paginate(orders, OrderDB.start_date, OrderDB.id, limit=limit, after=cursor, descending=descending)
+        assert len(rows) <= limit
+        seen.extend(o.id for o in rows)
+        if cursor is None:
+            break
+    assert seen == expected(orders, descending)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_cursor_pages_use_range_predicates(orders, descending):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    cursor = None
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        while True:
+            _, cursor = paginate(orders, OrderDB.start_date, OrderDB.id, limit=2, after=cursor, descending=descending)
+            if cursor is None:
+                break
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements
+    assert not any(" OR " in statement for statement in statements)
@@ -0,0 +1,95 @@
+"""
+The order read endpoints load a whole order tree in a fixed number of
+statements (db/models.py order_load_options / operation_load_options), however
+many orders, operations and tasks it holds.
+"""
+
+import datetime
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("needs a Postgres DATABASE_URL", allow_module_level=True)
+
+from sqlalchemy import event
+
+from db.database import engine
+from db.models import MachineDB, MachineType, OperationDB, OrderDB, ProcessType, TaskDB, UserDB
+
+MATERIAL = 987654321
+FIRST_ORDER = 987650000
+
+# (orders, operations per order, tasks per operation)
+SIZES = {"small": (1, 1, 1), "large": (6, 4, 5)}
+
+# statements per request, the ETag read of `conditional` included
+EXPECTED = {
+    "list_orders": 4,
+    "get_order_by_number": 4,
+    "get_order_by_id": 4,
+    "get_operations_for_order": 4,
+}
+
+
+def seed_tree(db, orders: int, operations: int, tasks: int):
+    """Commit the tree; returns the (id, order_number) of its first order."""
+    machine = MachineDB(machine_location="TEST-QC", description="query count", machine_id="QC", machine_type=MachineType.CNC)
+    user = UserDB(name="query count")
+    db.add_all([machine, user])
+    start = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    first = None
+    for o in range(orders):
+        order = OrderDB(order_number=FIRST_ORDER + o, material_number=MATERIAL, num_pieces=10)
+        first = first or order
+        for p in range(operations):
+            op = OperationDB(operation_code=f"{p:04d}", machine=machine)
+            order.operations.append(op)
+            for t in range(tasks):
+                op.tasks.append(TaskDB(process_type=ProcessType.PROCESSING, start_at=start, operator_user=user))
+        db.add(order)
+    db.commit()
+    key = (first.id, first.order_number)
+    # nothing left in the identity map for the requests to reuse
+    db.expunge_all()
+    return key
+
+
+@pytest.fixture(params=list(SIZES))
+def tree(request, db):
+    return seed_tree(db, *SIZES[request.param])
+
+
+def count_statements(client, url: str) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        r = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert r.status_code == 200, r.text
+    return len(statements)
+
+
+def test_list_orders(client, tree):
+    url = f"/orders?material_number={MATERIAL}"
+    assert count_statements(client, url) == EXPECTED["list_orders"]
+
+
+def test_get_order_by_number(client, tree):
+    url = f"/orders/{tree[1]}"
+    assert count_statements(client, url) == EXPECTED["get_order_by_number"]
+
+
+def test_get_order_by_id(client, tree):
+    url = f"/orders/id/{tree[0]}"
+    assert count_statements(client, url) == EXPECTED["get_order_by_id"]
+
+
+def test_get_operations_for_order(client, tree):
+    url = f"/orders/{tree[1]}/operations"
+    assert count_statements(client, url) == EXPECTED["get_operations_for_order"]
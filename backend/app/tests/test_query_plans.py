@@ -0,0 +1,50 @@
+"""
+The hot API queries keep using indexes: bench/explain_check.py seeds a
+synthetic dataset inside a transaction that is rolled back, and every query's
+plan must avoid sequential scans of ordersdb, operationsdb and tasksdb (the
+start_at window queries must prune to one tasksdb partition instead).
+"""
+
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("needs a Postgres DATABASE_URL", allow_module_level=True)
+
+from sqlalchemy import text
+
+from bench import explain_check
+from db.database import engine
+
+# smaller than the script's default, large enough that a sequential scan never looks cheaper
+SIZE = {"orders": 5000, "operations": 4, "tasks": 6, "machines": 500, "users": 2000}
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            yield conn, explain_check.seed(conn, **SIZE)
+        finally:
+            trans.rollback()
+
+
+def test_hot_queries_use_indexes(seeded):
+    checks = explain_check.check_plans(*seeded)
+    assert len(checks) == len(explain_check.hot_queries(seeded[1]))
+    assert {c.name: c.problem for c in checks if c.problem} == {}
+
+
+def test_sequential_scans_are_reported(seeded):
+    conn, ids = seeded
+    nested = conn.begin_nested()
+    try:
+        conn.execute(text("SET LOCAL enable_indexscan = off"))
+        conn.execute(text("SET LOCAL enable_bitmapscan = off"))
+        conn.execute(text("SET LOCAL enable_indexonlyscan = off"))
+        problems = {c.name: c.problem for c in explain_check.check_plans(conn, ids)}
+    finally:
+        nested.rollback()
+    assert problems["order by order_number"] == "SEQ SCAN on ordersdb"
@@ -18,7 +18,7 @@ export default function Home() {
   // --- Load Orders ---
   useEffect(() => {
     setLoading(true);
-    fetch(`${API_URL}/orders`)
+    fetch(`${API_URL}/orders/summary`)
       .then((res) => {
         if (!res.ok) throw new Error("Failed to fetch orders");
         return res.json();
@@ -113,6 +113,53 @@ export default function OperationDetail() {
     })();
   }, [operationId, API_URL]);
 
+  // live updates: task changes and piece counts pushed by the backend (/ws/live)
+  useEffect(() => {
+    if (!operationId || !API_URL) return;
+    const wsUrl = `${API_URL.replace(/^http/, "ws")}/ws/live?operation_id=${operationId}`;
+    let ws: WebSocket | null = null;
+    let closed = false;
+    let retry: ReturnType<typeof setTimeout> | null = null;
+
+    const reloadTasks = async () => {
+      try {
+        const res = await fetch(`${API_URL}/operations/${operationId}/tasks`);
+        if (res.ok) setTasks((await res.json()) ?? []);
+      } catch (e) {
+        console.warn("Failed to reload tasks:", e);
+      }
+    };
+
+    const connect = () => {
+      ws = new WebSocket(wsUrl);
+      ws.onmessage = (msg) => {
+        const event = JSON.parse(msg.data);
+        if (event.type === "operation.progress") {
+          setPiecesSummary({
+            total_pieces: Number(event.data.total_pieces ?? 0),
+            good_pieces: Number(event.data.good_pieces ?? 0),
+            bad_pieces: Number(event.data.bad_pieces ?? 0),
+          });
+        } else if (event.type.startsWith("task.")) {
+          reloadTasks();
+        } else if (event.type === "resync") {
+          reloadTasks();
+          refreshPiecesSummary(operationId);
+        }
+      };
+      ws.onclose = () => {
+        if (!closed) retry = setTimeout(connect, 3000);
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      if (retry) clearTimeout(retry);
+      ws?.close();
+    };
+  }, [operationId, API_URL]);
+
   // -------------------
   // Task search/filter
   // -------------------
@@ -106,10 +106,10 @@ export default function OrderDetail() {
   // fetch operation id (note: operation_code is now string)
   const handleRowDoubleClick = async (order_number: number, op_code: string) => {
     try {
-      const res = await fetch(`${API_URL}/operations/get_id?order_number=${order_number}&operation_code=${encodeURIComponent(op_code)}`);
-      if (!res.ok) throw new Error("Failed to fetch operation ID");
-      const id = await res.json();
-      navigate(`/operation/${id}`);
+      const res = await fetch(`${API_URL}/orders/${order_number}/operations/${encodeURIComponent(op_code)}`);
+      if (!res.ok) throw new Error("Failed to fetch operation");
+      const op = await res.json();
+      navigate(`/operation/${op.id}`);
     } catch (e) {
       setError("Erro ao abrir operação.");
     }